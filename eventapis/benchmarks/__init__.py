@@ -0,0 +1,67 @@
+"""
+Các benchmark của dự án. Chạy từ thư mục eventapis, ví dụ:
+
+    python -m benchmarks.bench_auth
+
+Mặc định dùng CSDL SQLite tạm (benchmarks/settings.py); đặt BENCH_DATABASE=mysql để dùng cấu hình MySQL
+trong eventapis/settings.py.
+"""
+import os
+import statistics
+import time
+
+
+def setup():
+    """
+    Khởi tạo Django với settings benchmark và tạo bảng.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def measure(func, iterations):
+    """
+    Gọi func `iterations` lần, trả về danh sách thời gian (giây) của từng lần.
+    """
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed=None):
+    """
+    Thống kê độ trễ (ms) và thông lượng (ops/s).
+    """
+    values = sorted(latencies)
+    elapsed = elapsed if elapsed is not None else sum(values)
+    return {
+        'count': len(values),
+        'ops_per_sec': round(len(values) / elapsed, 1) if elapsed else 0,
+        'mean_ms': round(statistics.fmean(values) * 1000, 4) if values else 0,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 4),
+    }
+
+
+def print_table(rows):
+    """
+    In bảng kết quả: rows là danh sách (tên, summarize()).
+    """
+    print(f"{'case':<40} {'ops/s':>10} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, stats in rows:
+        print(f"{name:<40} {stats['ops_per_sec']:>10} {stats['mean_ms']:>10} {stats['p50_ms']:>10} "
+              f"{stats['p95_ms']:>10} {stats['p99_ms']:>10}")
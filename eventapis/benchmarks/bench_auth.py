@@ -0,0 +1,70 @@
+"""
+So sánh chi phí xác thực mỗi request: lớp DRF/OAuth2 gốc và lớp có cache (events/authentication.py).
+
+    python -m benchmarks.bench_auth --iterations 2000
+"""
+import argparse
+import secrets
+from datetime import timedelta
+
+from benchmarks import measure, print_table, setup, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+    from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+    from oauth2_provider.models import AccessToken, Application
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.authtoken.models import Token
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from events.authentication import CachedOAuth2Authentication, CachedTokenAuthentication, auth_cache
+    from events.models import User
+
+    user, _ = User.objects.get_or_create(username='bench-auth', defaults={'email': 'bench-auth@example.com'})
+    drf_token, _ = Token.objects.get_or_create(user=user)
+    app, _ = Application.objects.get_or_create(
+        client_id='bench-auth-client',
+        defaults={'name': 'bench-auth', 'client_type': Application.CLIENT_CONFIDENTIAL,
+                  'authorization_grant_type': Application.GRANT_PASSWORD})
+    access_token = AccessToken.objects.create(user=user, application=app, token=secrets.token_urlsafe(32),
+                                              expires=timezone.now() + timedelta(hours=1), scope='read write')
+
+    factory = APIRequestFactory()
+    token_header = f'Token {drf_token.key}'
+    bearer_header = f'Bearer {access_token.token}'
+
+    def run(authenticator, header):
+        def call():
+            request = Request(factory.get('/', HTTP_AUTHORIZATION=header))
+            assert authenticator.authenticate(request) is not None
+        return call
+
+    cases = [
+        ('TokenAuthentication', run(TokenAuthentication(), token_header)),
+        ('CachedTokenAuthentication', run(CachedTokenAuthentication(), token_header)),
+        ('OAuth2Authentication', run(OAuth2Authentication(), bearer_header)),
+        ('CachedOAuth2Authentication', run(CachedOAuth2Authentication(), bearer_header)),
+    ]
+
+    auth_cache.clear()
+    rows = []
+    for name, call in cases:
+        call()  # Làm nóng (và nạp cache với các lớp có cache)
+        with CaptureQueriesContext(connection) as queries:
+            latencies = measure(call, args.iterations)
+        stats = summarize(latencies)
+        rows.append((f'{name} ({len(queries) / args.iterations:.2f} q/req)', stats))
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Đo độ trễ POST /users/google-login/ khi tải chứng chỉ Google mỗi lần (như trước) và khi dùng
+cache chứng chỉ theo max-age (events/google_auth.py), cả tuần tự lẫn nhiều thread cùng lúc.
+
+Không ra mạng: ID token được ký bằng khóa RSA tạo tại chỗ và "Google" là transport giả
+(StaticCertsRequest) có thêm độ trễ --fetch-ms cho mỗi lần tải chứng chỉ.
+
+    python -m benchmarks.bench_google_login --iterations 300 --threads 20
+"""
+import argparse
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import measure, print_table, setup, summarize
+
+CLIENT_ID = 'bench-google-client.apps.googleusercontent.com'
+KEY_ID = 'bench-key'
+
+
+def make_signer_and_certs():
+    """
+    Tạo khóa RSA, chứng chỉ X.509 tự ký tương ứng (định dạng oauth2/v1/certs) và signer để ký ID token.
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    from google.auth import crypt
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'bench-google')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256()))
+    private_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                    serialization.NoEncryption())
+    certs = {KEY_ID: cert.public_bytes(serialization.Encoding.PEM).decode()}
+    return crypt.RSASigner.from_string(private_pem, key_id=KEY_ID), certs
+
+
+def make_id_token(signer, email):
+    from google.auth import jwt
+
+    now = int(time.time())
+    return jwt.encode(signer, {
+        'iss': 'https://accounts.google.com', 'aud': CLIENT_ID, 'sub': email, 'email': email,
+        'name': 'Bench User', 'iat': now, 'exp': now + 3600,
+    }).decode()
+
+
+class SlowCerts:
+    """
+    Transport giả có độ trễ mạng cho mỗi lần tải chứng chỉ.
+    """
+
+    def __init__(self, inner, delay):
+        self.inner = inner
+        self.delay = delay
+
+    def __call__(self, url, **kwargs):
+        time.sleep(self.delay)
+        return self.inner(url, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=20)
+    parser.add_argument('--fetch-ms', type=float, default=80.0)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.db import connection
+    from oauth2_provider.models import Application
+    from rest_framework.test import APIClient
+
+    from events import google_auth
+
+    settings.GOOGLE_CLIENT_ID = CLIENT_ID
+    Application.objects.get_or_create(
+        client_id=settings.DEFAULT_OAUTH2_CLIENT_ID,
+        defaults={'name': 'benchmark', 'client_type': Application.CLIENT_CONFIDENTIAL,
+                  'authorization_grant_type': Application.GRANT_PASSWORD})
+    signer, certs = make_signer_and_certs()
+    id_token = make_id_token(signer, f'bench-google-{int(time.time())}@example.com')
+    google = google_auth.StaticCertsRequest(certs)
+    slow_google = SlowCerts(google, args.fetch_ms / 1000)
+
+    def login():
+        response = APIClient().post('/users/google-login/', {'id_token': id_token}, format='json')
+        assert response.status_code == 200, response.content
+
+    def run_threads():
+        latencies = []
+
+        def worker(_):
+            try:
+                latencies.extend(measure(login, args.iterations // args.threads))
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(worker, range(args.threads)))
+        return summarize(latencies, time.perf_counter() - started)
+
+    rows = []
+    for name, transport in (('tải chứng chỉ mỗi lần', slow_google),
+                            ('cache chứng chỉ (max-age)', google_auth.CachingRequest(slow_google))):
+        google_auth.request = transport
+        login()  # Làm nóng
+        google.calls = 0
+        rows.append((f'{name}, tuần tự', summarize(measure(login, args.iterations))))
+        rows.append((f'{name}, {args.threads} thread', run_threads()))
+        print(f'{name}: {google.calls} lần tải chứng chỉ')
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
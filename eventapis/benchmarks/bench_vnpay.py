@@ -0,0 +1,108 @@
+"""
+Thông lượng tạo URL thanh toán và kiểm tra chữ ký IPN của VNPay (events/vnpay.py) trên nhiều thread.
+Mỗi thread dùng vnp_TxnRef riêng và kiểm tra lại chữ ký của chính URL vừa tạo, nên dữ liệu
+bị trộn giữa các thread sẽ bị phát hiện.
+
+    python -m benchmarks.bench_vnpay --threads 1 4 8 --iterations 20000
+"""
+import argparse
+import threading
+import time
+import urllib.parse
+
+from benchmarks import print_table, summarize
+
+SECRET_KEY = 'BENCHMARKSECRETKEY0123456789ABCD'
+PAYMENT_URL = 'https://sandbox.vnpayment.vn/paymentv2/vpcpay.html'
+
+
+def request_params(txn_ref):
+    return {
+        'vnp_Version': '2.1.0',
+        'vnp_Command': 'pay',
+        'vnp_TmnCode': 'BENCH001',
+        'vnp_Amount': 15000000,
+        'vnp_CurrCode': 'VND',
+        'vnp_TxnRef': txn_ref,
+        'vnp_OrderInfo': 'Thanh toan ve Hoi cho sach Ha Noi',
+        'vnp_OrderType': 'billpayment',
+        'vnp_Locale': 'vn',
+        'vnp_CreateDate': '20250101120000',
+        'vnp_IpAddr': '127.0.0.1',
+        'vnp_ReturnUrl': 'http://localhost:8000/payments/return/',
+    }
+
+
+def run_threads(threads, iterations, work):
+    """
+    Chạy work(thread_index, latencies) trên `threads` thread, mỗi thread `iterations` lần.
+    """
+    latencies = [[] for _ in range(threads)]
+    errors = []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        barrier.wait()
+        try:
+            for i in range(iterations):
+                started = time.perf_counter()
+                work(index, i)
+                latencies[index].append(time.perf_counter() - started)
+        except AssertionError as exc:
+            errors.append(exc)
+
+    pool = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise SystemExit(f'Lỗi khi chạy song song: {errors[0]}')
+    return summarize([value for values in latencies for value in values], elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--iterations', type=int, default=20000, help='Số thao tác mỗi thread.')
+    parser.add_argument('--target', type=float, default=10000, help='Thông lượng tối thiểu (ops/s).')
+    args = parser.parse_args()
+
+    from events import vnpay
+
+    def make_url(index, i):
+        url = vnpay.build_payment_url(PAYMENT_URL, request_params(f'{index}_{i}'), SECRET_KEY)
+        assert f'vnp_TxnRef={index}_{i}&' in url
+
+    callback = dict(urllib.parse.parse_qsl(
+        vnpay.build_payment_url(PAYMENT_URL, request_params('1_0'), SECRET_KEY).split('?', 1)[1]))
+    callback.update({'vnp_ResponseCode': '00', 'vnp_TransactionNo': '14000000'})
+    callback['vnp_SecureHash'] = vnpay.sign(vnpay.build_query(
+        {key: value for key, value in callback.items() if key != 'vnp_SecureHash'}), SECRET_KEY)
+
+    def validate_ipn(index, i):
+        assert vnpay.validate_response(callback, SECRET_KEY)
+
+    def round_trip(index, i):
+        url = vnpay.build_payment_url(PAYMENT_URL, request_params(f'{index}_{i}'), SECRET_KEY)
+        params = dict(urllib.parse.parse_qsl(url.split('?', 1)[1]))
+        assert params['vnp_TxnRef'] == f'{index}_{i}' and vnpay.validate_response(params, SECRET_KEY)
+
+    rows = []
+    below_target = []
+    for threads in args.threads:
+        for name, work in (('payment URL', make_url), ('IPN validate', validate_ipn), ('URL + validate', round_trip)):
+            stats = run_threads(threads, args.iterations, work)
+            rows.append((f'{name} ({threads} threads)', stats))
+            if name != 'URL + validate' and stats['ops_per_sec'] < args.target:
+                below_target.append(f'{name} ({threads} threads)')
+    print_table(rows)
+    if below_target:
+        print(f"Dưới mục tiêu {args.target:.0f} ops/s: {', '.join(below_target)}")
+
+
+if __name__ == '__main__':
+    main()
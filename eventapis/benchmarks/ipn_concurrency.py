@@ -0,0 +1,106 @@
+"""
+Kiểm tra tính lũy đẳng của IPN/return VNPay: bắn hàng trăm callback hợp lệ cùng lúc cho một đơn
+(trộn IPN và return URL) rồi kiểm tra chỉ đúng một callback chốt đơn, vé được ghi nhận bán một lần
+và chỉ có một job gửi email. Nên chạy với BENCH_DATABASE=mysql để có tranh chấp khóa dòng thật.
+
+    python -m benchmarks.ipn_concurrency --callbacks 300 --threads 50
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from benchmarks import setup
+
+SECRET_KEY = 'IPNCONCURRENCYSECRET'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--callbacks', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+    from django.utils import timezone
+
+    from events import vnpay
+    from events.models import Category, Event, Job, Payment, Ticket, TicketInventory, User
+
+    settings.VNPAY_HASH_SECRET_KEY = SECRET_KEY
+    suffix = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    organizer = User.objects.create_user(username=f'ipn-org-{suffix}', password='x', is_organizer=True,
+                                         is_verified=True)
+    buyer = User.objects.create_user(username=f'ipn-buyer-{suffix}', password='x', email=f'ipn-{suffix}@example.com')
+    category = Category.objects.create(name=f'IPN {suffix}')
+    event = Event.objects.create(
+        organizer=organizer, category=category, name='IPN concurrency', description='-', location='-',
+        start_time=timezone.now() + timedelta(days=1), end_time=timezone.now() + timedelta(days=2),
+        ticket_price_regular=100000, ticket_price_vip=200000, status='approved', capacity_regular=100)
+    ticket = Ticket.objects.create(event=event, user=buyer, ticket_type='regular', quantity=2,
+                                   expires_at=timezone.now() + timedelta(minutes=30))
+    payment = Payment.objects.create(ticket=ticket, method='vnpay', amount=200000)
+
+    params = {
+        'vnp_Amount': str(int(payment.amount * 100)),
+        'vnp_BankCode': 'NCB',
+        'vnp_ResponseCode': '00',
+        'vnp_TmnCode': 'BENCH001',
+        'vnp_TransactionNo': '14000000',
+        'vnp_TxnRef': f'{payment.id}_{suffix}',
+    }
+    params['vnp_SecureHash'] = vnpay.sign(vnpay.build_query(params), SECRET_KEY)
+
+    barrier = threading.Barrier(min(args.threads, args.callbacks))
+    local = threading.local()
+
+    def fire(index):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+            barrier.wait()  # Mọi thread bắt đầu gửi cùng lúc
+        if index % 3 == 0:
+            response = local.client.get('/payments/return/', params)
+            return f'return:{response.status_code}'
+        response = local.client.get('/payments/ipn/', params)
+        return f"ipn:{response.json()['RspCode']}"
+
+    def close_connection(_):
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        outcomes = Counter(pool.map(fire, range(args.callbacks)))
+        list(pool.map(close_connection, range(args.threads)))
+    elapsed = time.perf_counter() - started
+
+    payment.refresh_from_db()
+    ticket.refresh_from_db()
+    inventory = TicketInventory.objects.get(event=event, ticket_type='regular')
+    email_jobs = Job.objects.filter(kind='ticket_email', payload__ticket_id=ticket.id).count()
+
+    print(f'{args.callbacks} callbacks / {args.threads} threads trong {elapsed:.2f}s')
+    for outcome, count in sorted(outcomes.items()):
+        print(f'  {outcome:<12} {count}')
+    print(f'payment={payment.status} ticket={ticket.status} sold={inventory.sold} '
+          f'remaining={inventory.remaining} email_jobs={email_jobs}')
+
+    checks = {
+        'tối đa một IPN chốt đơn (00), còn lại 02 hoặc return 200': outcomes['ipn:00'] <= 1
+        and set(outcomes) <= {'ipn:00', 'ipn:02', 'return:200'},
+        'payment completed, ticket booked': payment.status == 'completed' and ticket.status == 'booked',
+        'vé được ghi nhận bán đúng một lần': inventory.sold == ticket.quantity,
+        'một job gửi email': email_jobs == 1,
+    }
+    for name, ok in checks.items():
+        print(f"[{'OK' if ok else 'FAIL'}] {name}")
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
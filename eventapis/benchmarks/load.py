@@ -0,0 +1,267 @@
+"""
+Benchmark đầu-cuối cho luồng đăng ký -> đăng nhập -> tìm kiếm -> đặt vé -> thanh toán (IPN VNPay
+giả lập, ký bằng events/vnpay.py) -> nhà tổ chức xác nhận vé, với số người dùng ảo chạy song song cố định.
+
+Mỗi bước ghi thông lượng, độ trễ p50/p95/p99 và số truy vấn SQL mỗi request. Kết quả lưu JSON
+(--output) và có thể so với một lần chạy trước (--baseline): bước nào giảm thông lượng hoặc tăng p95
+quá --tolerance thì thoát với mã lỗi 1.
+
+    python -m benchmarks.load --users 20 --flows 10 --events 200 --output load.json
+    python -m benchmarks.load --users 20 --flows 10 --baseline load.json
+    BENCH_DATABASE=mysql python -m benchmarks.load ...   # MySQL cục bộ theo eventapis/settings.py
+
+Dữ liệu lớn hơn (hàng triệu dòng) tạo bằng `python manage.py seed_scale` rồi chạy với --no-seed: khi đó vé được
+đặt trên tối đa --events sự kiện đã duyệt sắp diễn ra có sẵn trong CSDL, của bất kỳ nhà tổ chức nào.
+"""
+import argparse
+import json
+import platform
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import print_table, setup, summarize
+
+STEPS = ['register', 'login', 'search', 'book', 'pay', 'ipn', 'validate']
+KEYWORDS = ['nhac', 'hoi thao', 'workshop', 'le hoi', 'the thao']
+SECRET_KEY = 'LOADBENCHSECRET'
+
+
+class Recorder:
+    """
+    Gom độ trễ, số truy vấn và lỗi của từng bước từ nhiều thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def call(self, step, func, expected_status):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = func()
+            elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[step].append(elapsed)
+            self.queries[step] += len(context.captured_queries)
+            if response.status_code != expected_status:
+                self.errors[step] += 1
+        if response.status_code != expected_status:
+            raise StepFailed(f'{step}: HTTP {response.status_code} {response.content[:200]!r}')
+        return response
+
+
+class StepFailed(Exception):
+    pass
+
+
+def seed(events, organizer_password, existing=False):
+    """
+    Tạo nhà tổ chức, danh mục và `events` sự kiện đã duyệt (qua ORM để signal tạo tồn kho vé và chỉ mục tìm kiếm).
+    Với `existing`, không tạo sự kiện mà lấy tối đa `events` sự kiện đã duyệt sắp diễn ra có sẵn; nhà tổ chức
+    load-organizer vẫn được tạo để xác nhận vé (mọi nhà tổ chức đã xác minh đều xác nhận được).
+    """
+    from django.conf import settings
+    from django.utils import timezone
+    from oauth2_provider.models import Application
+    from rest_framework.authtoken.models import Token
+
+    from events.models import Category, Event, User
+
+    Application.objects.get_or_create(
+        client_id=settings.DEFAULT_OAUTH2_CLIENT_ID,
+        defaults={'name': 'benchmark', 'client_type': Application.CLIENT_CONFIDENTIAL,
+                  'authorization_grant_type': Application.GRANT_PASSWORD})
+    organizer, created = User.objects.get_or_create(username='load-organizer', defaults={
+        'is_organizer': True, 'is_verified': True, 'email': 'load-organizer@example.com'})
+    if created:
+        organizer.set_password(organizer_password)
+        organizer.save()
+    token, _ = Token.objects.get_or_create(user=organizer)
+    now = timezone.now()
+    if existing:
+        event_ids = list(Event.objects.filter(status='approved', start_time__gt=now)
+                         .order_by('id').values_list('id', flat=True)[:events])
+        return token.key, event_ids
+
+    categories = [Category.objects.get_or_create(name=f'Load {keyword}')[0] for keyword in KEYWORDS]
+    created = Event.objects.filter(organizer=organizer).count()
+    for index in range(created, events):
+        keyword = KEYWORDS[index % len(KEYWORDS)]
+        Event.objects.create(
+            organizer=organizer, category=categories[index % len(categories)], name=f'Sự kiện {keyword} {index}',
+            description=f'Chương trình {keyword} số {index}', location='Hà Nội',
+            start_time=now + timedelta(days=7 + index % 60), end_time=now + timedelta(days=7 + index % 60, hours=3),
+            ticket_price_regular=100000, ticket_price_vip=250000, status='approved',
+            capacity_regular=1_000_000, capacity_vip=1_000_000)
+    event_ids = list(Event.objects.filter(organizer=organizer, status='approved').values_list('id', flat=True))
+    return token.key, event_ids
+
+
+def run_user(index, args, recorder, organizer_token, event_ids, run_id):
+    """
+    Một người dùng ảo: đăng ký, đăng nhập rồi chạy `args.flows` lượt tìm kiếm -> đặt vé -> thanh toán -> check-in.
+    """
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    from events import vnpay
+
+    rng = random.Random(args.seed * 100003 + index)
+    client = APIClient(SERVER_NAME='localhost')
+    organizer = APIClient(SERVER_NAME='localhost')
+    organizer.credentials(HTTP_AUTHORIZATION=f'Token {organizer_token}')
+    username = f'load-{run_id}-{index}'
+    completed = 0
+    try:
+        recorder.call('register', lambda: client.post('/users/register/', {
+            'username': username, 'password': 'load-password', 'first_name': 'Load', 'last_name': str(index)},
+            format='json'), 201)
+        login = recorder.call('login', lambda: client.post('/users/login/', {
+            'username': username, 'password': 'load-password'}, format='json'), 200)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {login.json()['drf_token']}")
+
+        for _ in range(args.flows):
+            try:
+                keyword = rng.choice(KEYWORDS)
+                recorder.call('search', lambda: client.get('/events/search/', {'keyword': keyword}), 200)
+
+                # Phân bố lệch: một phần nhỏ sự kiện nhận phần lớn lượt đặt vé
+                event_id = event_ids[min(int(rng.paretovariate(1.2)) - 1, len(event_ids) - 1)]
+                ticket = recorder.call('book', lambda: client.post(f'/events/{event_id}/tickets/', {
+                    'event_id': event_id, 'ticket_type': 'regular', 'quantity': 1}, format='json'), 201).json()
+
+                payment = recorder.call('pay', lambda: client.post('/payments/', {
+                    'ticket_id': ticket['id'], 'method': 'vnpay'}, format='json'), 201).json()
+                query = parse_qs(urlsplit(payment['payment_url']).query)
+                params = {
+                    'vnp_Amount': query['vnp_Amount'][0], 'vnp_BankCode': 'NCB', 'vnp_ResponseCode': '00',
+                    'vnp_TmnCode': query['vnp_TmnCode'][0], 'vnp_TransactionNo': str(rng.randrange(10 ** 8)),
+                    'vnp_TxnRef': query['vnp_TxnRef'][0],
+                }
+                params['vnp_SecureHash'] = vnpay.sign(vnpay.build_query(params), SECRET_KEY)
+                ipn = recorder.call('ipn', lambda: client.get('/payments/ipn/', params), 200)
+                if ipn.json().get('RspCode') != '00':
+                    raise StepFailed(f"ipn: {ipn.json()}")
+
+                recorder.call('validate', lambda: organizer.post(f"/tickets/{ticket['id']}/validate/", {
+                    'qr_code': ticket['qr_code']}, format='json'), 200)
+                completed += 1
+            except StepFailed as e:
+                if args.verbose:
+                    print(e)
+    except StepFailed as e:
+        if args.verbose:
+            print(e)
+    finally:
+        connection.close()
+    return completed
+
+
+def compare(results, baseline, tolerance):
+    """
+    So sánh với baseline; trả về danh sách mô tả các bước bị chậm đi quá `tolerance` (tỉ lệ, 0.2 = 20%).
+    """
+    regressions = []
+    print(f"\n{'step':<12} {'ops/s':>22} {'p95 ms':>26}")
+    for step in STEPS:
+        current, before = results['steps'].get(step), baseline['steps'].get(step)
+        if not current or not before:
+            continue
+        ops_change = current['ops_per_sec'] / before['ops_per_sec'] - 1 if before['ops_per_sec'] else 0
+        p95_change = current['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0
+        print(f"{step:<12} {before['ops_per_sec']:>9} -> {current['ops_per_sec']:<9} ({ops_change:+.0%})"
+              f" {before['p95_ms']:>9} -> {current['p95_ms']:<9} ({p95_change:+.0%})")
+        if ops_change < -tolerance:
+            regressions.append(f'{step}: thông lượng giảm {-ops_change:.0%}')
+        if p95_change > tolerance:
+            regressions.append(f'{step}: p95 tăng {p95_change:.0%}')
+        # Số truy vấn dao động nhẹ theo cache (tìm kiếm, xác thực); tăng từ nửa truy vấn/request trở lên mới tính
+        if current['queries_per_request'] >= before['queries_per_request'] + 0.5:
+            regressions.append(f"{step}: số truy vấn/request tăng {before['queries_per_request']} -> "
+                               f"{current['queries_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20, help='Số người dùng ảo chạy song song.')
+    parser.add_argument('--flows', type=int, default=10, help='Số lượt đặt vé của mỗi người dùng.')
+    parser.add_argument('--events', type=int, default=200, help='Số sự kiện đã duyệt cần có (với --no-seed: số sự kiện có sẵn tối đa được dùng).')
+    parser.add_argument('--no-seed', action='store_true',
+                        help='Đặt vé trên sự kiện đã duyệt có sẵn (vẫn tạo nhà tổ chức nếu thiếu).')
+    parser.add_argument('--seed', type=int, default=1, help='Seed ngẫu nhiên của người dùng ảo.')
+    parser.add_argument('--output', help='Ghi kết quả JSON ra file.')
+    parser.add_argument('--baseline', help='File JSON của lần chạy trước để so sánh.')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.db import connection
+
+    settings.VNPAY_HASH_SECRET_KEY = SECRET_KEY
+    organizer_token, event_ids = seed(args.events, 'load-password', existing=args.no_seed)
+    if not event_ids:
+        raise SystemExit('Không có sự kiện nào để đặt vé.')
+    connection.close()
+
+    recorder = Recorder()
+    run_id = int(time.time())
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        completed = sum(pool.map(lambda index: run_user(index, args, recorder, organizer_token, event_ids, run_id),
+                                 range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    steps = {}
+    for step in STEPS:
+        latencies = recorder.latencies[step]
+        if latencies:
+            steps[step] = dict(summarize(latencies, elapsed),
+                               queries_per_request=round(recorder.queries[step] / len(latencies), 2),
+                               errors=recorder.errors[step])
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'users': args.users,
+            'flows_per_user': args.flows,
+            'events': len(event_ids),
+        },
+        'elapsed_sec': round(elapsed, 2),
+        'flows_completed': completed,
+        'flows_per_sec': round(completed / elapsed, 2) if elapsed else 0,
+        'steps': steps,
+    }
+
+    print(f"{completed}/{args.users * args.flows} luồng hoàn tất trong {elapsed:.2f}s "
+          f"({results['flows_per_sec']} luồng/s, {connection.vendor}, {args.users} người dùng song song)")
+    print_table([(f"{step} ({stats['queries_per_request']} q/req, {stats['errors']} lỗi)", stats)
+                 for step, stats in steps.items()])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f'[REGRESSION] {regression}')
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
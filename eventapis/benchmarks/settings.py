@@ -0,0 +1,21 @@
+"""
+Settings cho benchmark: kế thừa eventapis.settings, mặc định dùng SQLite tạm và không gửi email thật.
+"""
+import os
+import tempfile
+
+from eventapis.settings import *  # noqa: F401,F403
+
+if os.environ.get('BENCH_DATABASE', 'sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('BENCH_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'eventapis-bench.sqlite3')),
+        }
+    }
+
+ALLOWED_HOSTS = ['*']
+DEFAULT_OAUTH2_CLIENT_ID = 'benchmark-client'
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+# Băm mật khẩu nhanh để benchmark đo phần ứng dụng thay vì PBKDF2
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -0,0 +1,111 @@
+"""
+Đo sức chứa của kênh SSE (events/realtime.py) trong một process: mở hàng chục nghìn kết nối
+/stream/ rảnh trực tiếp trên ứng dụng ASGI (không qua socket), đo bộ nhớ mỗi kết nối bằng
+tracemalloc (thời gian mở kết nối vì vậy gồm cả chi phí của tracemalloc), rồi publish một sự kiện
+cho mọi user từ thread khác và đo độ trễ tới lúc được gửi ra. Token được nạp sẵn vào cache xác thực
+như khi client kết nối lại; thêm --cold để mọi kết nối đầu tiên phải tra CSDL.
+
+    python -m benchmarks.sse_connections --connections 20000 --users 2000
+"""
+import argparse
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from benchmarks import percentile, setup
+
+
+class FakeConnection:
+    """
+    Giả lập phía server ASGI của một kết nối: receive() chờ tới khi đóng, send() ghi nhận thời điểm nhận sự kiện.
+    """
+
+    def __init__(self, loop):
+        self.closed = loop.create_future()
+        self.started = loop.create_future()
+        self.delivered_at = None
+
+    async def receive(self):
+        await self.closed
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.started.set_result(message['status'])
+        elif b'event: ' in message.get('body', b'') and self.delivered_at is None:
+            self.delivered_at = time.perf_counter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--cold', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.authtoken.models import Token
+
+    from events import realtime
+    from events.models import User
+
+    prefix = f'sse-{int(time.time())}'
+    users = User.objects.bulk_create([User(username=f'{prefix}-{i}', password='!') for i in range(args.users)])
+    users = list(User.objects.filter(username__startswith=f'{prefix}-').order_by('id'))
+    tokens = Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+    if not args.cold:
+        for token in tokens:
+            realtime._user_id_for_token(token.key)
+    application = realtime.router(None)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        broker = realtime.get_broker()
+        connections, tasks = [], []
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        for index in range(args.connections):
+            token = tokens[index % len(tokens)].key
+            connection = FakeConnection(loop)
+            scope = {'type': 'http', 'method': 'GET', 'path': realtime.STREAM_PATH,
+                     'query_string': f'token={token}'.encode(), 'headers': []}
+            connections.append(connection)
+            tasks.append(loop.create_task(application(scope, connection.receive, connection.send)))
+        statuses = await asyncio.gather(*(connection.started for connection in connections))
+        opened = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        publish_started = time.perf_counter()
+        publisher = threading.Thread(target=broker.publish_many, args=(
+            [(user.id, 'notification', {'message': 'benchmark'}) for user in users],))
+        publisher.start()
+        while any(connection.delivered_at is None for connection in connections):
+            if time.perf_counter() - publish_started > 60:
+                break
+            await asyncio.sleep(0.05)
+        publisher.join()
+        latencies = sorted(connection.delivered_at - publish_started
+                           for connection in connections if connection.delivered_at is not None)
+
+        for connection in connections:
+            connection.closed.set_result(None)
+        await asyncio.gather(*tasks)
+        return statuses, opened, memory, latencies, broker.connection_count()
+
+    statuses, opened, memory, latencies, remaining = asyncio.run(run())
+    ok = statuses.count(200)
+    print(f'{ok}/{args.connections} kết nối mở trong {opened:.2f}s ({args.users} user)')
+    print(f'bộ nhớ: {memory / 1024 / 1024:.1f} MiB, ~{memory / max(ok, 1) / 1024:.1f} KiB/kết nối')
+    print(f'giao sự kiện: {len(latencies)}/{ok} kết nối, p50={percentile(latencies, 0.5) * 1000:.1f}ms '
+          f'p99={percentile(latencies, 0.99) * 1000:.1f}ms max={percentile(latencies, 1.0) * 1000:.1f}ms')
+    print(f'kết nối còn đăng ký sau khi đóng: {remaining}')
+    if ok != args.connections or len(latencies) != ok or remaining:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
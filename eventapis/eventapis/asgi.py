@@ -2,6 +2,8 @@
 ASGI config for eventapis project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to /stream/ (Server-Sent Events, see events/realtime.py) are served
+outside of Django's request cycle; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "eventapis.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from events.realtime import router  # noqa: E402  (cần Django đã được setup)
+
+application = router(django_application)
@@ -64,6 +64,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Đặt đầu tiên để đo cả thời gian / truy vấn của các middleware phía sau
+    'events.metrics.MetricsMiddleware',
+    'events.middleware.QueryInstrumentationMiddleware',
+    'events.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -156,6 +160,16 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Cache dùng cho response công khai (events/caching.py).
+# Local-memory chỉ phù hợp khi chạy một process; nhiều worker cần backend dùng chung như Redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eventapis',
+    }
+}
+EVENTS_CACHE_ALIAS = 'default'
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
@@ -181,12 +195,16 @@ cloudinary.config(
 # Cấu hình cho REST framework để sử dụng OAuth2 cho xác thực
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
+        # Giống TokenAuthentication / OAuth2Authentication nhưng cache token -> user (events/authentication.py)
+        'events.authentication.CachedTokenAuthentication',
+        'events.authentication.CachedOAuth2Authentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Phân trang keyset (cursor), không dùng OFFSET
+    'DEFAULT_PAGINATION_CLASS': 'events.paginators.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 
 # Cấu hình cho OAuth2 provider, sử dụng JSONAuthLibCore để xử lý xác thực
@@ -199,6 +217,54 @@ OAUTH2_PROVIDER = {
     'SCOPES': {'read': 'Read scope', 'write': 'Write scope'},
 }
 
+# Bộ đếm like / interest / đánh giá ghi trễ: số giây tối đa giữ delta trong bộ đệm và số sự kiện tối đa chờ ghi
+COUNTER_FLUSH_INTERVAL = 5
+COUNTER_FLUSH_MAX_PENDING = 500
+
+# Kênh đẩy thời gian thực (SSE tại /stream/ khi chạy ASGI): broker và chu kỳ heartbeat (giây).
+# InMemoryBroker chỉ giao trong một process; chạy nhiều worker ASGI thì dùng 'events.realtime.RedisBroker'
+REALTIME_BROKER = 'events.realtime.InMemoryBroker'
+REALTIME_HEARTBEAT_SECONDS = 25
+
+# Chứng chỉ Google (xác thực ID token) được cache theo max-age; hết hạn chưa quá số giây này thì vẫn dùng bản cũ
+# trong khi tải lại ở nền
+GOOGLE_CERTS_STALE_SECONDS = 300
+
+# Đo truy vấn theo action (events/middleware.py): header Server-Timing và số truy vấn tối đa của action nóng.
+# Vượt ngân sách thì ghi log; QUERY_BUDGETS_STRICT = True (khi chạy test) thì raise QueryBudgetExceeded
+SERVER_TIMING_HEADER = True
+QUERY_BUDGETS = {
+    'EventViewSet.list': 3,
+    'EventViewSet.search': 5,
+    'EventViewSet.reviews': 4,
+    'CategoryViewSet.list': 2,
+    'TicketViewSet.ticket_history': 3,
+    'NotificationViewSet.list': 3,
+    'NotificationViewSet.unread_count': 2,
+    'OrganizerViewSet.report': 4,
+}
+QUERY_BUDGETS_STRICT = False
+
+# Profile request thật (events/profiling.py): 0 = chỉ profile request có header X-Profile hợp lệ,
+# N = thêm ngẫu nhiên 1/N request. Profile lưu ở PROFILING_DIR, xem tại trang admin profiles/
+PROFILING_SAMPLE_EVERY = 0
+PROFILING_INTERVAL = 0.002
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_PER_ACTION = 50
+PROFILING_TOKEN_MAX_AGE = 3600
+
+# Số liệu Prometheus tại /metrics (events/metrics.py): mỗi worker ghi file mmap vào METRICS_DIR (thư mục dùng
+# chung của các worker; file của worker đã dừng được gộp khi scrape). METRICS_TOKEN: yêu cầu header Authorization: Bearer <token>
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_TOKEN = None
+
+# Số access token còn hạn tối đa của mỗi user; đăng nhập thêm sẽ thu hồi token cũ nhất
+OAUTH2_MAX_ACTIVE_TOKENS_PER_USER = 5
+
+# Cache xác thực token trong process: số token tối đa và thời gian sống (giây)
+AUTH_CACHE_MAXSIZE = 10000
+AUTH_CACHE_TTL = 60
+
 AUTHENTICATION_BACKENDS = (
     "django.contrib.auth.backends.ModelBackend",
     "allauth.account.auth_backends.AuthenticationBackend"
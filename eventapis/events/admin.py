@@ -1,14 +1,15 @@
 from django.contrib import admin
-from django.db.models import Count, Sum, Avg
-from django.db.models.functions import TruncMonth, TruncQuarter, ExtractQuarter
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
 from django.template.response import TemplateResponse
 from django import forms
 from django.urls import path
 from django.utils.html import mark_safe
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
 from .models import User, OrganizerRequest, Category, Event, EventTag, Ticket, Payment, Like, Interest, Review, \
-    Notification
-from django.db.models import Q
+    Notification, Job, EventDailyStat, MonthlyEventStat
+from . import caching, middleware, profiling, reports
+from django.http import Http404, HttpResponse, JsonResponse
 from datetime import datetime
 from django.utils import timezone
 
@@ -22,15 +23,71 @@ class MyAdminSite(admin.AdminSite):
             path('event-stats/', self.event_stats_view, name='event-stats'),
             path('organizer-stats/', self.organizer_stats_view, name='organizer-stats'),
             path('admin-stats/', self.admin_stats_view, name='admin-stats'),
+            path('cache-stats/', self.cache_stats_view, name='cache-stats'),
+            path('query-stats/', self.query_stats_view, name='query-stats'),
+            path('profiles/', self.profiles_view, name='profiles'),
         ] + super().get_urls()
 
+    def cache_stats_view(self, request):
+        """
+        Tỉ lệ hit và độ trễ của cache response theo từng nhóm (trong process hiện tại).
+        """
+        if not request.user.is_staff:
+            return TemplateResponse(request, 'admin/error.html', {
+                'message': 'Bạn cần có quyền quản trị viên để xem báo cáo này.'
+            })
+        return JsonResponse(caching.stats())
+
+    def query_stats_view(self, request):
+        """
+        Số truy vấn, thời gian SQL / serialize và truy vấn lặp theo từng action (trong process hiện tại).
+        """
+        if not request.user.is_staff:
+            return TemplateResponse(request, 'admin/error.html', {
+                'message': 'Bạn cần có quyền quản trị viên để xem báo cáo này.'
+            })
+        return JsonResponse(middleware.stats())
+
+    def profiles_view(self, request):
+        """
+        Danh sách profile đã lấy mẫu theo action; ?action=&profile= để xem cây gọi hàm, thêm &raw=1 để tải file folded.
+        """
+        if not request.user.is_staff:
+            return TemplateResponse(request, 'admin/error.html', {
+                'message': 'Bạn cần có quyền quản trị viên để xem báo cáo này.'
+            })
+
+        action, name = request.GET.get('action'), request.GET.get('profile')
+        tree = None
+        if action and name:
+            try:
+                folded = profiling.read_profile(action, name)
+            except FileNotFoundError:
+                raise Http404('Không tìm thấy profile.')
+            if request.GET.get('raw'):
+                response = HttpResponse(folded, content_type='text/plain; charset=utf-8')
+                response['Content-Disposition'] = f'attachment; filename="{action}-{name}"'
+                return response
+            tree = profiling.build_tree(folded)
+
+        return TemplateResponse(request, 'admin/profiles.html', {
+            'profiles': profiling.list_profiles(),
+            'action': action,
+            'profile': name,
+            'tree': tree,
+            'token': profiling.make_token(),
+        })
+
     def event_stats_view(self, request):
         if not request.user.is_organizer:
             return TemplateResponse(request, 'admin/error.html', {
                 'message': 'Bạn cần có quyền quản trị viên để xem báo cáo này.'
             })
 
-        stats = Event.objects.annotate(ticket_count=Count('ticket__id')).values('id', 'name', 'ticket_count')
+        # Đọc từ bảng thống kê cộng dồn thay vì đếm trên bảng Ticket
+        stats = Event.objects.annotate(
+            ticket_count=Coalesce(Sum('daily_stats__tickets_booked'), 0)
+        ).values('id', 'name', 'ticket_count')
         return TemplateResponse(request, 'admin/event_stats.html', {
             'stats': stats
         })
@@ -41,27 +98,18 @@ class MyAdminSite(admin.AdminSite):
                 'message': 'Bạn cần có quyền nhà tổ chức để xem báo cáo này.'
             })
 
-        # Lấy danh sách sự kiện của nhà tổ chức
-        events = Event.objects.filter(organizer=request.user, active=True)
-
-        # Thống kê vé đã bán và giá vé của sự kiện
-        ticket_stats = events.annotate(
-            total_tickets=Count('ticket__id', filter=Q(ticket__status='booked'))
-        ).values('id', 'name', 'total_tickets', 'ticket_price')
-
-        # Tính total_revenue trong Python
-        for stat in ticket_stats:
-            stat['total_revenue'] = stat['total_tickets'] * stat['ticket_price'] if stat['total_tickets'] and stat[
-                'ticket_price'] else 0
-
-        # Thống kê phản hồi
-        review_stats = Review.objects.filter(event__organizer=request.user).values(
-            'event__name', 'rating', 'comment'
-        ).annotate(avg_rating=Avg('rating'))
+        try:
+            date_from, date_to = reports.parse_date_range(request.GET)
+        except ValueError as ex:
+            return TemplateResponse(request, 'admin/error.html', {'message': str(ex)})
 
+        report = reports.organizer_report(request.user, date_from, date_to)
         return TemplateResponse(request, 'admin/organizer_stats.html', {
-            'ticket_stats': ticket_stats,
-            'review_stats': review_stats,
+            'ticket_stats': report['events'],
+            'review_stats': [row for row in report['events'] if row['review_count']],
+            'totals': report['totals'],
+            'date_from': date_from,
+            'date_to': date_to,
         })
 
     def admin_stats_view(self, request):
@@ -70,37 +118,23 @@ class MyAdminSite(admin.AdminSite):
                 'message': 'Bạn cần có quyền quản trị viên để xem báo cáo này.'
             })
 
-        monthly_events = Event.objects.annotate(
-            month=TruncMonth('event_time')
-        ).values('month').annotate(
-            event_count=Count('id')
-        ).order_by('month')
-
-        quarterly_events = Event.objects.annotate(
-            quarter=TruncQuarter('event_time'),
-            quarter_number=ExtractQuarter('event_time')
-        ).values('quarter', 'quarter_number').annotate(
-            event_count=Count('id')
-        ).order_by('quarter')
-
-        monthly_attendees = Ticket.objects.filter(status='booked').annotate(
-            month=TruncMonth('event__event_time')
-        ).values('month').annotate(
-            attendee_count=Count('id')
-        ).order_by('month')
-
-        quarterly_attendees = Ticket.objects.filter(status='booked').annotate(
-            quarter=TruncQuarter('event__event_time'),
-            quarter_number=ExtractQuarter('event__event_time')
-        ).values('quarter', 'quarter_number').annotate(
-            attendee_count=Count('id')
-        ).order_by('quarter')
+        # Đọc từ bảng cộng dồn theo tháng (vài chục dòng), không group by trên bảng Event / Ticket
+        months = list(MonthlyEventStat.objects.order_by('month'))
+        quarters = {}
+        for stat in months:
+            number = (stat.month.month - 1) // 3 + 1
+            quarter = quarters.setdefault((stat.month.year, number), {
+                'quarter': stat.month.replace(month=number * 3 - 2), 'quarter_number': number,
+                'event_count': 0, 'attendee_count': 0})
+            quarter['event_count'] += stat.event_count
+            quarter['attendee_count'] += stat.attendee_count
+        quarters = list(quarters.values())
 
         return TemplateResponse(request, 'admin/admin_stats.html', {
-            'monthly_events': monthly_events,
-            'quarterly_events': quarterly_events,
-            'monthly_attendees': monthly_attendees,
-            'quarterly_attendees': quarterly_attendees,
+            'monthly_events': [stat for stat in months if stat.event_count],
+            'quarterly_events': [quarter for quarter in quarters if quarter['event_count']],
+            'monthly_attendees': [stat for stat in months if stat.attendee_count],
+            'quarterly_attendees': [quarter for quarter in quarters if quarter['attendee_count']],
         })
 
 
@@ -215,6 +249,20 @@ class NotificationAdmin(admin.ModelAdmin):
     message_preview.short_description = 'Message'
 
 
+# Custom Admin for Job
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'attempts', 'run_after', 'created_at']
+    search_fields = ['kind', 'dedupe_key']
+    list_filter = ['kind', 'status']
+
+
+# Custom Admin for EventDailyStat
+class EventDailyStatAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'date', 'ticket_type', 'tickets_booked', 'revenue', 'tickets_cancelled']
+    search_fields = ['event__name']
+    list_filter = ['ticket_type', 'date']
+
+
 # Register models with admin site
 admin_site.register(User, UserAdmin)
 admin_site.register(OrganizerRequest, OrganizerRequestAdmin)
@@ -227,3 +275,5 @@ admin_site.register(Like, LikeAdmin)
 admin_site.register(Interest, InterestAdmin)
 admin_site.register(Review, ReviewAdmin)
 admin_site.register(Notification, NotificationAdmin)
+admin_site.register(Job, JobAdmin)
+admin_site.register(EventDailyStat, EventDailyStatAdmin)
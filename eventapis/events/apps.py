@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class EventsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "events"
+
+    def ready(self):
+        from events import signals  # noqa: F401 - đăng ký các signal handler
+
+        if 'events.middleware.QueryInstrumentationMiddleware' in settings.MIDDLEWARE:
+            from events import middleware
+            middleware.install()
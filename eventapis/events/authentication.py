@@ -0,0 +1,93 @@
+"""
+Xác thực DRF Token và OAuth2 access token có cache trong process.
+
+Mỗi request đã đăng nhập vốn phải tra bảng token và join bảng user. Các lớp ở đây giữ
+ánh xạ token -> user trong một cache giới hạn kích thước và thời gian sống (AUTH_CACHE_TTL,
+mặc định 60 giây); access token hết hạn sớm hơn TTL thì hết hiệu lực đúng lúc hết hạn.
+Đăng xuất và xóa token gọi invalidate để process hiện tại không dùng lại token đã thu hồi;
+các process khác có thể dùng lại tối đa AUTH_CACHE_TTL giây.
+"""
+import copy
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from rest_framework.authentication import TokenAuthentication
+
+
+class AuthCache:
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is None:
+            return None
+        user, token, expires = entry
+        if expires is not None and expires <= timezone.now():
+            self.invalidate(key)
+            return None
+        # Mỗi request nhận bản sao user để view sửa đối tượng không ảnh hưởng request khác
+        return copy.copy(user), token
+
+    def set(self, key, user, token, expires=None):
+        with self._lock:
+            self._cache[key] = (user, token, expires)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [key for key, entry in self._cache.items() if entry[0].pk == user_id]:
+                self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+auth_cache = AuthCache(maxsize=getattr(settings, 'AUTH_CACHE_MAXSIZE', 10000),
+                       ttl=getattr(settings, 'AUTH_CACHE_TTL', 60))
+
+
+def drf_token_key(key):
+    return f'drf:{key}'
+
+
+def oauth2_token_key(token):
+    return f'oauth2:{token}'
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = auth_cache.get(drf_token_key(key))
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        auth_cache.set(drf_token_key(key), user, token)
+        return user, token
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    def authenticate(self, request):
+        if request is None:
+            return None
+        parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+        bearer = parts[1] if len(parts) == 2 and parts[0].lower() == 'bearer' else None
+
+        if bearer:
+            cached = auth_cache.get(oauth2_token_key(bearer))
+            if cached is not None:
+                return cached
+
+        result = super().authenticate(request)
+        if result is not None and bearer:
+            user, access_token = result
+            auth_cache.set(oauth2_token_key(bearer), user, access_token, expires=access_token.expires)
+        return result
@@ -0,0 +1,120 @@
+"""
+Cache response công khai (danh sách sự kiện, tìm kiếm, danh mục) theo số phiên bản.
+
+Mỗi nhóm dữ liệu có một bộ đếm phiên bản trong cache; khóa cache của response chứa
+phiên bản hiện tại. Khi dữ liệu thay đổi (duyệt/từ chối/sửa sự kiện, sửa danh mục),
+bump() tăng phiên bản nên mọi response cũ tự động không còn được dùng. Bộ đếm like / quan tâm / đánh giá
+thay đổi liên tục nên không bump; chúng được làm mới khi response hết hạn sau RESPONSE_TIMEOUT.
+Backend lấy theo settings.EVENTS_CACHE_ALIAS (mặc định 'default', local-memory);
+khi chạy nhiều process cần trỏ tới backend dùng chung (Redis, Memcached) để bump có hiệu lực ở mọi nơi.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+RESPONSE_TIMEOUT = 60 * 60
+
+# Nhóm dữ liệu -> các phiên bản mà response của nhóm đó phụ thuộc
+DEPENDENCIES = {
+    'events': ('events', 'categories'),
+    'search': ('events', 'categories'),
+    'categories': ('categories',),
+}
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def get_cache():
+    return caches[getattr(settings, 'EVENTS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(name):
+    return f'cachever:{name}'
+
+
+def bump(*names):
+    """
+    Tăng phiên bản của các nhóm dữ liệu, làm mọi response đã cache của chúng hết hiệu lực.
+    """
+    cache = get_cache()
+    for name in names:
+        key = _version_key(name)
+        # Khởi tạo theo thời gian để phiên bản không bị lặp lại nếu khóa phiên bản bị cache xóa
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def _versions(cache, names):
+    keys = [_version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return ':'.join(str(versions.get(key, 0)) for key in keys)
+
+
+def _params_key(request):
+    # Chuẩn hóa query string: bỏ tham số rỗng, sắp xếp để ?a=1&b=2 và ?b=2&a=1 dùng chung cache
+    params = sorted((key, value.strip()) for key, values in request.query_params.lists()
+                    for value in values if value.strip())
+    return hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+
+
+def cached_response(family, request, build):
+    """
+    Trả về Response đã cache của `family` cho query string của request; nếu chưa có thì gọi
+    build() và lưu response.data khi thành công.
+    """
+    started = time.perf_counter()
+    cache = get_cache()
+    key = f'resp:{family}:{_versions(cache, DEPENDENCIES[family])}:{_params_key(request)}'
+    data = cache.get(key)
+    if data is not None:
+        _record(family, True, time.perf_counter() - started)
+        return Response(data)
+
+    response = build()
+    if response.status_code == 200:
+        cache.set(key, response.data, RESPONSE_TIMEOUT)
+    _record(family, False, time.perf_counter() - started)
+    return response
+
+
+def _record(family, hit, seconds):
+    with _stats_lock:
+        stat = _stats.setdefault(family, {'hits': 0, 'misses': 0, 'hit_seconds': 0.0, 'miss_seconds': 0.0})
+        if hit:
+            stat['hits'] += 1
+            stat['hit_seconds'] += seconds
+        else:
+            stat['misses'] += 1
+            stat['miss_seconds'] += seconds
+
+
+def stats():
+    """
+    Tỉ lệ hit và độ trễ trung bình (ms) theo từng nhóm, tính trong process hiện tại.
+    """
+    with _stats_lock:
+        snapshot = {family: dict(stat) for family, stat in _stats.items()}
+    result = {}
+    for family, stat in snapshot.items():
+        total = stat['hits'] + stat['misses']
+        result[family] = {
+            'hits': stat['hits'],
+            'misses': stat['misses'],
+            'hit_ratio': round(stat['hits'] / total, 4) if total else 0,
+            'avg_hit_ms': round(stat['hit_seconds'] * 1000 / stat['hits'], 3) if stat['hits'] else None,
+            'avg_miss_ms': round(stat['miss_seconds'] * 1000 / stat['misses'], 3) if stat['misses'] else None,
+        }
+    return result
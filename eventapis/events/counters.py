@@ -0,0 +1,132 @@
+"""
+Bộ đếm like / interest / review của sự kiện, ghi trễ theo lô (write-behind).
+
+Mỗi lượt like, quan tâm hay đánh giá chỉ cộng delta vào bộ đệm trong process; bộ đệm gộp các
+delta theo sự kiện và ghi xuống bảng Event bằng một lệnh UPDATE ... SET x = x + n cho mỗi sự kiện
+khi đủ COUNTER_FLUSH_MAX_PENDING sự kiện hoặc sau COUNTER_FLUSH_INTERVAL giây (một thread nền
+đảm bảo delta không nằm chờ quá lâu khi không có request mới). COUNTER_FLUSH_INTERVAL = 0 ghi ngay.
+Delta chưa ghi sẽ mất nếu process bị kill; lệnh recount_event_counters tính lại từ bảng gốc.
+Ghi bộ đếm không bump phiên bản cache (xem caching.py): danh sách / tìm kiếm đã cache có thể hiển thị
+bộ đếm cũ tối đa caching.RESPONSE_TIMEOUT; response của like / quan tâm vẫn trả số mới (buffer.current).
+"""
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+
+from events import caching
+from events.models import Event, Interest, Like, Review
+
+FIELDS = ('like_count', 'interest_count', 'rating_sum', 'rating_count')
+
+
+def _apply(field, delta):
+    if delta >= 0:
+        return F(field) + delta
+    # Không để bộ đếm âm (cột không dấu trên MySQL)
+    return Case(When(**{f'{field}__gte': -delta}, then=F(field) + delta), default=Value(0))
+
+
+class CounterBuffer:
+    def __init__(self, flush_interval, max_pending):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._deltas = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def add(self, event_id, **deltas):
+        with self._lock:
+            self._deltas[event_id].update(deltas)
+            due = (len(self._deltas) >= self.max_pending
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+        else:
+            self._ensure_timer()
+
+    def pending(self, event_id, field):
+        with self._lock:
+            return self._deltas.get(event_id, {}).get(field, 0)
+
+    def current(self, event, field):
+        """
+        Giá trị bộ đếm gồm cả delta chưa ghi xuống CSDL.
+        """
+        return max(getattr(event, field) + self.pending(event.id, field), 0)
+
+    def flush(self):
+        """
+        Ghi toàn bộ delta đang chờ xuống bảng Event. Trả về số sự kiện được cập nhật.
+        """
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._deltas = self._deltas, defaultdict(Counter)
+                self._last_flush = time.monotonic()
+            changes = {event_id: {field: _apply(field, delta) for field, delta in counter.items() if delta}
+                       for event_id, counter in deltas.items()}
+            changes = {event_id: values for event_id, values in changes.items() if values}
+            if not changes:
+                return 0
+            with transaction.atomic():
+                for event_id, values in changes.items():
+                    Event.objects.filter(id=event_id).update(**values)
+            return len(changes)
+
+    def _ensure_timer(self):
+        with self._lock:
+            if self._timer is not None and self._timer.is_alive():
+                return
+            self._timer = threading.Thread(target=self._run_timer, name='event-counter-flush', daemon=True)
+            self._timer.start()
+
+    def _run_timer(self):
+        try:
+            while True:
+                time.sleep(self.flush_interval)
+                with self._lock:
+                    if not self._deltas:
+                        self._timer = None
+                        return
+                self.flush()
+        finally:
+            connection.close()  # Kết nối CSDL của thread nền
+
+
+buffer = CounterBuffer(flush_interval=getattr(settings, 'COUNTER_FLUSH_INTERVAL', 5),
+                       max_pending=getattr(settings, 'COUNTER_FLUSH_MAX_PENDING', 500))
+atexit.register(buffer.flush)
+
+
+def add(event_id, **deltas):
+    """
+    Cộng delta vào bộ đếm của sự kiện sau khi transaction hiện tại commit.
+    """
+    transaction.on_commit(lambda: buffer.add(event_id, **deltas))
+
+
+def recount(event_ids=None):
+    """
+    Tính lại toàn bộ bộ đếm từ bảng Like / Interest / Review. Trả về số sự kiện đã cập nhật.
+    """
+    buffer.flush()
+    events = Event.objects.all() if event_ids is None else Event.objects.filter(id__in=event_ids)
+    totals = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    for model, field in ((Like, 'like_count'), (Interest, 'interest_count')):
+        for row in model.objects.filter(event__in=events).values('event_id').annotate(total=Count('id')).order_by():
+            totals[row['event_id']][field] = row['total']
+    for row in Review.objects.filter(event__in=events).values('event_id').annotate(
+            total=Count('id'), rating=Sum('rating')).order_by():
+        totals[row['event_id']].update(rating_count=row['total'], rating_sum=row['rating'])
+
+    updated = 0
+    for event_id in events.values_list('id', flat=True).iterator():
+        updated += events.filter(id=event_id).exclude(**totals[event_id]).update(**totals[event_id])
+    caching.bump('events')
+    return updated
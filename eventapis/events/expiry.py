@@ -0,0 +1,54 @@
+"""
+Hủy hàng loạt vé chờ thanh toán đã quá hạn (expires_at) và hoàn lại số vé đã giữ chỗ.
+
+Mỗi lô khóa tối đa `batch_size` vé bằng SELECT ... FOR UPDATE SKIP LOCKED (qua index
+(status, expires_at)), rồi hủy vé, đánh dấu thanh toán thất bại và hoàn vé bằng vài lệnh
+UPDATE theo tập hợp. Nhiều worker có thể chạy song song mà không xử lý trùng vé.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from events import inventory, metrics, realtime, rollups
+from events.models import Payment, Ticket
+
+
+def expire_batch(batch_size=1000, now=None):
+    """
+    Hủy một lô vé hết hạn. Trả về (số vé đã hủy, số thanh toán bị đánh dấu hết hạn).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(
+            Ticket.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('id', 'event_id', 'ticket_type', 'quantity', 'user_id')[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+        ids = [row[0] for row in rows]
+        cancelled = Ticket.objects.filter(id__in=ids, status='pending').update(status='cancelled', updated_date=now)
+        # 'expired' thay vì 'failed': VNPay vẫn có thể báo thanh toán thành công sau đó (xem payments.finalize_payment)
+        failed = Payment.objects.filter(ticket_id__in=ids, status='pending').update(status='expired', updated_date=now)
+        held = [row[1:4] for row in rows]
+        inventory.release_many(held)
+        rollups.record_cancellations(held)
+        metrics.ticket_status('cancelled', cancelled)
+        realtime.publish_many_on_commit(
+            (user_id, 'ticket', {'ticket_id': ticket_id, 'event_id': event_id, 'status': 'cancelled'})
+            for ticket_id, event_id, _, _, user_id in rows)
+    return cancelled, failed
+
+
+def expire_pending_tickets(batch_size=1000):
+    """
+    Chạy expire_batch() cho tới khi không còn vé hết hạn. Trả về tổng (số vé, số thanh toán).
+    """
+    now = timezone.now()
+    total_tickets = total_payments = 0
+    while True:
+        tickets, payments = expire_batch(batch_size, now)
+        total_tickets += tickets
+        total_payments += payments
+        if tickets < batch_size:
+            return total_tickets, total_payments
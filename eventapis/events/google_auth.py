@@ -0,0 +1,153 @@
+"""
+Xác thực Google ID token mà không gọi HTTPS tới Google ở mỗi lượt đăng nhập.
+
+google.oauth2.id_token tải chứng chỉ ký của Google (oauth2/v1/certs) mỗi lần verify. Transport
+CachingRequest giữ phản hồi GET trong process theo Cache-Control: max-age của Google (thường vài giờ):
+- còn hạn: trả ngay từ bộ nhớ;
+- vừa hết hạn (trong GOOGLE_CERTS_STALE_SECONDS): vẫn trả bản cũ và tải lại ở thread nền;
+- chưa có hoặc quá cũ: tải đồng bộ, mỗi URL chỉ một request tải tại một thời điểm (các request khác chờ kết quả).
+
+StaticCertsRequest là transport giả trả về chứng chỉ cho trước, dùng cho test và benchmark.
+"""
+import json
+import logging
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from google.auth import transport
+from google.auth.transport import requests as google_requests
+from google.oauth2 import id_token
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 3600
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class CachedResponse(transport.Response):
+    def __init__(self, status, headers, data):
+        self._status = status
+        self._headers = headers
+        self._data = data
+
+    @property
+    def status(self):
+        return self._status
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def data(self):
+        return self._data
+
+
+def max_age(headers):
+    """
+    Số giây được phép cache theo header Cache-Control (mặc định DEFAULT_MAX_AGE, no-store/no-cache = 0).
+    """
+    cache_control = headers.get('Cache-Control') or headers.get('cache-control') or ''
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+class CachingRequest(transport.Request):
+    """
+    Transport google-auth có cache cho request GET, dùng chung trong process (an toàn giữa các thread).
+    """
+
+    def __init__(self, inner=None, stale_seconds=300):
+        # Dùng lại một requests.Session để giữ kết nối TLS tới Google giữa các lần tải
+        self._inner = inner or google_requests.Request(session=requests.Session())
+        self.stale_seconds = stale_seconds
+        self._entries = {}  # url -> (response, expires_at)
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        self._refreshing = set()
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        if method != 'GET' or body is not None:
+            return self._inner(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is not None:
+            response, expires_at = entry
+            if now < expires_at:
+                return response
+            if now < expires_at + self.stale_seconds:
+                self._refresh_in_background(url, timeout)
+                return response
+        return self._fetch(url, timeout, entry)
+
+    def _fetch(self, url, timeout, seen_entry):
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(url, threading.Lock())
+        with fetch_lock:
+            with self._lock:
+                entry = self._entries.get(url)
+            if entry is not None and entry is not seen_entry and time.monotonic() < entry[1]:
+                return entry[0]  # Thread khác vừa tải xong
+            response = self._inner(url, method='GET', timeout=timeout)
+            if response.status == 200:
+                cached = CachedResponse(response.status, dict(response.headers), response.data)
+                ttl = max_age(cached.headers)
+                if ttl:
+                    with self._lock:
+                        self._entries[url] = (cached, time.monotonic() + ttl)
+                return cached
+            return response
+
+    def _refresh_in_background(self, url, timeout):
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def refresh():
+            try:
+                self._fetch(url, timeout, None)
+            except Exception:
+                logger.exception('Không tải lại được %s', url)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(url)
+
+        threading.Thread(target=refresh, name='google-certs-refresh', daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class StaticCertsRequest(transport.Request):
+    """
+    Transport giả: trả `certs` ({key id: chứng chỉ PEM}) cho mọi request, không ra mạng.
+    """
+
+    def __init__(self, certs, max_age_seconds=DEFAULT_MAX_AGE):
+        self.certs = certs
+        self.max_age_seconds = max_age_seconds
+        self.calls = 0
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        self.calls += 1
+        return CachedResponse(200, {'Cache-Control': f'public, max-age={self.max_age_seconds}'},
+                              json.dumps(self.certs).encode('utf-8'))
+
+
+request = CachingRequest(stale_seconds=getattr(settings, 'GOOGLE_CERTS_STALE_SECONDS', 300))
+
+
+def verify(token, client_id=None):
+    """
+    Kiểm tra Google ID token, trả về các claim. Báo ValueError nếu token không hợp lệ.
+    """
+    return id_token.verify_oauth2_token(token, request, client_id or settings.GOOGLE_CLIENT_ID)
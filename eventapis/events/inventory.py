@@ -0,0 +1,97 @@
+"""
+Quản lý số vé còn lại của sự kiện.
+
+Mọi thao tác đều là một lệnh UPDATE có điều kiện trên đúng một dòng TicketInventory
+(ví dụ: UPDATE ... SET remaining = remaining - n WHERE remaining >= n), nên nhiều
+request đồng thời không bao giờ bán quá số vé và không cần khóa cả bảng.
+Sự kiện không khai báo capacity (không có dòng TicketInventory) được xem là không giới hạn.
+"""
+from collections import defaultdict
+
+from django.db.models import Case, F, Sum, Value, When
+
+from events.models import Ticket, TicketInventory
+
+TICKET_TYPES = ('regular', 'vip')
+
+
+def reserve(event_id, ticket_type, quantity):
+    """
+    Giữ chỗ `quantity` vé. Trả về False nếu không còn đủ vé.
+    """
+    updated = TicketInventory.objects.filter(
+        event_id=event_id, ticket_type=ticket_type, remaining__gte=quantity
+    ).update(remaining=F('remaining') - quantity)
+    if updated:
+        return True
+    # Không cập nhật được: hoặc đã hết vé, hoặc sự kiện không giới hạn số vé
+    return not TicketInventory.objects.filter(event_id=event_id, ticket_type=ticket_type).exists()
+
+
+def release(event_id, ticket_type, quantity):
+    """
+    Trả lại `quantity` vé đã giữ chỗ (vé bị hủy hoặc hết hạn thanh toán).
+    """
+    TicketInventory.objects.filter(event_id=event_id, ticket_type=ticket_type).update(
+        remaining=F('remaining') + quantity
+    )
+
+
+def release_many(rows):
+    """
+    Trả lại vé cho nhiều vé cùng lúc. `rows` là các bộ (event_id, ticket_type, quantity);
+    số lượng được cộng dồn để mỗi loại vé của mỗi sự kiện chỉ tốn một lệnh UPDATE.
+    """
+    totals = defaultdict(int)
+    for event_id, ticket_type, quantity in rows:
+        totals[(event_id, ticket_type)] += quantity
+    for (event_id, ticket_type), quantity in totals.items():
+        release(event_id, ticket_type, quantity)
+
+
+def commit(event_id, ticket_type, quantity):
+    """
+    Ghi nhận `quantity` vé đã giữ chỗ được thanh toán thành công.
+    """
+    TicketInventory.objects.filter(event_id=event_id, ticket_type=ticket_type).update(
+        sold=F('sold') + quantity
+    )
+
+
+def sync_capacity(event):
+    """
+    Đồng bộ bảng TicketInventory với capacity_regular / capacity_vip của sự kiện.
+    Khi tạo mới, số vé còn lại trừ đi các vé đang giữ chỗ hoặc đã đặt;
+    khi thay đổi capacity, số vé còn lại được điều chỉnh theo chênh lệch.
+    """
+    inventories = {inv.ticket_type: inv for inv in TicketInventory.objects.filter(event=event)}
+    for ticket_type in TICKET_TYPES:
+        capacity = getattr(event, f'capacity_{ticket_type}')
+        inventory = inventories.get(ticket_type)
+
+        if capacity is None:
+            if inventory:
+                inventory.delete()
+            continue
+
+        if inventory is None:
+            held = Ticket.objects.filter(
+                event=event, ticket_type=ticket_type, status__in=['pending', 'booked']
+            ).aggregate(total=Sum('quantity'))['total'] or 0
+            sold = Ticket.objects.filter(
+                event=event, ticket_type=ticket_type, status='booked'
+            ).aggregate(total=Sum('quantity'))['total'] or 0
+            TicketInventory.objects.create(event=event, ticket_type=ticket_type, capacity=capacity,
+                                           remaining=max(capacity - held, 0), sold=sold)
+        elif inventory.capacity > capacity:
+            # Giảm capacity: không để remaining âm (cột không dấu trên MySQL)
+            shrink = inventory.capacity - capacity
+            TicketInventory.objects.filter(pk=inventory.pk).update(
+                capacity=capacity,
+                remaining=Case(When(remaining__gte=shrink, then=F('remaining') - shrink), default=Value(0))
+            )
+        elif inventory.capacity < capacity:
+            TicketInventory.objects.filter(pk=inventory.pk).update(
+                capacity=capacity,
+                remaining=F('remaining') + (capacity - inventory.capacity)
+            )
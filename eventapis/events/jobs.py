@@ -0,0 +1,187 @@
+"""
+Hàng đợi job chạy nền lưu trong bảng Job.
+
+- enqueue(): thêm job, có thể kèm dedupe_key để một việc chỉ được tạo một lần.
+- run_pending(): lấy một lô job đến hạn, chạy handler theo từng loại, thử lại với backoff khi lỗi.
+Worker chạy bằng lệnh: python manage.py run_jobs
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from events import caching, metrics, notifications, search
+from events.models import Event, Job, Ticket
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+STALE_AFTER = timedelta(minutes=10)
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """
+    Đăng ký handler cho một loại job. Handler nhận danh sách Job cùng loại
+    và trả về dict {job.id: lỗi} cho các job thất bại.
+    """
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, dedupe_key=None, run_after=None):
+    """
+    Thêm job vào hàng đợi. Nếu đã có job cùng dedupe_key thì trả về job cũ.
+    Gọi trong transaction của request để job chỉ xuất hiện khi dữ liệu đã được commit.
+    """
+    defaults = {'kind': kind, 'payload': payload, 'run_after': run_after or timezone.now()}
+    if dedupe_key is None:
+        return Job.objects.create(**defaults)
+    job, _ = Job.objects.get_or_create(dedupe_key=dedupe_key, defaults=defaults)
+    return job
+
+
+def claim_batch(batch_size):
+    """
+    Đánh dấu running cho một lô job đến hạn. SKIP LOCKED cho phép nhiều worker chạy song song.
+    """
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', run_after__lte=timezone.now())
+            .order_by('run_after')[:batch_size]
+        )
+        if jobs:
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                status='running', attempts=F('attempts') + 1, updated_at=timezone.now())
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def requeue_stale():
+    """
+    Đưa các job bị kẹt ở trạng thái running (worker chết giữa chừng) về lại hàng đợi.
+    """
+    return Job.objects.filter(status='running', updated_at__lt=timezone.now() - STALE_AFTER).update(
+        status='pending', updated_at=timezone.now())
+
+
+def run_pending(batch_size=50):
+    """
+    Chạy một lô job. Trả về số job đã xử lý.
+    """
+    jobs = claim_batch(batch_size)
+    by_kind = defaultdict(list)
+    for job in jobs:
+        by_kind[job.kind].append(job)
+
+    failures = {}
+    for kind, kind_jobs in by_kind.items():
+        handler = HANDLERS.get(kind)
+        if handler is None:
+            failures.update({job.id: f'Không có handler cho job "{kind}"' for job in kind_jobs})
+            continue
+        try:
+            failures.update(handler(kind_jobs) or {})
+        except Exception as e:
+            logger.exception('Job handler %s failed', kind)
+            failures.update({job.id: e for job in kind_jobs})
+
+    now = timezone.now()
+    done_ids = [job.id for job in jobs if job.id not in failures]
+    if done_ids:
+        Job.objects.filter(id__in=done_ids).update(status='done', last_error='', updated_at=now)
+    for job in jobs:
+        if job.id not in failures:
+            continue
+        if job.attempts >= MAX_ATTEMPTS:
+            Job.objects.filter(id=job.id).update(status='failed', last_error=str(failures[job.id]), updated_at=now)
+        else:
+            delay = timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+            Job.objects.filter(id=job.id).update(status='pending', run_after=now + delay,
+                                                 last_error=str(failures[job.id]), updated_at=now)
+    return len(jobs)
+
+
+def enqueue_ticket_email(ticket):
+    """
+    Đặt lịch gửi email vé. dedupe_key theo vé nên mỗi vé chỉ được gửi email một lần,
+    kể cả khi vé được lưu lại nhiều lần (admin sửa, callback thanh toán lặp lại).
+    """
+    return enqueue('ticket_email', {'ticket_id': ticket.id}, dedupe_key=f'ticket_email:{ticket.id}')
+
+
+@job_handler('ticket_email')
+def send_ticket_emails(jobs):
+    """
+    Gửi email vé cho cả lô qua một kết nối SMTP duy nhất.
+    """
+    tickets = Ticket.objects.select_related('event', 'user').in_bulk(
+        [job.payload.get('ticket_id') for job in jobs])
+    failures = {}
+    connection = get_connection()
+    try:
+        connection.open()
+        for job in jobs:
+            ticket = tickets.get(job.payload.get('ticket_id'))
+            if ticket is None or ticket.status != 'booked':
+                continue  # Vé đã bị xóa hoặc không còn hợp lệ: không cần gửi
+            started = time.perf_counter()
+            try:
+                ticket.send_ticket_email(connection=connection)
+            except Exception as e:
+                logger.warning('Sending ticket email for ticket %s failed: %s', ticket.id, e)
+                failures[job.id] = e
+            metrics.EMAIL_SEND_DURATION.observe(time.perf_counter() - started, kind='ticket',
+                                                result='error' if job.id in failures else 'ok')
+    finally:
+        connection.close()
+    return failures
+
+
+@job_handler('reindex_category')
+def reindex_category_events(jobs):
+    """
+    Đánh chỉ mục lại các sự kiện thuộc danh mục vừa đổi tên.
+    """
+    category_ids = {job.payload.get('category_id') for job in jobs}
+    for event in Event.objects.filter(category_id__in=category_ids).select_related('category').iterator():
+        search.index_event(event)
+    # Tìm kiếm giữa lúc đổi tên và lúc đánh chỉ mục xong có thể đã cache kết quả theo chỉ mục cũ
+    caching.bump('events')
+
+
+def enqueue_event_notification(event, message):
+    return enqueue('notify_ticket_holders', {'event_id': event.id, 'message': message})
+
+
+@job_handler('notify_ticket_holders')
+def notify_ticket_holders(jobs):
+    """
+    Gửi thông báo cho người giữ vé của sự kiện. Tiến độ (after_user_id) được lưu cùng transaction
+    với mỗi lô nên khi thử lại, job tiếp tục từ lô kế tiếp thay vì gửi trùng.
+    """
+    failures = {}
+    for job in jobs:
+        def save_progress(last_user_id, job=job):
+            job.payload['after_user_id'] = last_user_id
+            Job.objects.filter(id=job.id).update(payload=job.payload)
+
+        try:
+            notifications.notify_ticket_holders(job.payload['event_id'], job.payload['message'],
+                                                after_user_id=job.payload.get('after_user_id', 0),
+                                                on_chunk=save_progress)
+        except Exception as e:
+            logger.exception('Notifying ticket holders for job %s failed', job.id)
+            failures[job.id] = e
+    return failures
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from events.models import EventSearchTerm, Ticket, User
+from events.querycount import QueryCountError, assert_constant_queries
+
+# (url, cần đăng nhập, số truy vấn mong đợi)
+ENDPOINTS = [
+    ('/events/search/', False, 1),
+    ('/events/search/?keyword={keyword}', False, 1),
+    ('/categories/', False, 1),
+    ('/tickets/history/', True, 1),
+]
+
+
+class Command(BaseCommand):
+    help = 'Kiểm tra các endpoint danh sách có số truy vấn cố định, không phụ thuộc số dòng trả về.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username dùng cho các endpoint cần đăng nhập '
+                                           '(mặc định: người có nhiều vé nhất).')
+
+    def handle(self, *args, **options):
+        anonymous = APIClient(SERVER_NAME='localhost')
+        authenticated = APIClient(SERVER_NAME='localhost')
+        user = self._get_user(options['user'])
+        if user:
+            authenticated.force_authenticate(user)
+
+        # Lấy một từ có trong chỉ mục để truy vấn tìm kiếm có kết quả
+        keyword = EventSearchTerm.objects.values_list('term', flat=True).first() or 'event'
+
+        failures = []
+        for url, needs_user, expected in ENDPOINTS:
+            url = url.format(keyword=keyword)
+            if needs_user and not user:
+                self.stdout.write(f'{url}: bỏ qua (không có người dùng có vé)')
+                continue
+            try:
+                count = assert_constant_queries(authenticated if needs_user else anonymous, url, expected=expected)
+                self.stdout.write(f'{url}: {count} truy vấn')
+            except QueryCountError as e:
+                failures.append(str(e))
+                self.stderr.write(str(e))
+
+        if failures:
+            raise CommandError(f'{len(failures)} endpoint vượt số truy vấn cho phép.')
+
+    def _get_user(self, username):
+        if username:
+            return User.objects.filter(username=username).first()
+        user_id = (Ticket.objects.values('user_id').annotate(tickets=Count('id')).order_by('-tickets')
+                   .values_list('user_id', flat=True).first())
+        return User.objects.filter(id=user_id).first() if user_id else None
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events import expiry
+
+
+class Command(BaseCommand):
+    help = 'Hủy vé chờ thanh toán đã hết hạn và hoàn lại số vé đã giữ chỗ.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Số vé xử lý mỗi lô.')
+        parser.add_argument('--loop', action='store_true', help='Chạy liên tục thay vì chạy một lần.')
+        parser.add_argument('--interval', type=float, default=10.0, help='Số giây giữa hai lượt quét khi dùng --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            tickets, payments = expiry.expire_pending_tickets(options['batch_size'])
+            if tickets or not options['loop']:
+                self.stdout.write(f'Đã hủy {tickets} vé hết hạn, {payments} thanh toán chuyển sang hết hạn '
+                                  f'({time.monotonic() - started:.2f}s).')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
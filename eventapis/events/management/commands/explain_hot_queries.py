@@ -0,0 +1,103 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from events import caching, notifications
+from events.models import Event, EventSearchTerm, Payment, Ticket, User
+from events.queryplans import QueryPlanError, explain, format_plan, full_scans
+
+# (tên, url, ai gọi: None / 'user' / 'organizer')
+ENDPOINTS = [
+    ('danh sách sự kiện', '/events/', None),
+    ('tìm kiếm', '/events/search/', None),
+    ('tìm kiếm theo từ khóa', '/events/search/?keyword={keyword}', None),
+    ('tìm kiếm theo danh mục', '/events/search/?category={category_id}', None),
+    ('tìm kiếm theo ngày', '/events/search/?start_date={today}&end_date={today}', None),
+    ('đánh giá sự kiện', '/events/{event_id}/reviews/', None),
+    ('lịch sử vé', '/tickets/history/', 'user'),
+    ('hộp thư thông báo', '/notifications/', 'user'),
+    ('báo cáo nhà tổ chức', '/organizers/report/', 'organizer'),
+]
+
+# Bảng nhỏ được phép quét toàn bộ
+SMALL_TABLES = {'events_category'}
+
+
+class Command(BaseCommand):
+    help = ('Chạy EXPLAIN cho truy vấn của các endpoint và tác vụ nền nóng; báo lỗi nếu truy vấn nào '
+            'quét toàn bảng. Nên chạy trên dữ liệu lớn (xem seed_scale) để planner chọn index như production.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--allow', action='append', default=[],
+                            help='Bảng được phép quét toàn bộ (lặp lại được).')
+        parser.add_argument('--output', help='Ghi toàn bộ truy vấn và kế hoạch ra file để so sánh giữa các lần chạy.')
+
+    def handle(self, *args, **options):
+        allowed = SMALL_TABLES | set(options['allow'])
+        report, failures = [], []
+        for name, queries in self._cases():
+            for sql, params in queries:
+                try:
+                    plan = explain(sql, params)
+                except QueryPlanError as e:
+                    raise CommandError(str(e))
+                scans = [table for table in full_scans(plan) if table not in allowed]
+                report.append(f'-- {name}\n{sql}\n{format_plan(plan)}\n')
+                if scans:
+                    failures.append(f"{name}: quét toàn bảng {', '.join(scans)}\n  {sql}\n{format_plan(plan)}")
+            self.stdout.write(f'{name}: {len(queries)} truy vấn')
+            if options['verbosity'] > 1:
+                self.stdout.write(report[-1] if queries else '')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write('\n'.join(report))
+        for failure in failures:
+            self.stderr.write(failure)
+        if failures:
+            raise CommandError(f'{len(failures)} truy vấn quét toàn bảng.')
+
+    def _cases(self):
+        event = Event.objects.filter(status='approved').order_by('-id').first()
+        ticket = Ticket.objects.order_by('-id').first()
+        holder = ticket.user if ticket else None
+        organizer = event.organizer if event else None
+        params = {
+            'keyword': EventSearchTerm.objects.values_list('term', flat=True).first() or 'event',
+            'category_id': event.category_id if event else 0,
+            'event_id': event.id if event else 0,
+            'today': timezone.localdate().isoformat(),
+        }
+        users = {None: None, 'user': holder, 'organizer': organizer}
+
+        for name, url, caller in ENDPOINTS:
+            if caller and users[caller] is None:
+                self.stdout.write(f'{name}: bỏ qua (không có dữ liệu)')
+                continue
+            yield name, self._endpoint_queries(url.format(**params), users[caller])
+
+        now = timezone.now()
+        querysets = [
+            ('đăng nhập bằng email', User.objects.filter(email='someone@example.com')),
+            ('vé hết hạn (expire_tickets)', Ticket.objects.filter(status='pending', expires_at__lte=now)
+             .order_by('expires_at').values_list('id', 'event_id', 'ticket_type', 'quantity', 'user_id')[:1000]),
+            ('người giữ vé (thông báo)', notifications.ticket_holder_ids(params['event_id'])[:1000]),
+            ('thanh toán chờ của vé', Payment.objects.filter(ticket_id=ticket.id if ticket else 0, status='pending')),
+            ('sự kiện của nhà tổ chức', Event.objects.filter(organizer_id=organizer.id if organizer else 0)[:20]),
+        ]
+        for name, queryset in querysets:
+            yield name, [queryset.query.sql_with_params()]
+
+    def _endpoint_queries(self, url, user):
+        client = APIClient(SERVER_NAME='localhost')
+        if user is not None:
+            client.force_authenticate(user)
+        caching.bump('events', 'categories')  # Bỏ qua response đã cache để truy vấn thật sự chạy
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: HTTP {response.status_code}')
+        return [(query['sql'], None) for query in context.captured_queries
+                if query['sql'].lstrip().upper().startswith('SELECT')]
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events import snapshot
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Xuất snapshot vé đã đặt của một sự kiện cho máy quét check-in offline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_id', type=int)
+        parser.add_argument('--output', help='Đường dẫn file (mặc định event-<id>-checkin.snap).')
+
+    def handle(self, *args, **options):
+        event_id = options['event_id']
+        if not Event.objects.filter(id=event_id).exists():
+            raise CommandError(f'Sự kiện {event_id} không tồn tại.')
+
+        started = time.perf_counter()
+        data = snapshot.build_snapshot(event_id)
+        elapsed = time.perf_counter() - started
+
+        output = options['output'] or f'event-{event_id}-checkin.snap'
+        with open(output, 'wb') as f:
+            f.write(data)
+        count = (len(data) - snapshot.HEADER.size) // snapshot.RECORD.size
+        self.stdout.write(f'Đã ghi {count} vé ({len(data)} byte) vào {output} trong {elapsed:.3f}s.')
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events import oauth_tokens
+
+
+class Command(BaseCommand):
+    help = 'Xóa OAuth2 access/refresh token đã hết hạn hoặc bị thu hồi theo từng lô nhỏ.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Số token xóa mỗi lô.')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Số giây nghỉ giữa các lô để giảm tải CSDL.')
+        parser.add_argument('--loop', action='store_true', help='Chạy định kỳ thay vì chạy một lần.')
+        parser.add_argument('--interval', type=float, default=3600.0, help='Số giây giữa hai lần dọn khi dùng --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            refresh_deleted, access_deleted = oauth_tokens.purge_expired(options['batch_size'], options['sleep'])
+            self.stdout.write(f'Đã xóa {refresh_deleted} refresh token và {access_deleted} access token.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
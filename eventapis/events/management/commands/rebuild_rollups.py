@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from events import rollups
+
+
+class Command(BaseCommand):
+    help = ('Tính lại bảng thống kê EventDailyStat từ dữ liệu vé và thanh toán, rồi MonthlyEventStat từ '
+            'Event và EventDailyStat.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, action='append', dest='event_ids',
+                            help='Chỉ tính lại cho sự kiện này (có thể lặp lại).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Số dòng mỗi lệnh INSERT.')
+
+    def handle(self, *args, **options):
+        created = rollups.rebuild(options['event_ids'], options['batch_size'])
+        months = rollups.rebuild_monthly()
+        self.stdout.write(f'Đã tạo {created} dòng thống kê, {months} tháng.')
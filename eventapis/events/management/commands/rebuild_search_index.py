@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from events import search
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Đánh chỉ mục lại toàn bộ sự kiện cho tìm kiếm.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = 0
+        events = Event.objects.select_related('category').order_by('id')
+        for event in events.iterator(chunk_size=options['batch_size']):
+            search.index_event(event)
+            count += 1
+            if count % options['batch_size'] == 0:
+                self.stdout.write(f'Đã đánh chỉ mục {count} sự kiện...')
+        self.stdout.write(f'Hoàn tất: {count} sự kiện.')
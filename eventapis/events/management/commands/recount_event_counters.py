@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from events import counters
+
+
+class Command(BaseCommand):
+    help = 'Tính lại bộ đếm like / interest / đánh giá của sự kiện từ bảng gốc.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, action='append', dest='event_ids',
+                            help='Chỉ tính lại cho sự kiện này (có thể lặp lại).')
+
+    def handle(self, *args, **options):
+        updated = counters.recount(options['event_ids'])
+        self.stdout.write(f'Đã cập nhật bộ đếm của {updated} sự kiện.')
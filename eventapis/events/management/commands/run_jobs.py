@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events import jobs
+
+
+class Command(BaseCommand):
+    help = 'Worker xử lý hàng đợi job chạy nền (gửi email vé, ...).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Số job tối đa mỗi lô.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Số giây chờ khi hàng đợi trống.')
+        parser.add_argument('--once', action='store_true', help='Chạy hết các job đến hạn rồi thoát.')
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Đưa lại {requeued} job bị kẹt vào hàng đợi.')
+
+        while True:
+            processed = jobs.run_pending(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Đã xử lý {processed} job.')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
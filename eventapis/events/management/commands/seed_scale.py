@@ -0,0 +1,244 @@
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from events import counters, rollups, search
+from events.models import (Category, Event, EventSearchTerm, EventTag, Interest, Like, Notification, Payment,
+                           Review, Ticket, User)
+
+CITIES = ['Hà Nội', 'TP. Hồ Chí Minh', 'Đà Nẵng', 'Huế', 'Cần Thơ', 'Hải Phòng', 'Nha Trang', 'Đà Lạt']
+KINDS = ['Nhạc hội', 'Hội thảo', 'Workshop', 'Lễ hội', 'Giải chạy', 'Triển lãm', 'Hài kịch', 'Talkshow']
+TAGS = ['am nhac', 'cong nghe', 'am thuc', 'the thao', 'nghe thuat', 'gia dinh', 'ngoai troi', 'startup']
+EVENT_STATUSES = ['approved'] * 16 + ['hot', 'pending', 'pending', 'blocked']
+TICKET_STATUSES = ['booked'] * 7 + ['cancelled'] * 2 + ['pending']
+PASSWORD = 'seed-password'
+
+
+class Command(BaseCommand):
+    help = ('Sinh dữ liệu giả lập quy mô lớn (user, sự kiện, vé, thanh toán, like, đánh giá, thông báo) bằng '
+            'lô INSERT nhiều dòng. Khóa ngoại tính theo khoảng id nên không cần đọc lại dữ liệu; cùng --seed '
+            'luôn sinh cùng dữ liệu. Phân bố lệch: vài sự kiện hot nhận phần lớn vé, phần lớn nhà tổ chức '
+            'chỉ có ít sự kiện. User giả lập đăng nhập được bằng mật khẩu "seed-password".')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--organizers', type=int, default=2_000)
+        parser.add_argument('--events', type=int, default=20_000)
+        parser.add_argument('--tickets', type=int, default=1_000_000)
+        parser.add_argument('--likes', type=int, default=500_000)
+        parser.add_argument('--interests', type=int, default=300_000)
+        parser.add_argument('--reviews', type=int, default=200_000)
+        parser.add_argument('--notifications', type=int, default=500_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5_000, help='Số dòng mỗi lệnh INSERT / transaction.')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Không tính lại bộ đếm sự kiện và bảng thống kê (có thể chạy sau bằng '
+                                 'recount_event_counters / rebuild_rollups).')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        organizers = min(options['organizers'], options['users'])
+
+        self.users = self._start_id(User), options['users']
+        self.events = self._start_id(Event), options['events']
+        self.stdout.write(f"Bắt đầu: user từ id {self.users[0]}, sự kiện từ id {self.events[0]} (seed {options['seed']})")
+
+        self._insert(self._users(organizers))
+        categories = [Category.objects.get_or_create(name=f'Seed {kind}')[0] for kind in KINDS]
+        self.prices = []
+        self._insert(self._events(organizers, categories))
+        self._insert(self._tickets(options['tickets']))
+        self._insert(self._pairs(Like, options['likes'], offset=0))
+        self._insert(self._pairs(Interest, options['interests'], offset=17))
+        self._insert(self._pairs(Review, options['reviews'], offset=31))
+        self.unread = defaultdict(int)
+        self._insert(self._notifications(options['notifications']))
+        self._set_unread()
+
+        if not options['skip_derived']:
+            self._rebuild_derived()
+        self.stdout.write(self.style.SUCCESS('Hoàn tất.'))
+
+    def _start_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def _user_id(self):
+        return self.users[0] + self.rng.randrange(self.users[1])
+
+    def _hot_event_index(self):
+        # rng^4 dồn về chỉ số nhỏ: 1% sự kiện đầu nhận khoảng 30% số vé
+        return int(self.events[1] * self.rng.random() ** 4)
+
+    def _insert(self, chunks):
+        """
+        Ghi từng lô; mỗi lô là danh sách (model, fields, rows) được ghi trong cùng một transaction.
+        fields=None: rows là đối tượng model, ghi bằng bulk_create. Ngược lại rows là tuple giá trị đã ở dạng
+        CSDL theo thứ tự `fields`, ghi thẳng bằng executemany (xem _raw_insert).
+        """
+        started, total, name = time.perf_counter(), 0, None
+        for chunk in chunks:
+            with transaction.atomic():
+                for model, fields, rows in chunk:
+                    if fields is None:
+                        model.objects.bulk_create(rows, batch_size=self.batch_size)
+                    else:
+                        self._raw_insert(model, fields, rows)
+            name = chunk[0][0].__name__
+            total += len(chunk[0][2])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'\r{name}: {total:,} dòng ({total / elapsed:,.0f} dòng/s)', ending='')
+            self.stdout.flush()
+        if name:
+            self.stdout.write('')
+
+    def _raw_insert(self, model, fields, rows):
+        """
+        INSERT không qua bulk_create: với hàng triệu dòng, việc dựng đối tượng model và chuẩn bị từng giá trị
+        chiếm phần lớn thời gian. Cột không có trong `fields` nhận giá trị mặc định của field (auto_now /
+        auto_now_add = self.now), được chuẩn bị một lần cho cả lô.
+        """
+        columns, constants = [], []
+        for field in model._meta.concrete_fields:
+            if field.attname in fields:
+                continue
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                value = self.now
+            elif field.has_default():
+                value = field.get_default()
+            else:
+                value = None
+            columns.append(field.column)
+            constants.append(field.get_db_prep_save(value, connection))
+        columns = [model._meta.get_field(name).column for name in fields] + columns
+        constants = tuple(constants)
+        quote = connection.ops.quote_name
+        sql = (f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(map(quote, columns))}) "
+               f"VALUES ({', '.join(['%s'] * len(columns))})")
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [row + constants for row in rows])
+
+    def _users(self, organizers):
+        password = make_password(PASSWORD)  # Băm một lần, dùng chung cho mọi user giả lập
+        start, count = self.users
+        fields = ('id', 'username', 'email', 'password', 'first_name', 'last_name', 'is_organizer', 'is_verified')
+        for offset in range(0, count, self.batch_size):
+            yield [(User, fields, [
+                (user_id, f'seed{user_id}', f'seed{user_id}@example.com', password, 'Seed', str(user_id),
+                 user_id - start < organizers, user_id - start < organizers)
+                for user_id in range(start + offset, start + min(offset + self.batch_size, count))])]
+
+    def _events(self, organizers, categories):
+        """
+        Sự kiện kèm tag và chỉ mục tìm kiếm; giá vé theo chỉ số sự kiện được giữ trong self.prices để tính tiền thanh toán.
+        """
+        start, count = self.events
+        for offset in range(0, count, self.batch_size):
+            events, tags, terms = [], [], []
+            for index in range(offset, min(offset + self.batch_size, count)):
+                event_id = start + index
+                kind, city, category = self.rng.choice(KINDS), self.rng.choice(CITIES), self.rng.choice(categories)
+                starts = self.now + timedelta(days=self.rng.randint(-180, 180), hours=self.rng.randint(8, 20))
+                price = 50_000 * self.rng.randint(1, 20)
+                self.prices.append(price)
+                event = Event(
+                    id=event_id,
+                    # rng^3: vài nhà tổ chức lớn có rất nhiều sự kiện, phần đuôi dài chỉ có vài sự kiện
+                    organizer_id=self.users[0] + int(organizers * self.rng.random() ** 3),
+                    name=f'{kind} {city} #{event_id}', description=f'<p>{kind} tại {city}.</p>',
+                    location=city, start_time=starts, end_time=starts + timedelta(hours=self.rng.randint(2, 48)),
+                    ticket_price_regular=price, ticket_price_vip=price * 3, category_id=category.id,
+                    status=self.rng.choice(EVENT_STATUSES))
+                event_tags = self.rng.sample(TAGS, self.rng.randint(0, 3))
+                events.append(event)
+                tags.extend(EventTag(event_id=event_id, tag=tag) for tag in event_tags)
+                terms.extend(search.build_terms(event_id, {
+                    'n': event.name, 'd': event.description, 'l': city, 't': ' '.join(event_tags),
+                    'c': category.name}))
+            yield [(Event, None, events), (EventTag, None, tags), (EventSearchTerm, None, terms)]
+
+    def _tickets(self, count):
+        start = self._start_id(Ticket)
+        payment_id = self._start_id(Payment)
+        # Hạn giữ vé chỉ có 91 giá trị khác nhau: chuyển sang dạng CSDL một lần
+        expires = [connection.ops.adapt_datetimefield_value(self.now + timedelta(minutes=minutes))
+                   for minutes in range(-60, 31)]
+        ticket_fields = ('id', 'event_id', 'user_id', 'ticket_type', 'quantity', 'status', 'qr_code', 'expires_at')
+        payment_fields = ('id', 'ticket_id', 'method', 'amount', 'status')
+        for offset in range(0, count, self.batch_size):
+            tickets, payments = [], []
+            for ticket_id in range(start + offset, start + min(offset + self.batch_size, count)):
+                index = self._hot_event_index()
+                status = self.rng.choice(TICKET_STATUSES)
+                ticket_type = 'vip' if self.rng.random() < 0.15 else 'regular'
+                quantity = min(int(self.rng.expovariate(1.2)) + 1, 10)
+                tickets.append((ticket_id, self.events[0] + index, self._user_id(), ticket_type, quantity, status,
+                                f'seed-{ticket_id}', expires[self.rng.randrange(len(expires))]))
+                payment_status = {'booked': 'completed', 'cancelled': 'expired', 'pending': 'pending'}[status]
+                if status == 'booked' or self.rng.random() < 0.5:
+                    price = self.prices[index] * (3 if ticket_type == 'vip' else 1)
+                    payments.append((payment_id, ticket_id, 'vnpay', price * quantity, payment_status))
+                    payment_id += 1
+            yield [(Ticket, ticket_fields, tickets), (Payment, payment_fields, payments)]
+
+    def _pairs(self, model, count, offset):
+        """
+        Cặp (user, sự kiện) không trùng: lượt thứ r của mỗi user rơi vào sự kiện r + độ lệch riêng của user,
+        nên sự kiện chỉ số nhỏ (cũng là sự kiện hot) nhận nhiều lượt nhất.
+        """
+        users, events = self.users[1], self.events[1]
+        count = min(count, users * events)
+        spread = min(events, 100)
+        fields = ('user_id', 'event_id', 'rating', 'comment') if model is Review else ('user_id', 'event_id')
+        for chunk_start in range(0, count, self.batch_size):
+            rows = []
+            for j in range(chunk_start, min(chunk_start + self.batch_size, count)):
+                user, round_ = j % users, j // users
+                event = (round_ + (user * 7 + offset) % spread) % events
+                row = (self.users[0] + user, self.events[0] + event)
+                if model is Review:
+                    row += (self.rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 9])[0], 'Đánh giá giả lập')
+                rows.append(row)
+            yield [(model, fields, rows)]
+
+    def _notifications(self, count):
+        for offset in range(0, count, self.batch_size):
+            rows = []
+            for _ in range(min(self.batch_size, count - offset)):
+                user_id = self._user_id()
+                is_read = self.rng.random() < 0.8
+                if not is_read:
+                    self.unread[user_id] += 1
+                rows.append((user_id, 'Thông báo giả lập', is_read))
+            yield [(Notification, ('user_id', 'message', 'is_read'), rows)]
+
+    def _set_unread(self):
+        """
+        Ghi User.unread_notifications: gom user theo số thông báo chưa đọc để mỗi giá trị chỉ tốn vài lệnh UPDATE.
+        """
+        by_count = defaultdict(list)
+        for user_id, count in self.unread.items():
+            by_count[count].append(user_id)
+        with transaction.atomic():
+            for count, user_ids in by_count.items():
+                for offset in range(0, len(user_ids), self.batch_size):
+                    User.objects.filter(id__in=user_ids[offset:offset + self.batch_size]).update(
+                        unread_notifications=count)
+
+    def _rebuild_derived(self):
+        start, count = self.events
+        started = time.perf_counter()
+        for offset in range(0, count, 1000):
+            event_ids = list(range(start + offset, start + min(offset + 1000, count)))
+            counters.recount(event_ids)
+            rollups.rebuild(event_ids)
+        rollups.rebuild_monthly()
+        self.stdout.write(f'Bộ đếm sự kiện và thống kê: {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,400 @@
+"""
+Số liệu dạng Prometheus cho /metrics: histogram độ trễ request theo action và mã HTTP, số vé theo trạng thái,
+kết quả thanh toán VNPay theo mã phản hồi, thời gian gửi email và số kết nối CSDL.
+
+Mỗi process ghi số liệu của mình vào một file mmap riêng trong settings.METRICS_DIR (counter_<pid>.db,
+gauge_<pid>.db); /metrics đọc mọi file và cộng lại, nên chạy nhiều worker (gunicorn, uvicorn) vẫn ra số đúng
+dù request scrape rơi vào worker nào. Khi scrape, counter của process đã dừng được gộp vào counter_merged.db
+(giá trị không bị giảm) và file gauge của process đã dừng bị xóa, nên số file không tăng theo số lần khởi động
+lại worker. File mới bắt đầu từ một trang và chỉ lớn lên khi cần.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: không gộp file, không kiểm tra process còn sống
+    fcntl = None
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+
+from events.middleware import action_name
+
+INITIAL_SIZE = mmap.PAGESIZE
+HEADER = struct.Struct('<I4x')  # Số byte đã dùng, đệm cho đủ 8 byte
+LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+FILE_RE = re.compile(r'^(counter|gauge)_(\d+)\.db$')
+MERGED_FILE = 'counter_merged.db'
+LOCK_FILE = 'merge.lock'
+RESPONSE_CODE_RE = re.compile(r'^\d{2}$')
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def metrics_dir():
+    return Path(getattr(settings, 'METRICS_DIR', Path(settings.BASE_DIR) / 'metrics'))
+
+
+class MmapStore:
+    """
+    File mmap của một process: các mục (độ dài khóa, khóa JSON đệm 8 byte, giá trị double) nối tiếp nhau.
+    Chỉ process sở hữu ghi vào file, nên khóa trong process là đủ; process khác chỉ đọc.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _open(self):
+        # Mở lại sau khi fork (gunicorn preload) để process con không ghi chung file với process cha
+        self._pid = os.getpid()
+        directory = metrics_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._file = open(directory / f'{self.kind}_{self._pid}.db', 'a+b')
+        size = max(os.fstat(self._file.fileno()).st_size, INITIAL_SIZE)
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._positions = {}
+        used = HEADER.unpack_from(self._mmap)[0] or HEADER.size
+        for key, value, position in _entries(self._mmap, used):
+            self._positions[key] = position
+        self._used = used
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is not None:
+            return position
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (8 - (LENGTH.size + len(encoded)) % 8)
+        needed = self._used + LENGTH.size + len(padded) + VALUE.size
+        if needed > len(self._mmap):
+            size = len(self._mmap)
+            while size < needed:
+                size *= 2
+            self._mmap.close()
+            self._file.truncate(size)
+            self._mmap = mmap.mmap(self._file.fileno(), size)
+        LENGTH.pack_into(self._mmap, self._used, len(padded))
+        self._mmap[self._used + LENGTH.size:self._used + LENGTH.size + len(padded)] = padded
+        position = self._used + LENGTH.size + len(padded)
+        VALUE.pack_into(self._mmap, position, 0.0)
+        self._used = needed
+        HEADER.pack_into(self._mmap, 0, self._used)  # Ghi sau cùng để process đọc không thấy mục dở dang
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            position = self._position(key)
+            VALUE.pack_into(self._mmap, position, VALUE.unpack_from(self._mmap, position)[0] + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            VALUE.pack_into(self._mmap, self._position(key), value)
+
+
+def _entries(buffer, used):
+    position = HEADER.size
+    while position < used:
+        length = LENGTH.unpack_from(buffer, position)[0]
+        key = bytes(buffer[position + LENGTH.size:position + LENGTH.size + length]).decode('utf-8').rstrip(' ')
+        position += LENGTH.size + length
+        yield key, VALUE.unpack_from(buffer, position)[0], position
+        position += VALUE.size
+
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        return True  # os.kill(pid, 0) trên Windows sẽ dừng process
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read(path, totals):
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return
+    if len(data) < HEADER.size:
+        return
+    for key, value, _ in _entries(data, HEADER.unpack_from(data)[0]):
+        totals[key] = totals.get(key, 0.0) + value
+
+
+def _write(path, totals):
+    """
+    Ghi `totals` theo cùng định dạng file mmap, thay file cũ một cách nguyên tử.
+    """
+    chunks, used = [], HEADER.size
+    for key, value in totals.items():
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (8 - (LENGTH.size + len(encoded)) % 8)
+        chunks.append(LENGTH.pack(len(padded)) + padded + VALUE.pack(value))
+        used += LENGTH.size + len(padded) + VALUE.size
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as output:
+        output.write(HEADER.pack(used))
+        output.writelines(chunks)
+    os.replace(temporary, path)
+
+
+def _compact(directory, dead_counters, dead_gauges):
+    """
+    Gộp counter của các process đã dừng vào MERGED_FILE rồi xóa file của chúng. Khóa file để hai worker
+    scrape cùng lúc không cộng một file hai lần.
+    """
+    with open(directory / LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            dead_counters = [path for path in dead_counters if path.exists()]
+            if dead_counters:
+                merged = {}
+                _read(directory / MERGED_FILE, merged)
+                for path in dead_counters:
+                    _read(path, merged)
+                _write(directory / MERGED_FILE, merged)
+            for path in dead_counters + dead_gauges:
+                path.unlink(missing_ok=True)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def collect():
+    """
+    Cộng số liệu của mọi process: {khóa: giá trị}.
+    """
+    directory = metrics_dir()
+    totals = {}
+    if not directory.is_dir():
+        return totals
+    live, dead_counters, dead_gauges = [], [], []
+    for path in directory.iterdir():
+        match = FILE_RE.match(path.name)
+        if not match:
+            continue
+        if _pid_alive(int(match.group(2))):
+            live.append(path)
+        elif match.group(1) == 'counter':
+            dead_counters.append(path)
+        else:
+            dead_gauges.append(path)
+    if fcntl is not None and (dead_counters or dead_gauges):
+        _compact(directory, dead_counters, dead_gauges)
+        dead_counters = []
+    for path in live + dead_counters + [directory / MERGED_FILE]:
+        _read(path, totals)
+    return totals
+
+
+_counters = MmapStore('counter')
+_gauges = MmapStore('gauge')
+REGISTRY = []
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _key(self, suffix, labels, **extra):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name}: cần đúng các nhãn {self.labelnames}, nhận {tuple(labels)}')
+        values = [[name, str(labels[name])] for name in self.labelnames]
+        values += [[name, value] for name, value in extra.items()]
+        return json.dumps([self.name + suffix, values], ensure_ascii=False, separators=(',', ':'))
+
+    def samples(self, series):
+        """
+        Danh sách (tên mẫu, nhãn, giá trị) để xuất; `series` là kết quả của _parse(collect()).
+        """
+        return sorted((name, labels, value) for name in self._sample_names() for labels, value in series.get(name, ()))
+
+    def _sample_names(self):
+        return (self.name,)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        _counters.add(self._key('_total', labels), amount)
+
+    def _sample_names(self):
+        return (f'{self.name}_total',)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        _gauges.set(self._key('', labels), value)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = [_format_value(bound) for bound in buckets] + ['+Inf']
+        self._bounds = list(buckets)
+
+    def observe(self, value, **labels):
+        # Lưu số lần rơi vào từng bucket (không cộng dồn); cộng dồn khi xuất
+        bucket = next((label for bound, label in zip(self._bounds, self.buckets) if value <= bound), '+Inf')
+        _counters.add(self._key('_bucket', labels, le=bucket), 1)
+        _counters.add(self._key('_sum', labels), value)
+        _counters.add(self._key('_count', labels), 1)
+
+    def samples(self, series):
+        grouped = {}
+        for suffix in ('bucket', 'sum', 'count'):
+            for labels, value in series.get(f'{self.name}_{suffix}', ()):
+                base = tuple(label for label in labels if label[0] != 'le')
+                entry = grouped.setdefault(base, {'buckets': {}, 'sum': 0.0, 'count': 0.0})
+                if suffix == 'bucket':
+                    entry['buckets'][dict(labels)['le']] = value
+                else:
+                    entry[suffix] = value
+        result = []
+        for base, entry in sorted(grouped.items()):
+            cumulative = 0.0
+            for bucket in self.buckets:
+                cumulative += entry['buckets'].get(bucket, 0.0)
+                result.append((f'{self.name}_bucket', base + (('le', bucket),), cumulative))
+            result.append((f'{self.name}_sum', base, entry['sum']))
+            result.append((f'{self.name}_count', base, entry['count']))
+        return result
+
+
+def _parse(totals):
+    series = {}
+    for key, value in totals.items():
+        name, labels = json.loads(key)
+        series.setdefault(name, []).append((tuple(tuple(label) for label in labels), value))
+    return series
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render():
+    """
+    Toàn bộ số liệu ở định dạng text của Prometheus (version 0.0.4).
+    """
+    update_db_connections()
+    series = _parse(collect())
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for name, labels, value in metric.samples(series):
+            label_text = ','.join(f'{label}="{_escape(text)}"' for label, text in labels)
+            lines.append(f'{name}{{{label_text}}} {_format_value(value)}' if labels
+                         else f'{name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_DURATION = Histogram('eventapis_http_request_duration_seconds', 'Thời gian xử lý request theo action.',
+                             ['view', 'method', 'status'])
+REQUESTS_IN_PROGRESS = Gauge('eventapis_http_requests_in_progress', 'Số request đang xử lý.')
+TICKETS = Counter('eventapis_tickets', 'Số vé chuyển sang trạng thái reserved / booked / cancelled.', ['status'])
+VNPAY_PAYMENTS = Counter('eventapis_vnpay_payments', 'Callback thanh toán VNPay theo mã phản hồi và kết quả xử lý.',
+                         ['response_code', 'outcome'])
+EMAIL_SEND_DURATION = Histogram('eventapis_email_send_duration_seconds', 'Thời gian gửi một email.', ['kind', 'result'])
+DB_CONNECTIONS = Gauge('eventapis_db_connections_open', 'Số kết nối CSDL đang mở (kết nối bền, CONN_MAX_AGE).',
+                       ['alias'])
+
+_open_connections = weakref.WeakSet()
+_in_progress = 0
+_in_progress_lock = threading.Lock()
+
+
+def _track_connection(sender, connection, **kwargs):
+    _open_connections.add(connection)
+
+
+connection_created.connect(_track_connection)
+
+
+def update_db_connections():
+    counts = {alias: 0 for alias in connections}
+    for wrapper in list(_open_connections):
+        if wrapper.connection is not None:
+            counts[wrapper.alias] = counts.get(wrapper.alias, 0) + 1
+    for alias, count in counts.items():
+        DB_CONNECTIONS.set(count, alias=alias)
+
+
+def ticket_status(status, count=1):
+    """
+    Đếm vé chuyển trạng thái khi transaction hiện tại commit thành công.
+    """
+    if count:
+        transaction.on_commit(lambda: TICKETS.inc(count, status=status))
+
+
+def vnpay_payment(response_code, outcome):
+    # Giới hạn giá trị nhãn: mã VNPay luôn gồm 2 chữ số
+    code = response_code if response_code and RESPONSE_CODE_RE.match(response_code) else 'invalid'
+    VNPAY_PAYMENTS.inc(response_code=code, outcome=outcome)
+
+
+def _set_in_progress(delta):
+    global _in_progress
+    with _in_progress_lock:
+        _in_progress += delta
+        REQUESTS_IN_PROGRESS.set(_in_progress)
+
+
+class MetricsMiddleware:
+    """
+    Ghi histogram độ trễ theo action (EventViewSet.search, PaymentViewSet.payment_ipn...), method và mã HTTP.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _set_in_progress(1)
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            _set_in_progress(-1)
+            match = request.resolver_match
+            REQUEST_DURATION.observe(time.perf_counter() - started,
+                                     view=action_name(match.func, request) if match else 'unresolved',
+                                     method=request.method, status=status)
+            update_db_connections()
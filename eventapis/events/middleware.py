@@ -0,0 +1,215 @@
+"""
+Đo chi phí SQL của từng action: số truy vấn, tổng thời gian SQL, truy vấn lặp lại (cùng câu lệnh chạy
+nhiều lần trong một request - dấu hiệu N+1) và thời gian serialize.
+
+Kết quả được gắn vào header Server-Timing (xem trong tab Network của trình duyệt) và cộng dồn vào
+thống kê trong process (stats(), trang admin query-stats/). settings.QUERY_BUDGETS đặt số truy vấn tối đa
+theo action, ví dụ {'EventViewSet.search': 5}; vượt ngân sách thì ghi log cảnh báo, hoặc raise
+QueryBudgetExceeded khi QUERY_BUDGETS_STRICT = True (dùng khi chạy test để N+1 làm test fail).
+"""
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.db import connection
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+STATS_WINDOW = 500  # Số request gần nhất giữ lại cho mỗi action
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+_current = contextvars.ContextVar('query_metrics', default=None)
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.action = None
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.fingerprints = Counter()
+        self.samples = {}
+
+    def duplicates(self):
+        return {fingerprint: count for fingerprint, count in self.fingerprints.items() if count > 1}
+
+
+def fingerprint(sql):
+    """
+    Khóa nhận diện câu lệnh bỏ qua giá trị tham số: literal thành ?, danh sách IN (...) gộp thành một.
+    """
+    normalized = IN_LIST_RE.sub('(?)', LITERAL_RE.sub('?', sql))
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def _execute(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_seconds += time.perf_counter() - started
+        metrics.queries += 1
+        key = fingerprint(sql)
+        metrics.fingerprints[key] += 1
+        metrics.samples.setdefault(key, sql[:300])
+
+
+_serializer_data = serializers.BaseSerializer.data
+
+
+def install():
+    """
+    Bọc BaseSerializer.data để đo thời gian serialize; gọi một lần từ EventsConfig.ready() khi middleware
+    có trong settings.MIDDLEWARE, nên import module này (lệnh quản trị, test) không đụng tới DRF.
+    """
+    if serializers.BaseSerializer.data is _serializer_data:
+        serializers.BaseSerializer.data = property(_timed_data)
+
+
+def _timed_data(self):
+    # Chỉ đo lời gọi .data ngoài cùng; serializer lồng nhau đi qua to_representation của cha
+    metrics = _current.get()
+    if metrics is None:
+        return _serializer_data.fget(self)
+    started = time.perf_counter()
+    try:
+        return _serializer_data.fget(self)
+    finally:
+        metrics.serializer_seconds += time.perf_counter() - started
+
+
+def action_name(view_func, request):
+    """
+    'EventViewSet.search' cho action của viewset, 'PaymentViewSet.create' cho route mặc định,
+    tên hàm cho view thường.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', None) or type(view_func).__name__
+    actions = getattr(view_func, 'actions', None) or {}
+    return f"{cls.__name__}.{actions.get(request.method.lower(), request.method.lower())}"
+
+
+def budget(action):
+    """
+    Số truy vấn tối đa của action theo settings.QUERY_BUDGETS, None nếu không đặt.
+    """
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(action)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Nên đặt đầu MIDDLEWARE để số liệu gồm cả truy vấn của các middleware khác (session, xác thực).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(_execute):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = server_timing(metrics, total)
+        if metrics.action:
+            _record(metrics, total)
+            self._check_budget(metrics, request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current.get().action = action_name(view_func, request)
+
+    def _check_budget(self, metrics, request):
+        limit = budget(metrics.action)
+        if limit is None or metrics.queries <= limit:
+            return
+        duplicates = metrics.duplicates()
+        message = (f'{metrics.action} ({request.method} {request.path}): {metrics.queries} truy vấn, '
+                   f'ngân sách {limit}')
+        if duplicates:
+            worst = max(duplicates, key=duplicates.get)
+            message += f'; lặp {duplicates[worst]} lần: {metrics.samples[worst]}'
+        if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def server_timing(metrics, total):
+    duplicates = sum(count - 1 for count in metrics.duplicates().values())
+    return ', '.join([
+        f'db;desc="{metrics.queries} queries, {duplicates} duplicate";dur={metrics.sql_seconds * 1000:.2f}',
+        f'serializer;dur={metrics.serializer_seconds * 1000:.2f}',
+        f'total;dur={total * 1000:.2f}',
+    ])
+
+
+def _record(metrics, total):
+    with _stats_lock:
+        stat = _stats.get(metrics.action)
+        if stat is None:
+            stat = _stats[metrics.action] = {'requests': 0, 'over_budget': 0, 'window': deque(maxlen=STATS_WINDOW),
+                                             'duplicates': Counter(), 'samples': {}}
+        stat['requests'] += 1
+        limit = budget(metrics.action)
+        if limit is not None and metrics.queries > limit:
+            stat['over_budget'] += 1
+        stat['window'].append((metrics.queries, metrics.sql_seconds, metrics.serializer_seconds, total))
+        for key, count in metrics.duplicates().items():
+            stat['duplicates'][key] += count - 1
+            stat['samples'].setdefault(key, metrics.samples[key])
+
+
+def stats():
+    """
+    Theo từng action, trên STATS_WINDOW request gần nhất của process hiện tại: số truy vấn trung bình / lớn nhất,
+    thời gian SQL, serialize, tổng (ms) và các câu lệnh hay bị lặp nhất.
+    """
+    with _stats_lock:
+        snapshot = {action: dict(stat, window=list(stat['window']), duplicates=stat['duplicates'].most_common(5))
+                    for action, stat in _stats.items()}
+    result = {}
+    for action, stat in sorted(snapshot.items()):
+        window = stat['window']
+        count = len(window)
+        totals = sorted(row[3] for row in window)
+        result[action] = {
+            'requests': stat['requests'],
+            'over_budget': stat['over_budget'],
+            'budget': budget(action),
+            'avg_queries': round(sum(row[0] for row in window) / count, 2),
+            'max_queries': max(row[0] for row in window),
+            'avg_sql_ms': round(sum(row[1] for row in window) * 1000 / count, 3),
+            'avg_serializer_ms': round(sum(row[2] for row in window) * 1000 / count, 3),
+            'avg_total_ms': round(sum(totals) * 1000 / count, 3),
+            'p95_total_ms': round(totals[min(int(count * 0.95), count - 1)] * 1000, 3),
+            'duplicates': [{'count': duplicated, 'sql': stat['samples'][key]} for key, duplicated in stat['duplicates']],
+        }
+    return result
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -1,36 +0,0 @@
-# Generated by Django 5.2 on 2025-04-21 16:46
-
-import django.db.models.deletion
-import django.utils.timezone
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('events', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.AddField(
-            model_name='event',
-            name='created_at',
-            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
-            preserve_default=False,
-        ),
-        migrations.AddField(
-            model_name='event',
-            name='updated_at',
-            field=models.DateTimeField(auto_now=True),
-        ),
-        migrations.AddField(
-            model_name='user',
-            name='is_verified',
-            field=models.BooleanField(default=False),
-        ),
-        migrations.AlterField(
-            model_name='event',
-            name='category',
-            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='events', to='events.category'),
-        ),
-    ]
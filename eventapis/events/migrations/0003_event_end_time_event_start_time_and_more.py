@@ -1,28 +0,0 @@
-# Generated by Django 5.2 on 2025-04-23 10:53
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('events', '0002_event_created_at_event_updated_at_user_is_verified_and_more'),
-    ]
-
-    operations = [
-        migrations.AddField(
-            model_name='event',
-            name='end_time',
-            field=models.DateTimeField(null=True),
-        ),
-        migrations.AddField(
-            model_name='event',
-            name='start_time',
-            field=models.DateTimeField(null=True),
-        ),
-        migrations.AlterField(
-            model_name='event',
-            name='event_time',
-            field=models.DateTimeField(null=True),
-        ),
-    ]
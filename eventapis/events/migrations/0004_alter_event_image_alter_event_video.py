@@ -1,24 +0,0 @@
-# Generated by Django 5.2 on 2025-04-24 17:00
-
-import cloudinary.models
-from django.db import migrations
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('events', '0003_rename_ticket_price_event_ticket_price_regular_and_more'),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name='event',
-            name='image',
-            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True, verbose_name='image'),
-        ),
-        migrations.AlterField(
-            model_name='event',
-            name='video',
-            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True, verbose_name='video'),
-        ),
-    ]
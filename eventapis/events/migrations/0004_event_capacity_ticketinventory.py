@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 18:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_alter_payment_options_alter_payment_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='capacity_regular',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='capacity_vip',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TicketInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_type', models.CharField(choices=[('regular', 'Regular'), ('vip', 'VIP')], max_length=10)),
+                ('capacity', models.PositiveIntegerField()),
+                ('remaining', models.PositiveIntegerField()),
+                ('sold', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventories', to='events.event')),
+            ],
+            options={
+                'unique_together': {('event', 'ticket_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-18 18:50
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from events.search import FIELD_WEIGHTS, tokenize
+
+BATCH_SIZE = 500
+
+
+def index_events(apps, schema_editor):
+    # Đánh chỉ mục sự kiện có sẵn (giống search.index_event) để tìm kiếm không mất kết quả ngay sau khi deploy
+    Event = apps.get_model('events', 'Event')
+    EventTag = apps.get_model('events', 'EventTag')
+    EventSearchTerm = apps.get_model('events', 'EventSearchTerm')
+    last_id = 0
+    while True:
+        events = list(Event.objects.select_related('category').filter(id__gt=last_id).order_by('id')[:BATCH_SIZE])
+        if not events:
+            return
+        last_id = events[-1].id
+        tags = defaultdict(list)
+        event_tags = EventTag.objects.filter(event_id__in=[event.id for event in events], active=True)
+        for event_id, tag in event_tags.values_list('event_id', 'tag'):
+            tags[event_id].append(tag)
+        rows = []
+        for event in events:
+            fields = {'n': event.name, 'd': event.description, 'l': event.location, 't': ' '.join(tags[event.id]),
+                      'c': event.category.name if event.category_id else ''}
+            for field, text in fields.items():
+                for term, count in Counter(tokenize(text)).items():
+                    rows.append(EventSearchTerm(event_id=event.id, field=field, term=term,
+                                                weight=count * FIELD_WEIGHTS[field]))
+        EventSearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_ticket_checked_in_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('n', 'Name'), ('d', 'Description'), ('l', 'Location'), ('t', 'Tag'), ('c', 'Category')], max_length=1)),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='events.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'event'], name='events_even_term_de9493_idx')],
+                'unique_together': {('event', 'field', 'term')},
+            },
+        ),
+        migrations.RunPython(index_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 19:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_ticket_status_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('ticket_type', models.CharField(choices=[('regular', 'Regular'), ('vip', 'VIP')], max_length=10)),
+                ('tickets_booked', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tickets_cancelled', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='events.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='events_even_date_c9c516_idx')],
+                'unique_together': {('event', 'date', 'ticket_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2 on 2026-10-18 19:04
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def remove_duplicates(apps, schema_editor):
+    # Giữ bản ghi đầu tiên của mỗi cặp (user, event) trước khi thêm ràng buộc unique
+    for model_name in ('Like', 'Interest', 'Review'):
+        model = apps.get_model('events', model_name)
+        duplicates = model.objects.values('user_id', 'event_id').annotate(
+            keep_id=Min('id'), total=Count('id')).filter(total__gt=1).order_by()
+        for row in duplicates:
+            model.objects.filter(user_id=row['user_id'], event_id=row['event_id']).exclude(
+                id=row['keep_id']).delete()
+
+
+def backfill_counters(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    for model_name, field in (('Like', 'like_count'), ('Interest', 'interest_count')):
+        model = apps.get_model('events', model_name)
+        for row in model.objects.values('event_id').annotate(total=Count('id')).order_by():
+            Event.objects.filter(id=row['event_id']).update(**{field: row['total']})
+    Review = apps.get_model('events', 'Review')
+    for row in Review.objects.values('event_id').annotate(total=Count('id'), rating=Sum('rating')).order_by():
+        Event.objects.filter(id=row['event_id']).update(rating_count=row['total'], rating_sum=row['rating'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_eventdailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='interest_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='interest',
+            unique_together={('user', 'event')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='like',
+            unique_together={('user', 'event')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='review',
+            unique_together={('user', 'event')},
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 19:06
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread_notifications(apps, schema_editor):
+    User = apps.get_model('events', 'User')
+    Notification = apps.get_model('events', 'Notification')
+    for row in Notification.objects.filter(is_read=False).values('user_id').annotate(total=Count('id')).order_by():
+        User.objects.filter(id=row['user_id']).update(unread_notifications=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_event_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_notifications, migrations.RunPython.noop),
+    ]
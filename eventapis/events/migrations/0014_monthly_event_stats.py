@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 19:46
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def backfill_monthly_stats(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventDailyStat = apps.get_model('events', 'EventDailyStat')
+    MonthlyEventStat = apps.get_model('events', 'MonthlyEventStat')
+
+    def month_of(value):
+        return timezone.localtime(value).date().replace(day=1)
+
+    stats = defaultdict(lambda: {'event_count': 0, 'attendee_count': 0})
+    for row in Event.objects.filter(start_time__isnull=False).annotate(month=TruncMonth('start_time')).values(
+            'month').annotate(total=Count('id')).order_by():
+        stats[month_of(row['month'])]['event_count'] = row['total']
+    for row in EventDailyStat.objects.filter(event__start_time__isnull=False).annotate(
+            month=TruncMonth('event__start_time')).values('month').annotate(total=Sum('tickets_booked')).order_by():
+        stats[month_of(row['month'])]['attendee_count'] = row['total'] or 0
+    MonthlyEventStat.objects.bulk_create([MonthlyEventStat(month=month, **values) for month, values in stats.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_payment_expired_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyEventStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('event_count', models.IntegerField(default=0)),
+                ('attendee_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_monthly_stats, migrations.RunPython.noop),
+    ]
@@ -3,11 +3,13 @@ from django.contrib.auth.models import AbstractUser
 from ckeditor.fields import RichTextField
 from cloudinary.models import CloudinaryField
 import uuid
+from django.utils import timezone
 from django.core.mail import send_mail
 from django.core.mail import EmailMessage
 import qrcode
 from io import BytesIO
 from email.mime.image import MIMEImage
+from events import ticket_tokens
 
 # ------------------ USERS & ROLES ------------------
 class User(AbstractUser):
@@ -15,6 +17,11 @@ class User(AbstractUser):
     is_organizer = models.BooleanField(default=False)
     is_verified = models.BooleanField(default=False)
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    unread_notifications = models.PositiveIntegerField(default=0)  # Số thông báo chưa đọc (events/notifications.py)
+
+    class Meta(AbstractUser.Meta):
+        # Đăng nhập bằng email và Google login tra user theo email
+        indexes = [models.Index(fields=['email'])]
 
     def __str__(self):
         return f"{self.username} ({self.email})"
@@ -66,13 +73,65 @@ class Event(BaseModel):
     status = models.CharField(max_length=15, choices=[('pending', 'Pending'), ('approved', 'Approved'), ('hot', 'Hot'),
                                                       ('blocked', 'Blocked')], default='pending')
     category = models.ForeignKey(Category, on_delete=models.PROTECT, null=True, related_name='events')
+    capacity_regular = models.PositiveIntegerField(null=True, blank=True)  # Số vé thường tối đa (null = không giới hạn)
+    capacity_vip = models.PositiveIntegerField(null=True, blank=True)  # Số vé VIP tối đa (null = không giới hạn)
+    # Bộ đếm phi chuẩn hóa, cộng dồn theo lô bởi events/counters.py
+    like_count = models.PositiveIntegerField(default=0)
+    interest_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta(BaseModel.Meta):
+        indexes = [
+            # Danh sách sự kiện đã duyệt, mới nhất trước (phân trang theo id)
+            models.Index(fields=['status', 'id']),
+            # Tìm kiếm sự kiện đã duyệt theo khoảng thời gian, xếp theo start_time (EventViewSet.search)
+            models.Index(fields=['status', 'start_time']),
+            models.Index(fields=['status', 'end_time']),
+        ]
+
     def __str__(self):
         return f"Event: {self.name} | Organizer: {self.organizer.username}"
 
 
+class TicketInventory(models.Model):
+    """
+    Bộ đếm số vé còn lại của một loại vé trong sự kiện.
+    Tách khỏi bảng Event để các lệnh UPDATE giữ chỗ chỉ khóa đúng một dòng nhỏ.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='inventories')
+    ticket_type = models.CharField(max_length=10, choices=[('regular', 'Regular'), ('vip', 'VIP')])
+    capacity = models.PositiveIntegerField()
+    remaining = models.PositiveIntegerField()  # Số vé còn có thể giữ chỗ
+    sold = models.PositiveIntegerField(default=0)  # Số vé đã thanh toán
+
+    class Meta:
+        unique_together = ('event', 'ticket_type')
+
+    def __str__(self):
+        return f"Inventory: {self.ticket_type} | Event #{self.event_id} | {self.remaining}/{self.capacity}"
+
+
+class EventSearchTerm(models.Model):
+    """
+    Chỉ mục đảo (inverted index) cho tìm kiếm sự kiện: mỗi dòng là một từ (đã bỏ dấu, chữ thường)
+    xuất hiện trong một trường của sự kiện, kèm trọng số dùng để xếp hạng kết quả.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='search_terms')
+    field = models.CharField(max_length=1, choices=[('n', 'Name'), ('d', 'Description'), ('l', 'Location'),
+                                                    ('t', 'Tag'), ('c', 'Category')])
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('event', 'field', 'term')
+        indexes = [models.Index(fields=['term', 'event'])]
+
+    def __str__(self):
+        return f"SearchTerm: {self.term} ({self.field}) | Event #{self.event_id}"
+
 
 class EventTag(BaseModel):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
@@ -84,6 +143,18 @@ class EventTag(BaseModel):
 
 
 # ------------------ BOOKING ------------------
+class TicketQuerySet(models.QuerySet):
+    def with_total_price(self):
+        """
+        Tính tổng tiền (số lượng x giá vé theo loại) ngay trong SQL, tránh truy vấn event cho từng vé.
+        """
+        return self.annotate(total_price=models.Case(
+            models.When(ticket_type='vip', then=models.F('quantity') * models.F('event__ticket_price_vip')),
+            default=models.F('quantity') * models.F('event__ticket_price_regular'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ))
+
+
 class Ticket(BaseModel):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -92,16 +163,32 @@ class Ticket(BaseModel):
     status = models.CharField(max_length=15, choices=[('pending', 'Pending'), ('booked', 'Booked'), ('cancelled', 'Cancelled')], default='pending')
     qr_code = models.CharField(max_length=100, unique=True, blank=True)
     expires_at = models.DateTimeField()  # Hạn 30 phút hoặc 3 phút
+    checked_in_at = models.DateTimeField(null=True, blank=True)  # Thời điểm check-in tại sự kiện
+
+    objects = TicketQuerySet.as_manager()
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            # Tìm vé chờ thanh toán đã hết hạn (events/expiry.py)
+            models.Index(fields=['status', 'expires_at']),
+            # Người giữ vé của một sự kiện theo user_id tăng dần (events/notifications.py, check-in)
+            models.Index(fields=['event', 'status', 'user']),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.qr_code:
             self.qr_code = str(uuid.uuid4())  # Tạo mã QR duy nhất
         super().save(*args, **kwargs)
-        # Gửi email với mã QR sau khi lưu
-        if self.status == 'booked':
-            self.send_ticket_email()
+        # Email vé được gửi bởi hàng đợi job (xem events/jobs.py), không gửi trong request
+
+    @property
+    def qr_token(self):
+        """
+        Nội dung mã QR: token ký HMAC chứa id vé, id sự kiện, loại vé và số lượng.
+        """
+        return ticket_tokens.make_token(self)
 
-    def send_ticket_email(self):
+    def send_ticket_email(self, connection=None):
         # Tạo hình ảnh QR code từ chuỗi qr_code
         qr = qrcode.QRCode(
             version=1,
@@ -109,7 +196,7 @@ class Ticket(BaseModel):
             box_size=10,
             border=4,
         )
-        qr.add_data(self.qr_code)
+        qr.add_data(self.qr_token)
         qr.make(fit=True)
         img = qr.make_image(fill_color="black", back_color="white")
 
@@ -133,6 +220,7 @@ class Ticket(BaseModel):
             html_message,
             'from@example.com',
             [self.user.email],
+            connection=connection,
         )
         email.content_subtype = "html"  # Đặt email là HTML
 
@@ -151,7 +239,9 @@ class Payment(BaseModel):
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE)
     method = models.CharField(max_length=20, choices=[('vnpay', 'VNPay'), ('momo', 'Momo'), ('zalopay', 'ZaloPay')])
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    status = models.CharField(max_length=20, choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending')
+    # expired: vé bị hủy (hết hạn / người dùng hủy) khi VNPay chưa báo kết quả; callback thành công đến sau vẫn được ghi nhận
+    status = models.CharField(max_length=20, choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'),
+                                                      ('expired', 'Expired')], default='pending')
     payment_url = models.URLField(max_length=1000, blank=True, null=True)
 
     class Meta:
@@ -161,11 +251,48 @@ class Payment(BaseModel):
         return f"Payment: {self.amount} | Method: {self.method} | Status: {self.status}"
 
 
+# ------------------ STATISTICS ------------------
+class EventDailyStat(models.Model):
+    """
+    Số liệu cộng dồn theo sự kiện / ngày / loại vé, cập nhật dần khi thanh toán và hủy vé
+    (events/rollups.py) để trang thống kê không phải quét bảng Ticket.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    ticket_type = models.CharField(max_length=10, choices=[('regular', 'Regular'), ('vip', 'VIP')])
+    tickets_booked = models.PositiveIntegerField(default=0)  # Số vé thanh toán thành công
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tickets_cancelled = models.PositiveIntegerField(default=0)  # Số vé bị hủy / hết hạn thanh toán
+
+    class Meta:
+        unique_together = ('event', 'date', 'ticket_type')
+        indexes = [models.Index(fields=['date'])]
+
+    def __str__(self):
+        return f"DailyStat: Event #{self.event_id} | {self.date} | {self.ticket_type}"
+
+
+class MonthlyEventStat(models.Model):
+    """
+    Số sự kiện và số vé đã thanh toán theo tháng diễn ra sự kiện (ngày đầu tháng của start_time), cho trang
+    thống kê quản trị. Cập nhật qua signal của Event và khi thanh toán thành công (events/rollups.py).
+    """
+    month = models.DateField(unique=True)
+    event_count = models.IntegerField(default=0)
+    attendee_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"MonthlyStat: {self.month:%Y-%m} | {self.event_count} events | {self.attendee_count} attendees"
+
+
 # ------------------ INTERACTIONS ------------------
 class Like(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
 
+    class Meta(BaseModel.Meta):
+        unique_together = ('user', 'event')
+
     def __str__(self):
         return f"Like: {self.event.name} by {self.user.username}"
 
@@ -174,6 +301,9 @@ class Interest(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
 
+    class Meta(BaseModel.Meta):
+        unique_together = ('user', 'event')
+
     def __str__(self):
         return f"Interest: {self.user.username} in {self.event.name}"
 
@@ -185,6 +315,9 @@ class Review(BaseModel):
     rating = models.IntegerField(choices=[(i, str(i)) for i in range(1, 6)])
     comment = models.TextField(null=True, blank=True)
 
+    class Meta(BaseModel.Meta):
+        unique_together = ('user', 'event')
+
     def __str__(self):
         return f"Review: {self.rating} | {self.event.name} by {self.user.username}"
 
@@ -197,3 +330,26 @@ class Notification(BaseModel):
 
     def __str__(self):
         return f"Notification: {self.message[:30]}... | User: {self.user.username} | Read: {self.is_read}"
+
+
+# ------------------ BACKGROUND JOBS ------------------
+class Job(models.Model):
+    """
+    Hàng đợi công việc chạy nền (gửi email vé, ...), lưu trong CSDL để không mất khi khởi động lại.
+    """
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    dedupe_key = models.CharField(max_length=100, unique=True, null=True, blank=True)  # Chống tạo trùng job
+    status = models.CharField(max_length=10, choices=[('pending', 'Pending'), ('running', 'Running'),
+                                                      ('done', 'Done'), ('failed', 'Failed')], default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"Job: {self.kind} | {self.status} | Attempts: {self.attempts}"
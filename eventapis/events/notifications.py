@@ -0,0 +1,95 @@
+"""
+Gửi thông báo hàng loạt và bộ đếm thông báo chưa đọc.
+
+- fan_out(): tạo thông báo cho nhiều user bằng bulk_create theo từng lô, đồng thời cộng
+  User.unread_notifications của cả lô bằng một lệnh UPDATE.
+- notify_ticket_holders(): gửi cho mọi người đã đặt vé của sự kiện (chạy trong job nền, xem jobs.py).
+- mark_read() / unread_count(): đánh dấu đã đọc và đọc bộ đếm mà không cần COUNT(*) trên bảng Notification.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from events import realtime
+from events.models import Notification, Ticket, User
+
+CHUNK_SIZE = 1000
+
+
+def fan_out(user_ids, message, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """
+    Tạo thông báo `message` cho các user trong `user_ids` (iterable, có thể rất lớn, id trùng được bỏ qua).
+    on_chunk(last_user_id) được gọi trong transaction của mỗi lô để lưu tiến độ. Trả về số thông báo đã tạo.
+    """
+    total = 0
+    chunk = []
+    seen = set()
+    for user_id in user_ids:
+        if user_id in seen:
+            continue  # Mỗi user chỉ nhận một thông báo (bộ đếm cũng chỉ cộng 1 mỗi user mỗi lô)
+        seen.add(user_id)
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            total += _create_chunk(chunk, message, on_chunk)
+            chunk = []
+    if chunk:
+        total += _create_chunk(chunk, message, on_chunk)
+    return total
+
+
+def _create_chunk(user_ids, message, on_chunk):
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(
+            [Notification(user_id=user_id, message=message) for user_id in user_ids])
+        User.objects.filter(id__in=user_ids).update(unread_notifications=F('unread_notifications') + 1)
+        realtime.publish_many_on_commit(
+            (notification.user_id, 'notification',
+             {'message': message, 'created_date': notification.created_date.isoformat()})
+            for notification in notifications)
+        if on_chunk is not None:
+            on_chunk(user_ids[-1])
+    return len(user_ids)
+
+
+def ticket_holder_ids(event_id, after_user_id=0):
+    """
+    Id các user có vé đã đặt của sự kiện, tăng dần (để có thể tiếp tục sau `after_user_id`).
+    """
+    return (Ticket.objects.filter(event_id=event_id, status='booked', user_id__gt=after_user_id)
+            .order_by('user_id').values_list('user_id', flat=True).distinct())
+
+
+def notify_ticket_holders(event_id, message, after_user_id=0, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """
+    Gửi thông báo cho người giữ vé theo từng lô id tăng dần (keyset), nên có thể tiếp tục
+    từ `after_user_id` nếu job bị ngắt giữa chừng. Trả về số thông báo đã tạo.
+    """
+    total = 0
+    while True:
+        user_ids = list(ticket_holder_ids(event_id, after_user_id)[:chunk_size])
+        if not user_ids:
+            return total
+        total += _create_chunk(user_ids, message, on_chunk)
+        after_user_id = user_ids[-1]
+
+
+def mark_read(user, ids=None):
+    """
+    Đánh dấu đã đọc các thông báo `ids` của user (None = tất cả). Trả về số thông báo được đánh dấu.
+    """
+    with transaction.atomic():
+        notifications = Notification.objects.filter(user=user, is_read=False)
+        if ids is not None:
+            notifications = notifications.filter(id__in=ids)
+        updated = notifications.update(is_read=True, updated_date=timezone.now())
+        if updated:
+            # Không để bộ đếm âm nếu đã lệch (cột không dấu trên MySQL)
+            User.objects.filter(id=user.id).update(unread_notifications=Case(
+                When(unread_notifications__gte=updated, then=F('unread_notifications') - updated),
+                default=Value(0)))
+    return updated
+
+
+def unread_count(user):
+    # Đọc trực tiếp một dòng theo khóa chính: request.user có thể là bản sao cũ từ cache xác thực
+    return User.objects.filter(id=user.id).values_list('unread_notifications', flat=True).first() or 0
@@ -0,0 +1,124 @@
+"""
+Cấp, thu hồi và dọn dẹp OAuth2 access/refresh token.
+
+- default_application(): Application mặc định (DEFAULT_OAUTH2_CLIENT_ID), chỉ tra CSDL một lần mỗi process.
+- issue_tokens(): tạo cặp token khi đăng nhập và giới hạn số token còn hiệu lực của mỗi user.
+- revoke_user_tokens(): thu hồi toàn bộ token của user bằng hai lệnh UPDATE.
+- purge_expired(): xóa token hết hạn / đã thu hồi theo từng lô nhỏ (lệnh purge_oauth_tokens).
+"""
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application, RefreshToken
+from oauth2_provider.settings import oauth2_settings
+
+from events.authentication import auth_cache
+
+
+_default_application = None
+
+
+def default_application():
+    """
+    Application của DEFAULT_OAUTH2_CLIENT_ID, được nhớ trong process (xóa khi Application thay đổi,
+    xem signals.py). Báo Application.DoesNotExist nếu chưa tạo.
+    """
+    global _default_application
+    application = _default_application
+    if application is None:
+        application = Application.objects.get(client_id=settings.DEFAULT_OAUTH2_CLIENT_ID)
+        _default_application = application
+    return application
+
+
+def forget_default_application():
+    global _default_application
+    _default_application = None
+
+
+def max_active_tokens():
+    return getattr(settings, 'OAUTH2_MAX_ACTIVE_TOKENS_PER_USER', 5)
+
+
+def issue_tokens(user, application, expires_in=None):
+    """
+    Tạo access token và refresh token mới cho user, rồi thu hồi các token cũ vượt giới hạn.
+    """
+    expires_in = expires_in or oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS
+    access_token = AccessToken.objects.create(
+        user=user,
+        application=application,
+        expires=timezone.now() + timedelta(seconds=expires_in),
+        token=secrets.token_urlsafe(32),  # Tạo token 32 byte an toàn
+        scope='read write'
+    )
+    refresh_token = RefreshToken.objects.create(
+        user=user,
+        application=application,
+        token=secrets.token_urlsafe(32),
+        access_token=access_token
+    )
+    enforce_token_cap(user)
+    return access_token, refresh_token
+
+
+def enforce_token_cap(user, limit=None):
+    """
+    Chỉ giữ `limit` access token còn hạn mới nhất của user; các token cũ hơn bị thu hồi.
+    """
+    limit = max_active_tokens() if limit is None else limit
+    stale_ids = list(
+        AccessToken.objects.filter(user=user, expires__gt=timezone.now())
+        .order_by('-expires', '-id').values_list('id', flat=True)[limit:]
+    )
+    if stale_ids:
+        now = timezone.now()
+        RefreshToken.objects.filter(access_token_id__in=stale_ids, revoked__isnull=True).update(revoked=now)
+        AccessToken.objects.filter(id__in=stale_ids).update(expires=now)
+        auth_cache.invalidate_user(user.pk)
+    return len(stale_ids)
+
+
+def revoke_user_tokens(user):
+    """
+    Thu hồi mọi token của user bằng hai lệnh UPDATE (không xóa từng token).
+    Các dòng đã thu hồi sẽ được purge_expired() xóa sau.
+    """
+    now = timezone.now()
+    RefreshToken.objects.filter(user=user, revoked__isnull=True).update(revoked=now)
+    AccessToken.objects.filter(user=user, expires__gt=now).update(expires=now)
+    auth_cache.invalidate_user(user.pk)
+
+
+def _delete_in_batches(queryset, batch_size, sleep):
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        # Mỗi lô là một transaction ngắn theo khóa chính, không giữ khóa lâu trên bảng
+        queryset.model.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        if sleep:
+            time.sleep(sleep)
+
+
+def purge_expired(batch_size=1000, sleep=0):
+    """
+    Xóa refresh token đã thu hồi hoặc quá hạn, sau đó xóa access token hết hạn không còn refresh token.
+    Trả về (số refresh token, số access token) đã xóa.
+    """
+    now = timezone.now()
+    refresh_expire_seconds = oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS
+    condition = Q(revoked__lt=now)
+    if refresh_expire_seconds:
+        condition |= Q(created__lt=now - timedelta(seconds=refresh_expire_seconds))
+    refresh_deleted = _delete_in_batches(RefreshToken.objects.filter(condition), batch_size, sleep)
+
+    access_tokens = AccessToken.objects.filter(expires__lt=now, refresh_token__isnull=True)
+    access_deleted = _delete_in_batches(access_tokens, batch_size, sleep)
+    return refresh_deleted, access_deleted
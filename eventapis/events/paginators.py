@@ -0,0 +1,167 @@
+"""
+Phân trang kiểu keyset (cursor) cho toàn bộ API.
+
+Thay vì OFFSET, trang sau được lấy bằng điều kiện "đứng sau bản ghi cuối của trang trước"
+theo thứ tự sắp xếp, nên trang thứ 1000 tốn chi phí như trang đầu.
+Thứ tự mặc định là -id (như BaseModel); view có thể khai báo `keyset_ordering`,
+trường cuối cùng phải là khóa duy nhất (id).
+"""
+import base64
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()  # Giữ nguyên micro giây để so sánh bằng chính xác
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(pagination.BasePagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Cursor không hợp lệ.'
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', None) or self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.nullable = [self._is_nullable(queryset, name) for name in self.fields]
+
+        order_by = []
+        for name, field, nullable in zip(self.ordering, self.fields, self.nullable):
+            expression = F(field).desc if name.startswith('-') else F(field).asc
+            # NULL luôn nằm cuối để điều kiện keyset nhất quán trên mọi CSDL
+            order_by.append(expression(nulls_last=True) if nullable else expression())
+        queryset = queryset.order_by(*order_by)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(self._clean_position(queryset, position)))
+
+        results = list(queryset[:self.page_size + 1])
+        page = results[:self.page_size]
+        self.next_position = None
+        if len(results) > self.page_size:
+            self.next_position = [_encode_value(getattr(page[-1], field)) for field in self.fields]
+        return page
+
+    def _is_nullable(self, queryset, name):
+        try:
+            return queryset.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            return False  # Giá trị annotate (ví dụ search_rank) không NULL
+
+    def _clean_position(self, queryset, position):
+        """
+        Chuyển giá trị trong cursor về kiểu của từng trường; cursor bị sửa tay (sai kiểu, NULL ở trường
+        không NULL) trả về 404 thay vì lỗi 500 khi lọc.
+        """
+        cleaned = []
+        for field, nullable, value in zip(self.fields, self.nullable, position):
+            if value is None:
+                if not nullable:
+                    raise NotFound(self.invalid_cursor_message)
+                cleaned.append(None)
+                continue
+            if (isinstance(value, bool) or not isinstance(value, (str, int, float))
+                    or isinstance(value, float) and not math.isfinite(value)):
+                # json.loads chấp nhận Infinity, NaN, 1e400
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                model_field = queryset.model._meta.get_field(field)
+            except FieldDoesNotExist:
+                # Giá trị annotate (ví dụ search_rank) là số
+                if isinstance(value, str):
+                    raise NotFound(self.invalid_cursor_message)
+                cleaned.append(value)
+                continue
+            try:
+                cleaned.append(model_field.to_python(value))
+            except (TypeError, ValueError, OverflowError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def _after(self, position):
+        """
+        Điều kiện "đứng sau `position`": (f1 sau v1) OR (f1 = v1 AND f2 sau v2) OR ...
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for name, field, nullable, value in zip(self.ordering, self.fields, self.nullable, position):
+            if value is None:
+                # Đang ở vùng NULL cuối danh sách: không có gì "sau" NULL ngoài các trường kế tiếp
+                after = None
+                same = Q(**{f'{field}__isnull': True})
+            else:
+                lookup = 'lt' if name.startswith('-') else 'gt'
+                after = Q(**{f'{field}__{lookup}': value})
+                if nullable:
+                    after |= Q(**{f'{field}__isnull': True})
+                same = Q(**{field: value})
+            if after is not None:
+                condition |= equal & after
+            equal &= same
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii') + b'=' * (-len(encoded) % 4)))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).rstrip(b'=').decode('ascii')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
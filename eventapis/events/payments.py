@@ -0,0 +1,108 @@
+"""
+Chốt kết quả thanh toán VNPay (IPN và return URL) theo vnp_TxnRef.
+
+VNPay gửi lại IPN nhiều lần và trình duyệt gọi return URL gần như cùng lúc, nên việc chuyển
+trạng thái là một lệnh UPDATE có điều kiện (pending -> completed/failed) trong transaction:
+chỉ một callback thắng, các callback trùng lặp trả về 'duplicate' mà không ghi gì thêm.
+Thanh toán 'expired' (vé đã bị hủy trước khi VNPay báo kết quả) vẫn được chốt: nếu khách đã trả tiền thì
+vé được giữ chỗ lại, hết chỗ thì ghi nhận cần hoàn tiền.
+"""
+import logging
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from events import inventory, jobs, metrics, realtime, rollups
+from events.models import Payment, Ticket
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = 'completed'
+FAILED = 'failed'
+DUPLICATE = 'duplicate'
+NOT_FOUND = 'not_found'
+INVALID_AMOUNT = 'invalid_amount'
+
+# Trạng thái thanh toán còn chờ kết quả từ VNPay
+OPEN_STATUSES = ('pending', 'expired')
+
+PaymentResult = namedtuple('PaymentResult', ['outcome', 'payment'])
+
+
+def payment_id_from_txn_ref(txn_ref):
+    payment_id = (txn_ref or '').split('_')[0]
+    return int(payment_id) if payment_id.isdigit() else None
+
+
+def _amount_matches(payment, vnp_amount):
+    try:
+        return Decimal(vnp_amount) == payment.amount * 100  # VNPay gửi số tiền VND * 100
+    except (TypeError, InvalidOperation):
+        return False
+
+
+def finalize_payment(txn_ref, response_code, vnp_amount=None):
+    """
+    Ghi nhận kết quả thanh toán đã được kiểm tra chữ ký. response_code '00' là thành công.
+    Trả về PaymentResult(outcome, payment); payment là None khi không tìm thấy.
+    """
+    result = _finalize_payment(txn_ref, response_code, vnp_amount)
+    metrics.vnpay_payment(response_code, result.outcome)
+    return result
+
+
+def _finalize_payment(txn_ref, response_code, vnp_amount):
+    payment_id = payment_id_from_txn_ref(txn_ref)
+    payment = Payment.objects.select_related('ticket__event').filter(id=payment_id).first() if payment_id else None
+    if payment is None:
+        return PaymentResult(NOT_FOUND, None)
+    if payment.status not in OPEN_STATUSES:
+        return PaymentResult(DUPLICATE, payment)
+    if vnp_amount is not None and not _amount_matches(payment, vnp_amount):
+        return PaymentResult(INVALID_AMOUNT, payment)
+
+    now = timezone.now()
+    if response_code != '00':
+        updated = Payment.objects.filter(id=payment.id, status__in=OPEN_STATUSES).update(status='failed',
+                                                                                        updated_date=now)
+        if not updated:
+            payment.refresh_from_db(fields=['status'])
+            return PaymentResult(DUPLICATE, payment)
+        payment.status = 'failed'
+        realtime.publish(payment.ticket.user_id, 'payment', {'payment_id': payment.id, 'ticket_id': payment.ticket_id,
+                                                             'status': 'failed'})
+        return PaymentResult(FAILED, payment)
+
+    ticket = payment.ticket
+    with transaction.atomic():
+        updated = Payment.objects.filter(id=payment.id, status__in=OPEN_STATUSES).update(status='completed',
+                                                                                        updated_date=now)
+        if not updated:
+            # Callback khác đã chốt giao dịch này trước
+            payment.refresh_from_db(fields=['status'])
+            return PaymentResult(DUPLICATE, payment)
+
+        booked = Ticket.objects.filter(id=ticket.id, status='pending').update(status='booked', updated_date=now)
+        if not booked and inventory.reserve(ticket.event_id, ticket.ticket_type, ticket.quantity):
+            # Vé đã bị hủy do hết hạn trước khi VNPay báo thành công: giữ chỗ lại nếu còn vé
+            booked = Ticket.objects.filter(id=ticket.id, status='cancelled').update(status='booked', updated_date=now)
+        if booked:
+            inventory.commit(ticket.event_id, ticket.ticket_type, ticket.quantity)
+            rollups.record(ticket.event_id, ticket.ticket_type, booked=ticket.quantity, revenue=payment.amount)
+            # Một dòng cho cả tháng, dùng chung mọi sự kiện: cập nhật sau commit để không giữ khóa dòng đó
+            # suốt transaction thanh toán
+            month, quantity = rollups.month_of(ticket.event.start_time), ticket.quantity
+            transaction.on_commit(lambda: rollups.record_month(month, attendees=quantity))
+            # update() không phát tín hiệu post_save nên phải tự đưa email vé vào hàng đợi
+            jobs.enqueue_ticket_email(ticket)
+            metrics.ticket_status('booked')
+            realtime.ticket_status(ticket.id, ticket.event_id, ticket.user_id, 'booked')
+            ticket.status = 'booked'
+        else:
+            logger.error('Thanh toán %s thành công nhưng vé %s đã hủy và hết chỗ; cần hoàn tiền.',
+                         payment.id, ticket.id)
+
+    payment.status = 'completed'
+    return PaymentResult(COMPLETED, payment)
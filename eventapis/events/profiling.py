@@ -0,0 +1,183 @@
+"""
+Lấy mẫu profile của request thật trên production.
+
+Bật bằng settings.PROFILING_SAMPLE_EVERY = N (profile ngẫu nhiên 1/N request) hoặc gửi header
+X-Profile với token ký bằng SECRET_KEY (lấy ở trang admin profiles/, hết hạn sau PROFILING_TOKEN_MAX_AGE giây).
+Request được chọn chạy kèm một thread lấy mẫu stack của thread xử lý request mỗi PROFILING_INTERVAL giây;
+kết quả ghi dạng "folded stacks" (mỗi dòng `hàm_gốc;...;hàm_lá số_mẫu`, dùng được với flamegraph.pl /
+speedscope) vào PROFILING_DIR/<action>/. Request không được chọn chỉ tốn một phép random và một lần đọc header.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+from events.middleware import action_name
+
+HEADER = 'HTTP_X_PROFILE'
+SIGNING_SALT = 'events.profiling'
+UNSAFE_NAME_RE = re.compile(r'[^\w.-]')
+
+
+def profiles_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+def make_token():
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def _valid_token(value):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            value, max_age=getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600))
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    for prefix in sorted({str(settings.BASE_DIR), *sys.path}, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    name = getattr(code, 'co_qualname', code.co_name)  # co_qualname chỉ có từ Python 3.11
+    return f'{name} ({filename}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """
+    Lấy mẫu stack của một thread theo chu kỳ; chỉ giữ các frame nằm dưới frame có code `root`.
+    """
+
+    def __init__(self, thread_id, root, interval):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks = Counter()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            codes = []
+            while frame is not None and frame.f_code is not self.root:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            if frame is None or not codes:
+                continue
+            labels = []
+            for code in reversed(codes):
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code)
+                labels.append(label)
+            self.stacks[';'.join(labels)] += 1
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._sampled(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), self.__call__.__code__,
+                               getattr(settings, 'PROFILING_INTERVAL', 0.002))
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        elapsed = time.perf_counter() - started
+        if request.resolver_match is not None and sampler.stacks:
+            save(action_name(request.resolver_match.func, request), request, elapsed, sampler.stacks)
+        return response
+
+    def _sampled(self, request):
+        token = request.META.get(HEADER)
+        if token:
+            return _valid_token(token)
+        every = getattr(settings, 'PROFILING_SAMPLE_EVERY', 0)
+        return every > 0 and random.random() * every < 1
+
+
+def save(action, request, elapsed, stacks):
+    """
+    Ghi profile; mỗi action chỉ giữ PROFILING_MAX_PER_ACTION profile mới nhất.
+    """
+    directory = profiles_dir() / UNSAFE_NAME_RE.sub('_', action)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Tên file sắp xếp theo thời gian: <ngày-giờ>-<nano giây>-<method>-<thời gian xử lý>.folded
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{time.time_ns() % 10 ** 9:09d}-{request.method}-{elapsed * 1000:.0f}ms'
+    with open(directory / f'{name}.folded', 'w', encoding='utf-8') as output:
+        for stack, count in stacks.most_common():
+            output.write(f'{stack} {count}\n')
+    for old in sorted(directory.glob('*.folded'))[:-getattr(settings, 'PROFILING_MAX_PER_ACTION', 50)]:
+        old.unlink(missing_ok=True)
+
+
+def list_profiles():
+    """
+    {action: [tên file profile, mới nhất trước]}.
+    """
+    root = profiles_dir()
+    if not root.is_dir():
+        return {}
+    return {directory.name: sorted((path.name for path in directory.glob('*.folded')), reverse=True)
+            for directory in sorted(root.iterdir()) if directory.is_dir()}
+
+
+def read_profile(action, name):
+    """
+    Nội dung file profile; tên được kiểm tra để không đọc được file ngoài PROFILING_DIR.
+    """
+    if UNSAFE_NAME_RE.search(action) or UNSAFE_NAME_RE.search(name) or not name.endswith('.folded'):
+        raise FileNotFoundError(name)
+    return (profiles_dir() / action / name).read_text(encoding='utf-8')
+
+
+def build_tree(folded, min_fraction=0.005):
+    """
+    Dựng cây gọi hàm từ folded stacks để hiển thị dạng thu gọn được; bỏ nhánh dưới `min_fraction` tổng số mẫu.
+    """
+    root = {'name': 'tất cả', 'count': 0, 'children': {}}
+    for line in folded.splitlines():
+        if not line:
+            continue
+        stack, _, count = line.rpartition(' ')
+        count = int(count)
+        root['count'] += count
+        node = root
+        for name in stack.split(';'):
+            node = node['children'].setdefault(name, {'name': name, 'count': 0, 'children': {}})
+            node['count'] += count
+
+    total = root['count'] or 1
+
+    def finish(node):
+        node['percent'] = round(node['count'] * 100 / total, 1)
+        node['children'] = [finish(child) for child in sorted(node['children'].values(), key=lambda n: -n['count'])
+                            if child['count'] / total >= min_fraction]
+        return node
+
+    return finish(root)
@@ -0,0 +1,42 @@
+"""
+Công cụ đo số truy vấn SQL của một endpoint.
+
+Một endpoint danh sách không có N+1 phải tốn cùng số truy vấn dù trang có 1 hay 100 dòng;
+assert_constant_queries() gọi endpoint với hai kích thước trang và so sánh.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountError(AssertionError):
+    pass
+
+
+def count_queries(func, *args, **kwargs):
+    """
+    Gọi func và trả về (kết quả, danh sách truy vấn đã chạy).
+    """
+    with CaptureQueriesContext(connection) as context:
+        result = func(*args, **kwargs)
+    return result, context.captured_queries
+
+
+def assert_constant_queries(client, url, small=1, large=100, expected=None):
+    """
+    Gọi `url` với page_size nhỏ và lớn; raise QueryCountError nếu số truy vấn khác nhau
+    hoặc khác `expected`. Trả về số truy vấn.
+    """
+    separator = '&' if '?' in url else '?'
+    counts = []
+    for size in (small, large):
+        response, queries = count_queries(client.get, f'{url}{separator}page_size={size}')
+        if response.status_code != 200:
+            raise QueryCountError(f'{url}: HTTP {response.status_code}')
+        counts.append(len(queries))
+
+    if counts[0] != counts[1]:
+        raise QueryCountError(f'{url}: {counts[0]} truy vấn với page_size={small} '
+                              f'nhưng {counts[1]} truy vấn với page_size={large} (N+1?)')
+    if expected is not None and counts[0] != expected:
+        raise QueryCountError(f'{url}: {counts[0]} truy vấn, mong đợi {expected}')
+    return counts[0]
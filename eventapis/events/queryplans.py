@@ -0,0 +1,52 @@
+"""
+Đọc kế hoạch thực thi (EXPLAIN) của truy vấn SQL và phát hiện quét toàn bảng.
+
+Hỗ trợ MySQL (EXPLAIN, cột `type` = 'ALL') và SQLite (EXPLAIN QUERY PLAN, dòng 'SCAN <bảng>'
+không kèm index). Dùng bởi lệnh explain_hot_queries để bắt truy vấn nóng mất index.
+"""
+import re
+
+from django.db import connection
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+class QueryPlanError(AssertionError):
+    pass
+
+
+def explain(sql, params=None):
+    """
+    Trả về danh sách dòng kế hoạch (dict) của truy vấn `sql`.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [{'id': row[0], 'parent': row[1], 'detail': row[3]} for row in cursor.fetchall()]
+        if connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    raise QueryPlanError(f'Chưa hỗ trợ EXPLAIN cho CSDL {connection.vendor}.')
+
+
+def full_scans(plan):
+    """
+    Tên các bảng bị quét toàn bộ trong kế hoạch.
+    """
+    tables = []
+    for row in plan:
+        if connection.vendor == 'sqlite':
+            match = SQLITE_SCAN_RE.match(row['detail'])
+            if match:
+                tables.append(match.group(1))
+        elif row.get('type') == 'ALL' and row.get('table') and not row['table'].startswith('<'):
+            tables.append(row['table'])  # Bỏ qua bảng tạm <derived...>/<subquery...>
+    return tables
+
+
+def format_plan(plan):
+    if connection.vendor == 'sqlite':
+        return '\n'.join(f"  {row['detail']}" for row in plan)
+    return '\n'.join('  ' + ' '.join(f'{key}={value}' for key, value in row.items() if value is not None)
+                     for row in plan)
@@ -0,0 +1,285 @@
+"""
+Đẩy sự kiện thời gian thực tới client bằng Server-Sent Events (SSE) qua ASGI.
+
+Client mở GET /stream/?token=<DRF token hoặc OAuth2 access token> (hoặc header Authorization)
+và nhận các sự kiện:
+- ticket: {"ticket_id", "event_id", "status"} khi vé được thanh toán, hủy hoặc hết hạn;
+- payment: {"payment_id", "ticket_id", "status"} khi thanh toán thất bại;
+- notification: {"message", "created_date"} khi có thông báo mới.
+Mỗi kết nối chỉ là một coroutine chờ trên một asyncio.Queue nên một process giữ được hàng chục
+nghìn kết nối rảnh; heartbeat (comment SSE) giữ kết nối qua proxy.
+
+Broker chọn qua settings.REALTIME_BROKER: InMemoryBroker (mặc định, chỉ trong một process — dùng
+khi chạy một process ASGI và cho test) hoặc RedisBroker (nhiều process, cần gói redis và REALTIME_REDIS_URL).
+Code đồng bộ gửi sự kiện bằng publish()/publish_on_commit().
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import threading
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from events.authentication import auth_cache, drf_token_key, oauth2_token_key
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = '/stream/'
+QUEUE_SIZE = 100
+DISCONNECT = object()
+
+
+class Subscription:
+    """
+    Hàng đợi sự kiện của một kết nối, gắn với event loop đang phục vụ kết nối đó.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = 0
+
+    def close(self):
+        # Tín hiệu đóng phải vào được hàng đợi kể cả khi đầy
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(DISCONNECT)
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Client đọc quá chậm: bỏ sự kiện, client tự đồng bộ lại qua API khi kết nối lại
+            self.dropped += 1
+
+
+class InMemoryBroker:
+    """
+    Broker trong process: publish từ bất kỳ thread nào, giao tới các kết nối của user trên event loop của chúng.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, event, data):
+        self.publish_many([(user_id, event, data)])
+
+    def publish_many(self, messages):
+        with self._lock:
+            targets = [(subscription, (event, data)) for user_id, event, data in messages
+                       for subscription in self._subscriptions.get(user_id, ())]
+        for subscription, message in targets:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Broker nhiều process qua Redis pub/sub: publish gửi lên kênh chung, mỗi process ASGI có một
+    listener chuyển tiếp message tới các kết nối cục bộ của nó.
+    """
+    channel = 'events:realtime'
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('RedisBroker cần cài gói redis (pip install redis).')
+        url = getattr(settings, 'REALTIME_REDIS_URL', 'redis://localhost:6379/0')
+        self._client = redis.Redis.from_url(url)
+        self._async_client = redis.asyncio.Redis.from_url(url)
+        self._listener = None
+
+    def subscribe(self, user_id):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        return super().subscribe(user_id)
+
+    def publish_many(self, messages):
+        pipeline = self._client.pipeline(transaction=False)
+        for user_id, event, data in messages:
+            pipeline.publish(self.channel, json.dumps([user_id, event, data], cls=DjangoJSONEncoder))
+        pipeline.execute()
+
+    async def _listen(self):
+        pubsub = self._async_client.pubsub()
+        await pubsub.subscribe(self.channel)
+        async for item in pubsub.listen():
+            if item.get('type') == 'message':
+                user_id, event, data = json.loads(item['data'])
+                super().publish_many([(user_id, event, data)])
+
+
+@lru_cache(maxsize=1)
+def get_broker():
+    return import_string(getattr(settings, 'REALTIME_BROKER', 'events.realtime.InMemoryBroker'))()
+
+
+def publish(user_id, event, data):
+    try:
+        get_broker().publish(user_id, event, data)
+    except Exception:
+        # Đẩy thời gian thực chỉ là tối ưu: lỗi broker không được làm hỏng request
+        logger.exception('Realtime publish failed')
+
+
+def publish_on_commit(user_id, event, data):
+    transaction.on_commit(lambda: publish(user_id, event, data))
+
+
+def publish_many_on_commit(messages):
+    messages = list(messages)
+    if not messages:
+        return
+
+    def send():
+        try:
+            get_broker().publish_many(messages)
+        except Exception:
+            logger.exception('Realtime publish failed')
+    transaction.on_commit(send)
+
+
+def ticket_status(ticket_id, event_id, user_id, status):
+    publish_on_commit(user_id, 'ticket', {'ticket_id': ticket_id, 'event_id': event_id, 'status': status})
+
+
+def _cached_user_id(token):
+    for key in (drf_token_key(token), oauth2_token_key(token)):
+        cached = auth_cache.get(key)
+        if cached is not None:
+            return cached[0].pk
+    return None
+
+
+def _user_id_for_token(token):
+    """
+    Tìm user của DRF token hoặc OAuth2 access token và lưu vào cache chung với lớp xác thực REST.
+    """
+    from oauth2_provider.models import AccessToken
+    from rest_framework.authtoken.models import Token
+
+    close_old_connections()
+    try:
+        drf_token = Token.objects.select_related('user').filter(key=token).first()
+        if drf_token is not None and drf_token.user.is_active:
+            auth_cache.set(drf_token_key(token), drf_token.user, drf_token)
+            return drf_token.user_id
+        access_token = AccessToken.objects.select_related('user').filter(
+            token_checksum=hashlib.sha256(token.encode('utf-8')).hexdigest()).first()
+        if access_token is not None and access_token.is_valid() and access_token.user.is_active:
+            auth_cache.set(oauth2_token_key(token), access_token.user, access_token, expires=access_token.expires)
+            return access_token.user_id
+        return None
+    finally:
+        close_old_connections()
+
+
+def _token_from_scope(scope):
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0].lower() in ('bearer', 'token'):
+                return parts[1]
+    tokens = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token')
+    return tokens[0] if tokens else None
+
+
+def _format(event_id, event, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'id: {event_id}\nevent: {event}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+async def _respond(send, status_code, message):
+    await send({'type': 'http.response.start', 'status': status_code,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body',
+                'body': json.dumps({'detail': message}, ensure_ascii=False).encode('utf-8')})
+
+
+async def stream(scope, receive, send):
+    """
+    ASGI app của endpoint SSE.
+    """
+    if scope['method'] != 'GET':
+        return await _respond(send, 405, 'Chỉ hỗ trợ GET.')
+    token = _token_from_scope(scope)
+    user_id = _cached_user_id(token) if token else None
+    if token and user_id is None:
+        user_id = await sync_to_async(_user_id_for_token)(token)
+    if user_id is None:
+        return await _respond(send, 401, 'Cần đăng nhập (token).')
+
+    broker = get_broker()
+    subscription = broker.subscribe(user_id)
+    heartbeat = getattr(settings, 'REALTIME_HEARTBEAT_SECONDS', 25)
+    counter = itertools.count(1)
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, subscription))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),  # Tắt buffer của nginx
+        ]})
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n: connected\n\n', 'more_body': True})
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                body = b': heartbeat\n\n'
+            else:
+                if message is DISCONNECT:
+                    break
+                body = _format(next(counter), *message)
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except OSError:
+        pass  # Client đã đóng kết nối
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
+
+
+async def _watch_disconnect(receive, subscription):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    subscription.close()
+
+
+def router(django_application):
+    """
+    Bọc ứng dụng ASGI của Django: STREAM_PATH đi vào stream(), mọi request khác đi vào Django.
+    """
+    async def application(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+            return await stream(scope, receive, send)
+        return await django_application(scope, receive, send)
+    return application
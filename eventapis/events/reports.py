@@ -0,0 +1,84 @@
+"""
+Báo cáo doanh thu và phản hồi cho nhà tổ chức.
+
+Số vé và doanh thu đọc từ bảng thống kê cộng dồn EventDailyStat (events/rollups.py) bằng một
+truy vấn GROUP BY theo sự kiện; điểm đánh giá trung bình là truy vấn GROUP BY thứ hai trên Review.
+Khoảng ngày lọc theo ngày thanh toán (với vé) và ngày đánh giá (với review).
+"""
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DecimalField, IntegerField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date
+
+from events.models import Event, Review
+
+
+def parse_date_range(params):
+    """
+    Đọc tham số `from` / `to` (YYYY-MM-DD). Báo ValueError nếu sai định dạng hoặc from > to.
+    """
+    dates = []
+    for name in ('from', 'to'):
+        value = (params.get(name) or '').strip()
+        parsed = parse_date(value) if value else None
+        if value and parsed is None:
+            raise ValueError(f'Ngày không hợp lệ: {name}={value} (định dạng YYYY-MM-DD).')
+        dates.append(parsed)
+    if dates[0] and dates[1] and dates[0] > dates[1]:
+        raise ValueError('Ngày bắt đầu phải trước ngày kết thúc.')
+    return tuple(dates)
+
+
+def _sum(field, condition, output_field):
+    return Coalesce(Sum(f'daily_stats__{field}', filter=condition), Value(0), output_field=output_field)
+
+
+def organizer_report(organizer, date_from=None, date_to=None):
+    """
+    Trả về dict gồm danh sách sự kiện của `organizer` (vé bán theo loại, doanh thu, điểm đánh giá)
+    và tổng cộng, trong khoảng ngày [date_from, date_to] (bỏ trống = không giới hạn).
+    """
+    period = Q()
+    reviews = Review.objects.filter(event__organizer=organizer, event__active=True, active=True)
+    if date_from:
+        period &= Q(daily_stats__date__gte=date_from)
+        reviews = reviews.filter(created_date__date__gte=date_from)
+    if date_to:
+        period &= Q(daily_stats__date__lte=date_to)
+        reviews = reviews.filter(created_date__date__lte=date_to)
+
+    count_field = IntegerField()
+    money_field = DecimalField(max_digits=14, decimal_places=2)
+    events = Event.objects.filter(organizer=organizer, active=True).order_by('-id').values('id', 'name').annotate(
+        tickets_regular=_sum('tickets_booked', period & Q(daily_stats__ticket_type='regular'), count_field),
+        tickets_vip=_sum('tickets_booked', period & Q(daily_stats__ticket_type='vip'), count_field),
+        tickets_cancelled=_sum('tickets_cancelled', period, count_field),
+        revenue=_sum('revenue', period, money_field),
+    )
+    ratings = {row['event_id']: row for row in reviews.values('event_id').annotate(
+        avg_rating=Avg('rating'), review_count=Count('id')).order_by()}
+
+    rows = []
+    totals = {'tickets_regular': 0, 'tickets_vip': 0, 'tickets_total': 0, 'tickets_cancelled': 0,
+              'revenue': Decimal(0), 'review_count': 0}
+    rating_sum = 0
+    for event in events:
+        rating = ratings.get(event['id'], {})
+        row = dict(event,
+                   tickets_total=event['tickets_regular'] + event['tickets_vip'],
+                   avg_rating=round(rating['avg_rating'], 2) if rating else None,
+                   review_count=rating.get('review_count', 0))
+        rows.append(row)
+        for key in totals:
+            totals[key] += row[key]
+        if rating:
+            rating_sum += rating['avg_rating'] * rating['review_count']
+    totals['avg_rating'] = round(rating_sum / totals['review_count'], 2) if totals['review_count'] else None
+
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'events': rows,
+        'totals': totals,
+    }
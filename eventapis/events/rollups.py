@@ -0,0 +1,124 @@
+"""
+Bảng thống kê cộng dồn EventDailyStat (sự kiện / ngày / loại vé).
+
+- record(): cộng dồn khi vé được thanh toán (payments.finalize_payment) hoặc bị hủy
+  (cancel_pending_ticket, expiry). Mỗi lần là một lệnh UPDATE ... SET x = x + n trên đúng một dòng.
+- rebuild(): tính lại toàn bộ từ Ticket/Payment (lệnh rebuild_rollups), dùng để khởi tạo hoặc sửa lệch.
+- MonthlyEventStat (theo tháng diễn ra sự kiện): record_month() khi sự kiện được tạo / đổi ngày / xóa và
+  khi vé được thanh toán; rebuild_monthly() tính lại từ Event và EventDailyStat.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from events.models import Event, EventDailyStat, MonthlyEventStat, Payment, Ticket
+
+
+def record(event_id, ticket_type, booked=0, revenue=0, cancelled=0, day=None):
+    day = day or timezone.localdate()
+    lookup = {'event_id': event_id, 'date': day, 'ticket_type': ticket_type}
+    changes = {
+        'tickets_booked': F('tickets_booked') + booked,
+        'revenue': F('revenue') + revenue,
+        'tickets_cancelled': F('tickets_cancelled') + cancelled,
+    }
+    if EventDailyStat.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        # Savepoint riêng để lỗi trùng khóa không làm hỏng transaction bên ngoài
+        with transaction.atomic():
+            EventDailyStat.objects.create(tickets_booked=booked, revenue=revenue, tickets_cancelled=cancelled,
+                                          **lookup)
+    except IntegrityError:
+        # Request khác vừa tạo dòng của ngày này: cộng dồn vào dòng đó
+        EventDailyStat.objects.filter(**lookup).update(**changes)
+
+
+def month_of(start_time):
+    return timezone.localtime(start_time).date().replace(day=1) if start_time else None
+
+
+def record_month(month, events=0, attendees=0):
+    """
+    Cộng dồn vào MonthlyEventStat của `month` (ngày đầu tháng, None thì bỏ qua).
+    """
+    if month is None or not (events or attendees):
+        return
+    changes = {'event_count': F('event_count') + events, 'attendee_count': F('attendee_count') + attendees}
+    if MonthlyEventStat.objects.filter(month=month).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            MonthlyEventStat.objects.create(month=month, event_count=events, attendee_count=attendees)
+    except IntegrityError:
+        MonthlyEventStat.objects.filter(month=month).update(**changes)
+
+
+def rebuild_monthly():
+    """
+    Tính lại toàn bộ MonthlyEventStat. Trả về số tháng.
+    """
+    stats = defaultdict(lambda: {'event_count': 0, 'attendee_count': 0})
+    events = Event.objects.filter(start_time__isnull=False).annotate(month=TruncMonth('start_time')).values(
+        'month').annotate(total=Count('id')).order_by()
+    for row in events:
+        stats[month_of(row['month'])]['event_count'] = row['total']
+    attendees = EventDailyStat.objects.filter(event__start_time__isnull=False).annotate(
+        month=TruncMonth('event__start_time')).values('month').annotate(total=Sum('tickets_booked')).order_by()
+    for row in attendees:
+        stats[month_of(row['month'])]['attendee_count'] = row['total'] or 0
+
+    with transaction.atomic():
+        MonthlyEventStat.objects.all().delete()
+        MonthlyEventStat.objects.bulk_create([MonthlyEventStat(month=month, **values)
+                                              for month, values in stats.items()])
+    return len(stats)
+
+
+def record_cancellations(rows, day=None):
+    """
+    Ghi nhận vé bị hủy cho nhiều vé; `rows` là các bộ (event_id, ticket_type, quantity).
+    """
+    totals = defaultdict(int)
+    for event_id, ticket_type, quantity in rows:
+        totals[(event_id, ticket_type)] += quantity
+    for (event_id, ticket_type), quantity in totals.items():
+        record(event_id, ticket_type, cancelled=quantity, day=day)
+
+
+def rebuild(event_ids=None, batch_size=1000):
+    """
+    Xóa và tính lại EventDailyStat (của các sự kiện `event_ids`, hoặc toàn bộ). Trả về số dòng đã tạo.
+    Ngày của vé lấy theo lần cập nhật cuối (updated_date), doanh thu theo ngày thanh toán hoàn tất.
+    """
+    tickets = Ticket.objects.all()
+    payments = Payment.objects.filter(status='completed', ticket__status='booked')
+    if event_ids is not None:
+        tickets = tickets.filter(event_id__in=event_ids)
+        payments = payments.filter(ticket__event_id__in=event_ids)
+
+    stats = defaultdict(lambda: {'tickets_booked': 0, 'revenue': Decimal(0), 'tickets_cancelled': 0})
+    for status, field in (('booked', 'tickets_booked'), ('cancelled', 'tickets_cancelled')):
+        rows = tickets.filter(status=status).annotate(day=TruncDate('updated_date')).values(
+            'event_id', 'day', 'ticket_type').annotate(total=Sum('quantity')).order_by()
+        for row in rows:
+            stats[(row['event_id'], row['day'], row['ticket_type'])][field] = row['total']
+    rows = payments.annotate(day=TruncDate('updated_date')).values(
+        'ticket__event_id', 'day', 'ticket__ticket_type').annotate(total=Sum('amount')).order_by()
+    for row in rows:
+        stats[(row['ticket__event_id'], row['day'], row['ticket__ticket_type'])]['revenue'] = row['total']
+
+    with transaction.atomic():
+        existing = EventDailyStat.objects.all()
+        if event_ids is not None:
+            existing = existing.filter(event_id__in=event_ids)
+        existing.delete()
+        EventDailyStat.objects.bulk_create(
+            [EventDailyStat(event_id=event_id, date=day, ticket_type=ticket_type, **values)
+             for (event_id, day, ticket_type), values in stats.items()],
+            batch_size=batch_size)
+    return len(stats)
@@ -0,0 +1,105 @@
+"""
+Tìm kiếm sự kiện bằng chỉ mục đảo (bảng EventSearchTerm) thay cho LIKE '%...%'.
+
+Văn bản của tên, mô tả (đã bỏ thẻ HTML), địa điểm, tag và tên danh mục được tách thành từ,
+bỏ dấu tiếng Việt và chuyển về chữ thường. Truy vấn tra các từ qua index (term, event),
+yêu cầu sự kiện chứa đủ mọi từ khóa (từ cuối được so khớp tiền tố để hỗ trợ gõ dần)
+và xếp hạng theo tổng trọng số.
+"""
+import html
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+from django.utils.html import strip_tags
+
+from events.models import EventSearchTerm, EventTag
+
+FIELD_WEIGHTS = {'n': 10, 't': 6, 'c': 4, 'l': 3, 'd': 1}
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+_word_re = re.compile(r'\w{2,}')
+
+
+def normalize(text):
+    """
+    Bỏ dấu tiếng Việt và chuyển về chữ thường: "Hà Nội" -> "ha noi".
+    """
+    text = unicodedata.normalize('NFD', text.lower()).replace('đ', 'd')
+    return ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [word[:MAX_TERM_LENGTH] for word in _word_re.findall(normalize(html.unescape(strip_tags(text))))]
+
+
+def _event_fields(event):
+    tags = EventTag.objects.filter(event=event, active=True).values_list('tag', flat=True)
+    return {
+        'n': event.name,
+        'd': event.description,
+        'l': event.location,
+        't': ' '.join(tags),
+        'c': event.category.name if event.category_id else '',
+    }
+
+
+def build_terms(event_id, fields):
+    """
+    Các dòng chỉ mục (chưa lưu) của sự kiện từ `fields` dạng {'n': tên, 'd': mô tả, ...}.
+    """
+    rows = []
+    for field, text in fields.items():
+        for term, count in Counter(tokenize(text)).items():
+            rows.append(EventSearchTerm(event_id=event_id, field=field, term=term,
+                                        weight=count * FIELD_WEIGHTS[field]))
+    return rows
+
+
+def index_event(event):
+    """
+    Tạo lại các dòng chỉ mục của một sự kiện.
+    """
+    rows = build_terms(event.id, _event_fields(event))
+
+    with transaction.atomic():
+        EventSearchTerm.objects.filter(event=event).delete()
+        EventSearchTerm.objects.bulk_create(rows)
+
+
+def search_events(queryset, keyword=None, location=None):
+    """
+    Lọc `queryset` (Event) theo từ khóa và địa điểm bằng chỉ mục đảo.
+    Khi có từ khóa, kết quả được annotate `search_rank` (càng lớn càng liên quan).
+    """
+    if location:
+        for term in dict.fromkeys(tokenize(location)):
+            queryset = queryset.filter(id__in=EventSearchTerm.objects.filter(
+                field='l', term__startswith=term).values('event_id'))
+
+    if not keyword:
+        return queryset
+
+    terms = list(dict.fromkeys(tokenize(keyword)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset.annotate(search_rank=Value(0, output_field=IntegerField())).none()
+
+    *exact_terms, prefix = terms
+    matches = [Q(search_terms__term=term) for term in exact_terms] + [Q(search_terms__term__startswith=prefix)]
+
+    condition = Q()
+    for match in matches:
+        condition |= match
+
+    # filter() trước annotate() nên các phép tổng chỉ tính trên những dòng chỉ mục khớp từ khóa
+    queryset = queryset.filter(condition).annotate(
+        search_rank=Sum('search_terms__weight'),
+        **{f'_match_{i}': Max(Case(When(match, then=1), default=0, output_field=IntegerField()))
+           for i, match in enumerate(matches)}
+    )
+    return queryset.filter(**{f'_match_{i}': 1 for i in range(len(matches))})
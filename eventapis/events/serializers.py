@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from events.models import User, Category, Event, Ticket, Payment
+from events.models import User, Category, Event, Ticket, Payment, Review, Notification
 from django.utils import timezone
 
 
@@ -51,16 +51,21 @@ class EventSerializer(serializers.ModelSerializer):
     video = serializers.FileField(required=False, allow_null=True)
     start_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
     end_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
+    average_rating = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
         fields = [
             'id', 'organizer', 'category', 'category_id', 'name', 'description',
             'start_time', 'end_time', 'location', 'ticket_price_regular', 'ticket_price_vip',
-            'image', 'video', 'status', 'created_date', 'updated_date'
+            'capacity_regular', 'capacity_vip', 'image', 'video', 'status', 'created_date', 'updated_date',
+            'like_count', 'interest_count', 'rating_count', 'average_rating'
         ]
         extra_kwargs = {
             'status': {'read_only': True},
+            'like_count': {'read_only': True},
+            'interest_count': {'read_only': True},
+            'rating_count': {'read_only': True},
             'created_date': {'read_only': True},
             'updated_date': {'read_only': True}
         }
@@ -82,6 +87,10 @@ class EventSerializer(serializers.ModelSerializer):
 
         return data
 
+    def get_average_rating(self, obj):
+        # Tính từ bộ đếm trên chính dòng Event, không cần truy vấn bảng Review
+        return round(obj.rating_sum / obj.rating_count, 2) if obj.rating_count else None
+
     def create(self, validated_data):
         """
         Tự động gán organizer là user hiện tại.
@@ -102,17 +111,27 @@ class EventSerializer(serializers.ModelSerializer):
 class TicketSerializer(serializers.ModelSerializer):
     event_id = serializers.PrimaryKeyRelatedField(queryset=Event.objects.all(), source='event')
     total_price = serializers.SerializerMethodField()
+    qr_token = serializers.SerializerMethodField()
 
     class Meta:
         model = Ticket
-        fields = ['id', 'event_id', 'ticket_type', 'quantity', 'total_price', 'qr_code', 'created_date', 'status']
+        fields = ['id', 'event_id', 'ticket_type', 'quantity', 'total_price', 'qr_code', 'qr_token', 'created_date',
+                  'status', 'checked_in_at']
         extra_kwargs = {
             'qr_code': {'read_only': True},
             'created_date': {'read_only': True},
-            'status': {'read_only': True}
+            'status': {'read_only': True},
+            'checked_in_at': {'read_only': True}
         }
 
+    def get_qr_token(self, obj):
+        # Chỉ vé đã thanh toán mới có mã QR dùng để check-in
+        return obj.qr_token if obj.status == 'booked' else None
+
     def get_total_price(self, obj):
+        # Queryset đã annotate bằng Ticket.objects.with_total_price() thì không cần đọc obj.event
+        if hasattr(obj, 'total_price'):
+            return obj.total_price
         if obj.ticket_type == 'regular':
             return obj.quantity * obj.event.ticket_price_regular
         return obj.quantity * obj.event.ticket_price_vip
@@ -130,6 +149,17 @@ class TicketSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"quantity": "Số lượng vé phải lớn hơn 0."})
         return data
 
+class ReviewSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'user', 'rating', 'comment', 'created_date', 'updated_date']
+        extra_kwargs = {
+            'created_date': {'read_only': True},
+            'updated_date': {'read_only': True}
+        }
+
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
@@ -145,4 +175,10 @@ class PaymentSerializer(serializers.ModelSerializer):
         method = data.get('method')
         if method not in ['vnpay', 'momo', 'zalopay', 'credit_card']:
             raise serializers.ValidationError({"method": "Phương thức thanh toán không hợp lệ."})
-        return data
\ No newline at end of file
+        return data
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'message', 'is_read', 'created_date']
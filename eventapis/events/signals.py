@@ -0,0 +1,133 @@
+from django.db.models import QuerySet, Sum
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from oauth2_provider.models import AccessToken, Application
+from rest_framework.authtoken.models import Token
+
+from events import caching, inventory, jobs, oauth_tokens, rollups, search
+from events.authentication import auth_cache, drf_token_key, oauth2_token_key
+from events.models import Category, Event, EventDailyStat, EventTag, Ticket, User
+
+
+@receiver(post_save, sender=Event)
+def sync_event_inventory(sender, instance, **kwargs):
+    """
+    Cập nhật bộ đếm vé mỗi khi sự kiện được tạo hoặc sửa capacity.
+    """
+    inventory.sync_capacity(instance)
+
+
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, **kwargs):
+    search.index_event(instance)
+
+
+def _booked_tickets(event_id):
+    return event_id and (EventDailyStat.objects.filter(event_id=event_id).aggregate(
+        total=Sum('tickets_booked'))['total'] or 0)
+
+
+@receiver(pre_save, sender=Event)
+def remember_start_month(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (update_fields is not None and 'start_time' not in update_fields):
+        instance._previous_start_month = rollups.month_of(instance.start_time)
+        return
+    previous = Event.objects.filter(pk=instance.pk).values_list('start_time', flat=True).first()
+    instance._previous_start_month = rollups.month_of(previous)
+
+
+@receiver(post_save, sender=Event)
+def record_event_month(sender, instance, created, **kwargs):
+    """
+    Cập nhật MonthlyEventStat khi sự kiện được tạo hoặc đổi sang tháng khác (kéo theo số vé đã bán).
+    """
+    month = rollups.month_of(instance.start_time)
+    if created:
+        rollups.record_month(month, events=1)
+        return
+    previous = getattr(instance, '_previous_start_month', month)
+    if previous != month:
+        booked = _booked_tickets(instance.pk)
+        rollups.record_month(previous, events=-1, attendees=-booked)
+        rollups.record_month(month, events=1, attendees=booked)
+
+
+@receiver(pre_delete, sender=Event)
+def forget_event_month(sender, instance, **kwargs):
+    # pre_delete: EventDailyStat của sự kiện còn đó để trừ số vé đã bán
+    rollups.record_month(rollups.month_of(instance.start_time), events=-1, attendees=-_booked_tickets(instance.pk))
+
+
+@receiver(post_save, sender=EventTag)
+@receiver(post_delete, sender=EventTag)
+def index_tagged_event(sender, instance, **kwargs):
+    origin = kwargs.get('origin')
+    if isinstance(origin, Event) or (isinstance(origin, QuerySet) and origin.model is Event):
+        return  # Tag bị xóa theo sự kiện: chỉ mục của sự kiện cũng bị xóa, không đánh lại
+    event = Event.objects.filter(id=instance.event_id).first()
+    if event:
+        search.index_event(event)
+        caching.bump('events')  # Kết quả tìm kiếm đã cache phụ thuộc tag
+
+
+@receiver(post_save, sender=Category)
+def index_category_events(sender, instance, created, **kwargs):
+    """
+    Đổi tên danh mục có thể ảnh hưởng nhiều sự kiện: đánh chỉ mục lại trong worker nền.
+    """
+    if not created:
+        jobs.enqueue('reindex_category', {'category_id': instance.id})
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_cache(sender, **kwargs):
+    caching.bump('events')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    caching.bump('categories')
+
+
+@receiver(post_save, sender=User)
+def invalidate_organizer_cache(sender, instance, update_fields=None, **kwargs):
+    """
+    Thông tin nhà tổ chức được lồng trong response sự kiện. Bỏ qua lần lưu chỉ cập nhật last_login khi đăng nhập.
+    """
+    if instance.is_organizer and set(update_fields or ()) != {'last_login'}:
+        caching.bump('events')
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_auth_user(sender, instance, **kwargs):
+    """
+    User bị khóa hoặc đổi quyền: không dùng bản user cũ trong cache xác thực nữa.
+    """
+    auth_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_drf_token(sender, instance, **kwargs):
+    auth_cache.invalidate(drf_token_key(instance.key))
+
+
+@receiver(post_delete, sender=AccessToken)
+def invalidate_cached_access_token(sender, instance, **kwargs):
+    auth_cache.invalidate(oauth2_token_key(instance.token))
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def forget_default_application(sender, **kwargs):
+    oauth_tokens.forget_default_application()
+
+
+@receiver(post_save, sender=Ticket)
+def queue_ticket_email(sender, instance, **kwargs):
+    """
+    Vé chuyển sang booked: đưa việc tạo QR và gửi email vào hàng đợi job.
+    """
+    if instance.status == 'booked':
+        jobs.enqueue_ticket_email(instance)
@@ -0,0 +1,119 @@
+"""
+Snapshot vé dùng cho máy quét check-in offline.
+
+Định dạng nhị phân (little-endian):
+- Header 32 byte: magic b'EVSNAP03', event_id (u64), thời điểm tạo (u64, unix), số bản ghi (u32), 4 byte đệm.
+- Các bản ghi 30 byte, sắp xếp tăng dần theo khóa: khóa (16 byte), ticket_id (u64),
+  quantity (u32), loại vé (u8: 0 = regular, 1 = vip), cờ (u8: bit 0 = đã check-in).
+
+Khóa là SHA-256 (cắt 16 byte) của chữ ký ở phần cuối token QR (xem events/ticket_tokens.py), không phải
+chính chữ ký: người có file snapshot (ví dụ máy quét bị mất) không dựng lại được token hợp lệ. Máy quét giải mã
+base64 chữ ký, băm bằng snapshot_key() rồi tìm nhị phân trong file (có thể mmap), không cần khóa bí mật.
+"""
+import hashlib
+import struct
+import time
+
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from events.models import Ticket
+from events.ticket_tokens import digest_function
+
+MAGIC = b'EVSNAP03'
+KEY_SIZE = 16
+HEADER = struct.Struct('<8sQQI4x')
+RECORD = struct.Struct(f'<{KEY_SIZE}sQIBB')
+TYPE_FLAGS = {'regular': 0, 'vip': 1}
+FLAG_CHECKED_IN = 1
+SYNC_CHUNK_SIZE = 500
+
+
+def snapshot_key(digest):
+    """
+    Khóa tra cứu trong snapshot: băm một chiều chữ ký của token QR.
+    """
+    return hashlib.sha256(digest).digest()[:KEY_SIZE]
+
+
+def build_snapshot(event_id):
+    """
+    Tạo snapshot của tất cả vé booked của sự kiện.
+    """
+    rows = Ticket.objects.filter(event_id=event_id, status='booked').values_list(
+        'id', 'ticket_type', 'quantity', 'checked_in_at').order_by().iterator(chunk_size=5000)
+    token_digest = digest_function()
+    records = [
+        (snapshot_key(token_digest(ticket_id, event_id, ticket_type, quantity)), ticket_id, quantity,
+         TYPE_FLAGS[ticket_type], FLAG_CHECKED_IN if checked_in_at else 0)
+        for ticket_id, ticket_type, quantity, checked_in_at in rows
+    ]
+    records.sort()
+
+    buffer = bytearray(HEADER.size + RECORD.size * len(records))
+    HEADER.pack_into(buffer, 0, MAGIC, event_id, int(time.time()), len(records))
+    offset = HEADER.size
+    for record in records:
+        RECORD.pack_into(buffer, offset, *record)
+        offset += RECORD.size
+    return bytes(buffer)
+
+
+def lookup(snapshot, digest):
+    """
+    Tìm nhị phân chữ ký `digest` (đã giải mã base64 từ token QR) trong snapshot (bytes, memoryview hoặc mmap).
+    Trả về (ticket_id, quantity, ticket_type, checked_in) hoặc None. Đây là cài đặt tham khảo cho máy quét.
+    """
+    magic, event_id, generated_at, count = HEADER.unpack_from(snapshot, 0)
+    if magic != MAGIC:
+        raise ValueError('Snapshot không hợp lệ.')
+    key_to_find = snapshot_key(digest)
+    view = memoryview(snapshot)
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        offset = HEADER.size + middle * RECORD.size
+        key = bytes(view[offset:offset + KEY_SIZE])
+        if key < key_to_find:
+            low = middle + 1
+        elif key > key_to_find:
+            high = middle
+        else:
+            _, ticket_id, quantity, type_flag, flags = RECORD.unpack_from(snapshot, offset)
+            ticket_type = 'vip' if type_flag == TYPE_FLAGS['vip'] else 'regular'
+            return ticket_id, quantity, ticket_type, bool(flags & FLAG_CHECKED_IN)
+    return None
+
+
+def apply_checkins(event_id, checkins):
+    """
+    Ghi các lượt check-in offline vào bảng Ticket theo lô.
+    `checkins` là danh sách {"ticket_id": ..., "checked_in_at": "ISO 8601"}. Vé đã check-in
+    trước đó được giữ nguyên thời điểm cũ. Trả về số vé được cập nhật.
+    """
+    times = {}
+    for item in checkins:
+        if not isinstance(item, dict):
+            raise ValueError(f'Mỗi lượt check-in phải là một object, nhận {item!r}.')
+        checked_in_at = parse_datetime(str(item.get('checked_in_at', '')))
+        if checked_in_at is None:
+            raise ValueError(f"checked_in_at không hợp lệ cho vé {item.get('ticket_id')}.")
+        if timezone.is_naive(checked_in_at):
+            checked_in_at = timezone.make_aware(checked_in_at)
+        ticket_id = int(item['ticket_id'])
+        # Cùng một vé quét nhiều lần ở nhiều máy: giữ lần sớm nhất
+        if ticket_id not in times or checked_in_at < times[ticket_id]:
+            times[ticket_id] = checked_in_at
+
+    updated = 0
+    ticket_ids = sorted(times)
+    for start in range(0, len(ticket_ids), SYNC_CHUNK_SIZE):
+        chunk = ticket_ids[start:start + SYNC_CHUNK_SIZE]
+        updated += Ticket.objects.filter(
+            event_id=event_id, id__in=chunk, status='booked', checked_in_at__isnull=True
+        ).update(checked_in_at=Case(
+            *[When(id=ticket_id, then=Value(times[ticket_id])) for ticket_id in chunk],
+            output_field=DateTimeField()
+        ))
+    return updated
@@ -0,0 +1,86 @@
+"""
+Mã QR ký HMAC cho vé.
+
+Token có dạng: T1.<ticket_id>.<event_id>.<R|V>.<quantity>.<chữ ký>
+Chữ ký là 16 byte đầu của HMAC-SHA256 (base64url, không padding) nên máy quét có thể
+kiểm tra token mà không cần tra CSDL. Trạng thái vé (đã hủy, đã check-in) vẫn được
+kiểm tra ở bước ghi check-in.
+"""
+import base64
+import hashlib
+import hmac
+from collections import namedtuple
+
+from django.conf import settings
+
+TOKEN_VERSION = 'T1'
+DIGEST_SIZE = 16
+TYPE_CODES = {'regular': 'R', 'vip': 'V'}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+TicketClaims = namedtuple('TicketClaims', ['ticket_id', 'event_id', 'ticket_type', 'quantity'])
+
+_key_cache = {}
+
+
+class InvalidTicketToken(ValueError):
+    pass
+
+
+def _base_hmac():
+    """
+    Đối tượng HMAC đã nạp khóa; mỗi lần ký chỉ cần copy() thay vì khởi tạo lại khóa.
+    """
+    secret = getattr(settings, 'TICKET_TOKEN_SECRET', settings.SECRET_KEY)
+    base = _key_cache.get(secret)
+    if base is None:
+        # Khóa riêng cho vé, tách biệt với các chữ ký khác dùng SECRET_KEY
+        key = hashlib.sha256(b'events.ticket_tokens:' + secret.encode('utf-8')).digest()
+        base = _key_cache[secret] = hmac.new(key, digestmod=hashlib.sha256)
+    return base
+
+
+def _body(ticket_id, event_id, ticket_type, quantity):
+    return f'{TOKEN_VERSION}.{ticket_id}.{event_id}.{TYPE_CODES[ticket_type]}.{quantity}'
+
+
+def digest_function():
+    """
+    Trả về hàm tính chữ ký đã gắn sẵn khóa, dùng khi cần ký hàng loạt (ví dụ snapshot check-in).
+    """
+    base = _base_hmac()
+
+    def digest(ticket_id, event_id, ticket_type, quantity):
+        mac = base.copy()
+        mac.update(f'{TOKEN_VERSION}.{ticket_id}.{event_id}.{TYPE_CODES[ticket_type]}.{quantity}'.encode('ascii'))
+        return mac.digest()[:DIGEST_SIZE]
+    return digest
+
+
+def token_digest(ticket_id, event_id, ticket_type, quantity):
+    """
+    Chữ ký thô (DIGEST_SIZE byte) của vé.
+    """
+    return digest_function()(ticket_id, event_id, ticket_type, quantity)
+
+
+def make_token(ticket):
+    body = _body(ticket.id, ticket.event_id, ticket.ticket_type, ticket.quantity)
+    digest = token_digest(ticket.id, ticket.event_id, ticket.ticket_type, ticket.quantity)
+    return f'{body}.{base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")}'
+
+
+def verify_token(token):
+    """
+    Kiểm tra chữ ký và trả về TicketClaims. Token sai định dạng hoặc sai chữ ký sẽ raise InvalidTicketToken.
+    """
+    try:
+        version, ticket_id, event_id, type_code, quantity, signature = token.strip().split('.')
+        claims = TicketClaims(int(ticket_id), int(event_id), TYPE_NAMES[type_code], int(quantity))
+        digest = base64.urlsafe_b64decode(signature + '=' * (-len(signature) % 4))
+    except (AttributeError, ValueError, KeyError):
+        raise InvalidTicketToken('Mã QR không đúng định dạng.')
+
+    if version != TOKEN_VERSION or not hmac.compare_digest(digest, token_digest(*claims)):
+        raise InvalidTicketToken('Chữ ký mã QR không hợp lệ.')
+    return claims
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from events.views import UserViewSet, CategoryViewSet, EventViewSet, OrganizerViewSet, PaymentViewSet, TicketViewSet, EventTicketViewSet
+from events.views import UserViewSet, CategoryViewSet, EventViewSet, OrganizerViewSet, PaymentViewSet, TicketViewSet, EventTicketViewSet, \
+    NotificationViewSet, metrics_view
 from . import tests
 
 router = DefaultRouter()
@@ -11,6 +12,7 @@ router.register(r'organizers', OrganizerViewSet, basename='organizer')
 router.register(r'payments', PaymentViewSet, basename='payment')
 router.register(r'events/(?P<event_id>\d+)/tickets', EventTicketViewSet, basename='event-ticket')
 router.register(r'tickets', TicketViewSet, basename='ticket')
+router.register(r'notifications', NotificationViewSet, basename='notification')
 
 
 urlpatterns = [
@@ -19,4 +21,5 @@ urlpatterns = [
     path('home/logout/', tests.logout_tests, name='logout'),
     path('payments/ipn/', PaymentViewSet.as_view({'get': 'payment_ipn', 'post': 'payment_ipn'}), name='payment_ipn'),
     path('payments/return/', PaymentViewSet.as_view({'get': 'payment_return'}), name='payment_return'),
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -3,27 +3,24 @@ from django.contrib.auth import authenticate
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status, mixins
-from events.models import User, Category, Event, Ticket, Payment
+from events.models import User, Category, Event, Ticket, Payment, Like, Interest, Review, Notification
 from events import serializers, perms
 from rest_framework import viewsets, generics, parsers, permissions
-from oauth2_provider.models import AccessToken, Application, RefreshToken
+from oauth2_provider.models import Application
 from oauth2_provider.settings import oauth2_settings
 from datetime import datetime
 from django.utils import timezone
-import hashlib
-import hmac
-import urllib.parse
 from django.conf import settings
 from rest_framework.authtoken.models import Token
 from django.utils import timezone
 from datetime import timedelta
 from events.serializers import UserSerializer
 import secrets
-from django.db.models import Q
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-from django.http import JsonResponse
-from events.vnpay import vnpay
+from google.auth import exceptions as google_exceptions
+from django.http import JsonResponse, HttpResponse
+from events import caching, counters, google_auth, inventory, jobs, metrics, notifications, oauth_tokens, payments, realtime, reports, rollups, search, snapshot, ticket_tokens, vnpay
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -33,10 +30,54 @@ def get_client_ip(request):
         ip = request.META.get('REMOTE_ADDR')
     return ip
 
-def hmacsha512(key, data):
-    byteKey = key.encode('utf-8')
-    byteData = data.encode('utf-8')
-    return hmac.new(byteKey, byteData, hashlib.sha512).hexdigest()
+def cancel_pending_ticket(ticket):
+    """
+    Hủy một vé đang chờ thanh toán, đánh dấu thanh toán thất bại và hoàn lại số vé đã giữ chỗ.
+    Cập nhật có điều kiện (status='pending') để hai request hủy đồng thời không hoàn vé hai lần.
+    """
+    with transaction.atomic():
+        cancelled = Ticket.objects.filter(id=ticket.id, status='pending').update(
+            status='cancelled', updated_date=timezone.now())
+        if not cancelled:
+            return False
+        Payment.objects.filter(ticket_id=ticket.id, status='pending').update(
+            status='expired', updated_date=timezone.now())
+        inventory.release(ticket.event_id, ticket.ticket_type, ticket.quantity)
+        rollups.record(ticket.event_id, ticket.ticket_type, cancelled=ticket.quantity)
+        realtime.ticket_status(ticket.id, ticket.event_id, ticket.user_id, 'cancelled')
+        metrics.ticket_status('cancelled')
+    ticket.status = 'cancelled'
+    return True
+
+def toggle_reaction(model, user, event, field):
+    """
+    Bật/tắt Like hoặc Interest của user cho sự kiện; trả về trạng thái mới.
+    Bộ đếm `field` của sự kiện được cộng dồn qua events/counters.py.
+    """
+    with transaction.atomic():
+        deleted, _ = model.objects.filter(user=user, event=event).delete()
+        if deleted:
+            counters.add(event.id, **{field: -1})
+            return False
+        try:
+            with transaction.atomic():
+                model.objects.create(user=user, event=event)
+        except IntegrityError:
+            return True  # Request song song vừa tạo: ràng buộc unique (user, event) giữ đúng một dòng
+        counters.add(event.id, **{field: 1})
+        return True
+
+def is_event_organizer(user, event_id):
+    """
+    Kiểm tra user có phải nhà tổ chức của sự kiện; kết quả được cache để mỗi lượt quét
+    tại cổng không phải tra bảng Event.
+    """
+    return cache.get_or_set(
+        f'event-organizer:{event_id}:{user.id}',
+        lambda: Event.objects.filter(id=event_id, organizer=user).exists(),
+        300
+    )
+
 
 class UserViewSet(viewsets.ViewSet, generics.CreateAPIView, generics.UpdateAPIView):
     """
@@ -48,7 +89,7 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView, generics.UpdateAPIVi
     parser_classes = [parsers.MultiPartParser, parsers.JSONParser]
 
     def get_permissions(self):
-        if self.action in ['login', 'register']:  # Đăng ký và đăng nhập
+        if self.action in ['login', 'register', 'google_login']:  # Đăng ký và đăng nhập
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
 
@@ -105,28 +146,11 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView, generics.UpdateAPIVi
         # )
 
         try:
-            app = Application.objects.get(
-                client_id=settings.DEFAULT_OAUTH2_CLIENT_ID)  # Thay 'abc' bằng client_id bạn đã tạo trong admin
+            app = oauth_tokens.default_application()
         except Application.DoesNotExist:
             return Response({'error': 'Ứng dụng OAuth2 không tồn tại.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Tạo token an toàn cho AccessToken
-        access_token_value = secrets.token_urlsafe(32)  # Tạo token 32 byte an toàn
-        access_token = AccessToken.objects.create(
-            user=user,
-            application=app,
-            expires=timezone.now() + timedelta(seconds=oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS),
-            token=access_token_value,  # Sử dụng token đã tạo
-            scope='read write'
-        )
-        # Tạo token an toàn cho RefreshToken
-        refresh_token_value = secrets.token_urlsafe(32)  # Tạo token 32 byte an toàn
-        refresh_token = RefreshToken.objects.create(
-            user=user,
-            application=app,
-            token=refresh_token_value,  # Sử dụng token đã tạo
-            access_token=access_token
-        )
+        access_token, refresh_token = oauth_tokens.issue_tokens(user, app)
 
         return Response({
             'drf_token': token.key,
@@ -146,7 +170,8 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView, generics.UpdateAPIVi
             return Response({'error': 'ID Token is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            idinfo = id_token.verify_oauth2_token(token, google_requests.Request(), settings.GOOGLE_CLIENT_ID)
+            # Chứng chỉ ký của Google được cache theo max-age (events/google_auth.py), không tải lại mỗi lượt
+            idinfo = google_auth.verify(token)
 
             email = idinfo['email']
             full_name = idinfo.get('name', '')
@@ -160,28 +185,13 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView, generics.UpdateAPIVi
                 'is_active': True,
             })
 
-            app = Application.objects.get(client_id=settings.DEFAULT_OAUTH2_CLIENT_ID)
-
-            access_token_value = secrets.token_urlsafe(32)
-            access_token = AccessToken.objects.create(
-                user=user,
-                application=app,
-                expires=timezone.now() + timedelta(seconds=3600),
-                token=access_token_value,
-                scope='read write'
-            )
-
-            refresh_token_value = secrets.token_urlsafe(32)
-            RefreshToken.objects.create(
-                user=user,
-                application=app,
-                token=refresh_token_value,
-                access_token=access_token
-            )
+            app = oauth_tokens.default_application()
+
+            access_token, refresh_token = oauth_tokens.issue_tokens(user, app, expires_in=3600)
 
             return Response({
                 'access_token': access_token.token,
-                'refresh_token': refresh_token_value,
+                'refresh_token': refresh_token.token,
                 'expires_in': 3600,
                 'user': {
                     'email': user.email,
@@ -192,21 +202,23 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView, generics.UpdateAPIVi
 
         except ValueError:
             return Response({'error': 'ID Token không hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
+        except google_exceptions.TransportError:
+            return Response({'error': 'Không kết nối được Google, vui lòng thử lại.'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Application.DoesNotExist:
+            return Response({'error': 'Ứng dụng OAuth2 không tồn tại.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     # API Đăng xuất
     @action(methods=['post'], detail=False, url_path='logout')
     def logout(self, request):
         """
-        Đăng xuất: xóa DRF Token và OAuth2 Access Token/Refresh Token.
+        Đăng xuất: xóa DRF Token và thu hồi OAuth2 Access Token/Refresh Token.
         """
         # Xóa DRF Token
         Token.objects.filter(user=request.user).delete()
 
-        # Xóa tất cả OAuth2 AccessToken và RefreshToken của user
-        access_tokens = AccessToken.objects.filter(user=request.user)
-        for token in access_tokens:
-            RefreshToken.objects.filter(access_token=token).delete()
-        access_tokens.delete()
+        # Thu hồi tất cả OAuth2 AccessToken và RefreshToken của user (lệnh purge_oauth_tokens sẽ xóa sau)
+        oauth_tokens.revoke_user_tokens(request.user)
 
         return Response({'message': 'Đăng xuất thành công'}, status=status.HTTP_200_OK)
 
@@ -249,6 +261,18 @@ class OrganizerViewSet(viewsets.GenericViewSet):
         user.save()
         return Response({"detail": "Nhà tổ chức đã được xác thực."})
 
+    @action(methods=['get'], url_path='report', detail=False, permission_classes=[perms.IsVerifiedOrganizer])
+    def report(self, request):
+        """
+        Báo cáo vé bán theo loại, doanh thu và điểm đánh giá trung bình theo từng sự kiện của nhà tổ chức.
+        Lọc theo khoảng ngày: ?from=YYYY-MM-DD&to=YYYY-MM-DD.
+        """
+        try:
+            date_from, date_to = reports.parse_date_range(request.query_params)
+        except ValueError as ex:
+            return Response({"detail": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(reports.organizer_report(request.user, date_from, date_to))
+
 
 class CategoryViewSet(viewsets.ViewSet, generics.ListAPIView):
     """
@@ -258,9 +282,14 @@ class CategoryViewSet(viewsets.ViewSet, generics.ListAPIView):
     serializer_class = serializers.CategorySerializer
     permission_classes = [perms.IsAdminOrReadOnly]
 
+    def list(self, request, *args, **kwargs):
+        return caching.cached_response('categories', request, lambda: super(CategoryViewSet, self).list(
+            request, *args, **kwargs))
+
 
-class EventViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
-    queryset = Event.objects.all()
+class EventViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    # EventSerializer lồng organizer và category: join sẵn để không phát sinh truy vấn theo từng dòng
+    queryset = Event.objects.select_related('organizer', 'category')
     serializer_class = serializers.EventSerializer
     parser_classes = [parsers.MultiPartParser]
     permission_classes = [perms.IsVerifiedOrganizer | perms.IsAdminOrReadOnly]
@@ -268,14 +297,25 @@ class EventViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
             return [perms.OwnerPerms()]
+        if self.action == 'reviews' and self.request.method == 'GET':
+            return [permissions.AllowAny()]
         return super().get_permissions()
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
             if self.request.user.is_staff:
-                return Event.objects.all()
-            return Event.objects.filter(organizer=self.request.user)
-        return Event.objects.filter(status='approved')
+                return self.queryset.all()
+            return self.queryset.filter(organizer=self.request.user)
+        return self.queryset.filter(status='approved')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Danh sách sự kiện. Khách (chưa đăng nhập) đều nhận cùng một danh sách sự kiện đã duyệt nên được cache.
+        """
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        return caching.cached_response('events', request, lambda: super(EventViewSet, self).list(
+            request, *args, **kwargs))
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -302,11 +342,125 @@ class EventViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
         event.save()
         return Response({"detail": "Sự kiện đã bị từ chối."})
 
+    def _approved_event(self, pk):
+        return Event.objects.filter(id=pk, status='approved').first()
+
+    def _toggle(self, request, pk, model, field, state_key):
+        event = self._approved_event(pk)
+        if event is None:
+            return Response({"detail": "Sự kiện không tồn tại hoặc chưa được duyệt."}, status=status.HTTP_404_NOT_FOUND)
+        state = toggle_reaction(model, request.user, event, field)
+        event.refresh_from_db(fields=[field])
+        return Response({state_key: state, field: counters.buffer.current(event, field)})
+
+    @action(detail=True, methods=['post'], url_path='like', permission_classes=[permissions.IsAuthenticated])
+    def like(self, request, pk=None):
+        """
+        Thích / bỏ thích sự kiện.
+        """
+        return self._toggle(request, pk, Like, 'like_count', 'liked')
+
+    @action(detail=True, methods=['post'], url_path='interest', permission_classes=[permissions.IsAuthenticated])
+    def interest(self, request, pk=None):
+        """
+        Quan tâm / bỏ quan tâm sự kiện.
+        """
+        return self._toggle(request, pk, Interest, 'interest_count', 'interested')
+
+    @action(detail=True, methods=['get', 'post', 'delete'], url_path='reviews',
+            parser_classes=[parsers.JSONParser, parsers.MultiPartParser],
+            permission_classes=[permissions.IsAuthenticated])
+    def reviews(self, request, pk=None):
+        """
+        GET: danh sách đánh giá của sự kiện. POST: tạo hoặc sửa đánh giá của mình. DELETE: xóa đánh giá của mình.
+        """
+        event = self._approved_event(pk)
+        if event is None:
+            return Response({"detail": "Sự kiện không tồn tại hoặc chưa được duyệt."}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.method == 'GET':
+            page = self.paginate_queryset(Review.objects.filter(event=event, active=True).select_related('user'))
+            return self.get_paginated_response(serializers.ReviewSerializer(page, many=True).data)
+
+        if request.method == 'DELETE':
+            with transaction.atomic():
+                review = Review.objects.select_for_update().filter(event=event, user=request.user).first()
+                if review is None:
+                    return Response({"detail": "Bạn chưa đánh giá sự kiện này."}, status=status.HTTP_404_NOT_FOUND)
+                review.delete()
+                counters.add(event.id, rating_sum=-review.rating, rating_count=-1)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        serializer = serializers.ReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rating = serializer.validated_data['rating']
+        comment = serializer.validated_data.get('comment')
+        with transaction.atomic():
+            # Khóa đánh giá cũ để hai lần sửa đồng thời không cộng lệch rating_sum
+            review = Review.objects.select_for_update().filter(event=event, user=request.user).first()
+            if review is not None:
+                delta = rating - review.rating
+                review.rating, review.comment = rating, comment
+                review.save()
+                counters.add(event.id, rating_sum=delta)
+                code = status.HTTP_200_OK
+            else:
+                try:
+                    with transaction.atomic():
+                        review = Review.objects.create(event=event, user=request.user, rating=rating, comment=comment)
+                except IntegrityError:
+                    return Response({"detail": "Đánh giá đang được lưu, vui lòng thử lại."},
+                                    status=status.HTTP_409_CONFLICT)
+                counters.add(event.id, rating_sum=rating, rating_count=1)
+                code = status.HTTP_201_CREATED
+        return Response(serializers.ReviewSerializer(review).data, status=code)
+
+    @action(detail=True, methods=['post'], url_path='notify', parser_classes=[parsers.JSONParser],
+            permission_classes=[perms.IsVerifiedOrganizer | permissions.IsAdminUser])
+    def notify(self, request, pk=None):
+        """
+        Gửi thông báo tới mọi người đã đặt vé của sự kiện: {"message": "..."}.
+        Việc tạo thông báo chạy trong job nền nên request trả về ngay.
+        """
+        event = self.get_object()
+        message = (request.data.get('message') or '').strip()
+        if not message:
+            return Response({"detail": "Thiếu nội dung thông báo."}, status=status.HTTP_400_BAD_REQUEST)
+        job = jobs.enqueue_event_notification(event, message)
+        return Response({"detail": "Thông báo đang được gửi.", "job_id": job.id}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'], url_path='checkin-snapshot',
+            permission_classes=[perms.IsVerifiedOrganizer | permissions.IsAdminUser])
+    def checkin_snapshot(self, request, pk=None):
+        """
+        Tải snapshot nhị phân các vé đã đặt để máy quét check-in offline (xem events/snapshot.py).
+        """
+        event = self.get_object()
+        response = HttpResponse(snapshot.build_snapshot(event.id), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="event-{event.id}-checkin.snap"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='checkin-sync', parser_classes=[parsers.JSONParser],
+            permission_classes=[perms.IsVerifiedOrganizer | permissions.IsAdminUser])
+    def checkin_sync(self, request, pk=None):
+        """
+        Đồng bộ các lượt check-in offline: {"checkins": [{"ticket_id": 1, "checked_in_at": "..."}]}
+        """
+        event = self.get_object()
+        checkins = request.data.get('checkins')
+        if not isinstance(checkins, list):
+            return Response({"detail": "Thiếu danh sách checkins."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            updated = snapshot.apply_checkins(event.id, checkins)
+        except (KeyError, TypeError, ValueError) as e:
+            return Response({"detail": f"Dữ liệu check-in không hợp lệ: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"received": len(checkins), "updated": updated}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='search', permission_classes=[permissions.AllowAny])
     def search(self, request):
         """
         Tìm kiếm sự kiện theo:
-        - keyword (tên / mô tả),
+        - keyword (tên / mô tả / tag / danh mục, xếp theo độ liên quan),
         - category (id),
         - location,
         - start_date (ngày bắt đầu tìm kiếm),
@@ -318,18 +472,19 @@ class EventViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
         start_date = request.query_params.get('start_date')  # YYYY-MM-DD
         end_date = request.query_params.get('end_date')  # YYYY-MM-DD
 
+        # Kết quả tìm kiếm giống nhau với mọi người dùng nên được cache theo bộ tham số
+        return caching.cached_response('search', request, lambda: self._search(
+            request, keyword, category_id, location, start_date, end_date))
+
+    def _search(self, request, keyword, category_id, location, start_date, end_date):
+
         # Chỉ tìm kiếm sự kiện đã được duyệt
-        events = Event.objects.filter(status='approved')
+        events = self.queryset.filter(status='approved')
 
-        if keyword:
-            events = events.filter(
-                Q(name__icontains=keyword) |
-                Q(description__icontains=keyword)
-            )
+        if keyword or location:
+            events = search.search_events(events, keyword=keyword, location=location)
         if category_id:
             events = events.filter(category_id=category_id)
-        if location:
-            events = events.filter(location__icontains=location)
 
         if start_date:
             try:
@@ -345,8 +500,11 @@ class EventViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
             except ValueError:
                 return Response({'error': 'end_date không đúng định dạng YYYY-MM-DD'}, status=400)
 
-        serializer = self.serializer_class(events, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Có từ khóa: xếp theo độ liên quan; không có: theo thời gian bắt đầu
+        self.keyset_ordering = ('-search_rank', '-id') if keyword else ('start_time', 'id')
+        page = self.paginate_queryset(events)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 class EventTicketViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
     """
@@ -375,12 +533,21 @@ class EventTicketViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
         except ValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        ticket_type = serializer.validated_data['ticket_type']
+        quantity = serializer.validated_data.get('quantity', 1)
+
         try:
-            ticket = serializer.save(
-                user=request.user,
-                event=event,
-                expires_at=timezone.now() + timedelta(minutes=30)
-            )
+            # Giữ chỗ và tạo vé trong cùng một transaction: nếu tạo vé lỗi thì số vé được hoàn lại
+            with transaction.atomic():
+                if not inventory.reserve(event.id, ticket_type, quantity):
+                    return Response({"detail": "Sự kiện không còn đủ vé."}, status=status.HTTP_409_CONFLICT)
+                serializer.save(
+                    user=request.user,
+                    event=event,
+                    quantity=quantity,
+                    expires_at=timezone.now() + timedelta(minutes=30)
+                )
+                metrics.ticket_status('reserved')
             headers = self.get_success_headers(serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         except Exception as e:
@@ -390,7 +557,7 @@ class TicketViewSet(viewsets.GenericViewSet):
     """
     ViewSet cho các API liên quan đến vé nói chung
     """
-    queryset = Ticket.objects.all()
+    queryset = Ticket.objects.with_total_price()
     serializer_class = serializers.TicketSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -418,23 +585,67 @@ class TicketViewSet(viewsets.GenericViewSet):
 
         return Response({
             "ticket_id": ticket.id,
-            "event_id": ticket.event.id,
-            "participant_id": ticket.user.id,
+            "event_id": ticket.event_id,
+            "participant_id": ticket.user_id,
             "status": "valid",
             "message": "Xác nhận vé thành công."
         }, status=status.HTTP_200_OK)
 
+    @action(methods=['post'], url_path='check-in', detail=False, permission_classes=[perms.IsVerifiedOrganizer])
+    def check_in(self, request):
+        """
+        API Check-in bằng mã QR ký HMAC: /tickets/check-in/
+        Chữ ký được kiểm tra không cần tra CSDL; việc check-in là một lệnh UPDATE có điều kiện,
+        quét lại cùng một vé trả về kết quả cũ thay vì lỗi.
+        """
+        token = request.data.get('token')
+        if not token:
+            return Response({"detail": "Mã QR không được cung cấp."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            claims = ticket_tokens.verify_token(token)
+        except ticket_tokens.InvalidTicketToken as e:
+            return Response({"status": "invalid", "detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not is_event_organizer(request.user, claims.event_id):
+            return Response({"detail": "Bạn không phải nhà tổ chức của sự kiện này."}, status=status.HTTP_403_FORBIDDEN)
+
+        now = timezone.now()
+        checked_in = Ticket.objects.filter(
+            id=claims.ticket_id, event_id=claims.event_id, status='booked', checked_in_at__isnull=True
+        ).update(checked_in_at=now)
+
+        result = {
+            "ticket_id": claims.ticket_id,
+            "event_id": claims.event_id,
+            "ticket_type": claims.ticket_type,
+            "quantity": claims.quantity,
+        }
+        if checked_in:
+            return Response({**result, "status": "checked_in", "checked_in_at": now}, status=status.HTTP_200_OK)
+
+        # Không cập nhật được: vé đã check-in trước đó hoặc không ở trạng thái booked
+        ticket = Ticket.objects.filter(id=claims.ticket_id, event_id=claims.event_id).values(
+            'status', 'checked_in_at').first()
+        if ticket and ticket['status'] == 'booked' and ticket['checked_in_at']:
+            return Response({**result, "status": "already_checked_in", "checked_in_at": ticket['checked_in_at']},
+                            status=status.HTTP_200_OK)
+        return Response({"status": "invalid", "detail": "Vé không ở trạng thái hợp lệ."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
     @action(methods=['get'], url_path='history', detail=False, permission_classes=[permissions.IsAuthenticated])
     def ticket_history(self, request):
         """
-        API Xem lịch sử đặt vé: /tickets/history/
-        Cho phép người tham gia xem danh sách các vé đã đặt.
+        API Xem lịch sử đặt vé: /tickets/history/?cursor=...
+        Cho phép người tham gia xem danh sách các vé đã đặt (mới nhất trước, phân trang theo cursor).
         """
-        tickets = Ticket.objects.filter(user=request.user).order_by('-created_date')
-        serializer = self.get_serializer(tickets, many=True)
+        tickets = self.get_queryset().filter(user=request.user)
+        page = self.paginate_queryset(tickets)
+        serializer = self.get_serializer(page, many=True)
         return Response({
             "message": "Lịch sử đặt vé được trả về thành công.",
-            "data": serializer.data
+            "data": serializer.data,
+            "next": self.paginator.get_next_link()
         }, status=status.HTTP_200_OK)
 
     @action(methods=['post'], url_path='cancel', detail=True, permission_classes=[permissions.IsAuthenticated])
@@ -448,7 +659,7 @@ class TicketViewSet(viewsets.GenericViewSet):
         except Ticket.DoesNotExist:
             return Response({"detail": "Vé không tồn tại."}, status=status.HTTP_404_NOT_FOUND)
 
-        if ticket.user != request.user:
+        if ticket.user_id != request.user.id:
             return Response({"detail": "Bạn không có quyền hủy vé này."}, status=status.HTTP_403_FORBIDDEN)
 
         if ticket.status == 'cancelled':
@@ -457,18 +668,39 @@ class TicketViewSet(viewsets.GenericViewSet):
         if ticket.status != 'pending':
             return Response({"detail": "Chỉ có thể hủy vé ở trạng thái chờ."}, status=status.HTTP_400_BAD_REQUEST)
 
-        ticket.status = 'cancelled'
-        ticket.save()
-
-        try:
-            payment = Payment.objects.get(ticket=ticket)
-            payment.status = 'failed'
-            payment.save()
-        except Payment.DoesNotExist:
-            pass
+        if not cancel_pending_ticket(ticket):
+            return Response({"detail": "Chỉ có thể hủy vé ở trạng thái chờ."}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"detail": "Vé đã được hủy thành công."}, status=status.HTTP_200_OK)
 
+class NotificationViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
+    """
+    Hộp thư thông báo của người dùng hiện tại.
+    """
+    serializer_class = serializers.NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user, active=True)
+
+    @action(methods=['post'], url_path='mark-read', detail=False, parser_classes=[parsers.JSONParser])
+    def mark_read(self, request):
+        """
+        Đánh dấu đã đọc: {"ids": [1, 2, 3]} hoặc {"all": true}.
+        """
+        ids = request.data.get('ids')
+        if request.data.get('all') is True:
+            ids = None
+        elif not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return Response({"detail": "ids phải là danh sách id thông báo."}, status=status.HTTP_400_BAD_REQUEST)
+        updated = notifications.mark_read(request.user, ids)
+        return Response({"updated": updated, "unread_count": notifications.unread_count(request.user)})
+
+    @action(methods=['get'], url_path='unread-count', detail=False)
+    def unread_count(self, request):
+        return Response({"unread_count": notifications.unread_count(request.user)})
+
+
 class PaymentViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
     queryset = Payment.objects.all()
     serializer_class = serializers.PaymentSerializer
@@ -479,10 +711,13 @@ class PaymentViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
         if not ticket_id:
             return Response({"detail": "Thiếu ticket_id"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            ticket = Ticket.objects.get(id=ticket_id, user=request.user, status='pending')
+            ticket = Ticket.objects.select_related('event').get(id=ticket_id, user=request.user, status='pending')
         except Ticket.DoesNotExist:
             return Response({"detail": "Vé không tồn tại hoặc không ở trạng thái chờ."},
                             status=status.HTTP_404_NOT_FOUND)
+        if ticket.expires_at < timezone.now():
+            cancel_pending_ticket(ticket)
+            return Response({"detail": "Vé đã hết hạn thanh toán."}, status=status.HTTP_400_BAD_REQUEST)
         if Payment.objects.filter(ticket_id=ticket_id, status='pending').exists():
             return Response({"detail": "Đã tồn tại thanh toán đang chờ cho vé này."},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -506,84 +741,74 @@ class PaymentViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
         }, status=status.HTTP_201_CREATED)
 
     def create_vnpay_payment_url(self, payment, request):
-        vnp = vnpay()
-        vnp.requestData['vnp_Version'] = '2.1.0'
-        vnp.requestData['vnp_Command'] = 'pay'
-        vnp.requestData['vnp_TmnCode'] = settings.VNPAY_TMN_CODE
-        vnp.requestData['vnp_Amount'] = int(payment.amount * 100)  # VNPay requires amount in VND * 100
-        vnp.requestData['vnp_CurrCode'] = 'VND'
-        vnp.requestData['vnp_TxnRef'] = f"{payment.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        vnp.requestData['vnp_OrderInfo'] = f"Thanh toan ve {payment.ticket.event.name}"
-        vnp.requestData['vnp_OrderType'] = 'billpayment'
-        vnp.requestData['vnp_Locale'] = 'vn'
-        vnp.requestData['vnp_CreateDate'] = datetime.now().strftime('%Y%m%d%H%M%S')
-        vnp.requestData['vnp_IpAddr'] = get_client_ip(request)
-        vnp.requestData['vnp_ReturnUrl'] = settings.VNPAY_RETURN_URL
-        payment_url = vnp.get_payment_url(settings.VNPAY_PAYMENT_URL, settings.VNPAY_HASH_SECRET_KEY)
-        return payment_url
+        params = {
+            'vnp_Version': '2.1.0',
+            'vnp_Command': 'pay',
+            'vnp_TmnCode': settings.VNPAY_TMN_CODE,
+            'vnp_Amount': int(payment.amount * 100),  # VNPay requires amount in VND * 100
+            'vnp_CurrCode': 'VND',
+            'vnp_TxnRef': f"{payment.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'vnp_OrderInfo': f"Thanh toan ve {payment.ticket.event.name}",
+            'vnp_OrderType': 'billpayment',
+            'vnp_Locale': 'vn',
+            'vnp_CreateDate': datetime.now().strftime('%Y%m%d%H%M%S'),
+            'vnp_IpAddr': get_client_ip(request),
+            'vnp_ReturnUrl': settings.VNPAY_RETURN_URL,
+        }
+        return vnpay.build_payment_url(settings.VNPAY_PAYMENT_URL, params, settings.VNPAY_HASH_SECRET_KEY)
 
     @action(methods=['get'], url_path='return', detail=False, permission_classes=[permissions.AllowAny])
     def payment_return(self, request):
         input_data = request.query_params
         if not input_data:
             return Response({"detail": "Không có dữ liệu trả về"}, status=status.HTTP_400_BAD_REQUEST)
-        vnp = vnpay()
-        vnp.responseData = input_data.dict()
-        payment_id = input_data.get('vnp_TxnRef', '').split('_')[0]
-        try:
-            payment = Payment.objects.get(id=payment_id)
-        except Payment.DoesNotExist:
-            return Response({"detail": "Thanh toán không tồn tại."}, status=status.HTTP_404_NOT_FOUND)
-        if vnp.validate_response(settings.VNPAY_HASH_SECRET_KEY):
-            response_code = input_data.get('vnp_ResponseCode')
-            if response_code == '00':
-                payment.status = 'completed'
-                payment.ticket.status = 'booked'
-                payment.ticket.save()
-                payment.save()
-                return Response({
-                    "detail": "Thanh toán thành công.",
-                    "payment_id": payment.id,
-                    "ticket_id": payment.ticket.id
-                }, status=status.HTTP_200_OK)
-            else:
-                payment.status = 'failed'
-                payment.save()
-                return Response({
-                    "detail": f"Thanh toán thất bại. Mã lỗi: {response_code}"
-                }, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            payment.status = 'failed'
-            payment.save()
+        if not vnpay.validate_response(input_data.dict(), settings.VNPAY_HASH_SECRET_KEY):
             return Response({
                 "detail": "Sai chữ ký. Thanh toán không hợp lệ."
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        result = payments.finalize_payment(input_data.get('vnp_TxnRef'), input_data.get('vnp_ResponseCode'),
+                                           input_data.get('vnp_Amount'))
+        payment = result.payment
+        if result.outcome == payments.NOT_FOUND:
+            return Response({"detail": "Thanh toán không tồn tại."}, status=status.HTTP_404_NOT_FOUND)
+        if result.outcome == payments.INVALID_AMOUNT:
+            return Response({"detail": "Số tiền thanh toán không khớp."}, status=status.HTTP_400_BAD_REQUEST)
+        # Callback trùng lặp (IPN đã chốt trước, người dùng tải lại trang) trả về kết quả đã ghi nhận
+        if payment.status == 'completed':
+            return Response({
+                "detail": "Thanh toán thành công.",
+                "payment_id": payment.id,
+                "ticket_id": payment.ticket_id
+            }, status=status.HTTP_200_OK)
+        return Response({
+            "detail": f"Thanh toán thất bại. Mã lỗi: {input_data.get('vnp_ResponseCode')}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     @action(methods=['get', 'post'], url_path='ipn', detail=False, permission_classes=[permissions.AllowAny])
     def payment_ipn(self, request):
         input_data = request.GET
         if not input_data:
             return JsonResponse({'RspCode': '99', 'Message': 'Invalid request'})
-        vnp = vnpay()
-        vnp.responseData = input_data.dict()
-        payment_id = input_data.get('vnp_TxnRef', '').split('_')[0]
-        try:
-            payment = Payment.objects.get(id=payment_id)
-        except Payment.DoesNotExist:
+        if not vnpay.validate_response(input_data.dict(), settings.VNPAY_HASH_SECRET_KEY):
+            return JsonResponse({'RspCode': '97', 'Message': 'Invalid Signature'})
+
+        result = payments.finalize_payment(input_data.get('vnp_TxnRef'), input_data.get('vnp_ResponseCode'),
+                                           input_data.get('vnp_Amount'))
+        if result.outcome == payments.NOT_FOUND:
             return JsonResponse({'RspCode': '01', 'Message': 'Order not found'})
-        if payment.status == 'completed':
+        if result.outcome == payments.INVALID_AMOUNT:
+            return JsonResponse({'RspCode': '04', 'Message': 'Invalid amount'})
+        if result.outcome == payments.DUPLICATE:
             return JsonResponse({'RspCode': '02', 'Message': 'Order Already Updated'})
-        if vnp.validate_response(settings.VNPAY_HASH_SECRET_KEY):
-            response_code = input_data.get('vnp_ResponseCode')
-            if response_code == '00':
-                payment.status = 'completed'
-                payment.ticket.status = 'booked'
-                payment.ticket.save()
-                payment.save()
-                return JsonResponse({'RspCode': '00', 'Message': 'Confirm Success'})
-            else:
-                payment.status = 'failed'
-                payment.save()
-                return JsonResponse({'RspCode': '00', 'Message': 'Confirm Success'})
-        else:
-            return JsonResponse({'RspCode': '97', 'Message': 'Invalid Signature'})
\ No newline at end of file
+        return JsonResponse({'RspCode': '00', 'Message': 'Confirm Success'})
+
+
+def metrics_view(request):
+    """
+    Số liệu Prometheus của mọi worker. Đặt settings.METRICS_TOKEN để yêu cầu header Authorization: Bearer <token>.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and not secrets.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
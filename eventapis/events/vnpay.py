@@ -1,54 +1,73 @@
+"""
+Tạo URL thanh toán và kiểm tra chữ ký VNPay (HMAC-SHA512).
+
+Các hàm không dùng trạng thái chung nên an toàn khi nhiều request chạy song song trên
+nhiều thread. Chuỗi truy vấn được dựng một lượt bằng join; khóa bí mật chỉ được mã hóa
+một lần cho mỗi secret (đối tượng HMAC đã nạp khóa được copy() cho mỗi lần ký).
+"""
 import hashlib
 import hmac
+import logging
 import urllib.parse
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+HASH_PARAMS = ('vnp_SecureHash', 'vnp_SecureHashType')
+
+
+@lru_cache(maxsize=8)
+def _base_hmac(secret_key):
+    return hmac.new(secret_key.encode('utf-8'), digestmod=hashlib.sha512)
+
+
+def build_query(params):
+    """
+    Chuỗi truy vấn chuẩn của VNPay: các tham số sắp xếp theo tên, giá trị mã hóa quote_plus.
+    """
+    return '&'.join(f'{key}={urllib.parse.quote_plus(str(value))}' for key, value in sorted(params.items()))
+
+
+def sign(query, secret_key):
+    mac = _base_hmac(secret_key).copy()
+    mac.update(query.encode('utf-8'))
+    return mac.hexdigest()
+
+
+def build_payment_url(vnpay_payment_url, params, secret_key):
+    query = build_query(params)
+    return f'{vnpay_payment_url}?{query}&vnp_SecureHash={sign(query, secret_key)}'
+
+
+def validate_response(params, secret_key):
+    """
+    Kiểm tra chữ ký của dữ liệu VNPay trả về (return URL / IPN). Không sửa `params`.
+    """
+    received = params.get('vnp_SecureHash')
+    if not received:
+        return False
+    query = build_query({key: value for key, value in params.items()
+                         if key.startswith('vnp_') and key not in HASH_PARAMS})
+    expected = sign(query, secret_key)
+    # So sánh thời gian hằng để không lộ chữ ký đúng qua thời gian phản hồi
+    valid = hmac.compare_digest(expected.encode('ascii'), received.lower().encode('utf-8'))
+    if not valid:
+        logger.warning('VNPay: sai chữ ký cho giao dịch %s', params.get('vnp_TxnRef'))
+    logger.debug('VNPay: hash data %s', query)
+    return valid
+
 
 class vnpay:
-    requestData = {}
-    responseData = {}
+    """
+    Giao diện cũ theo đối tượng; dữ liệu giờ thuộc về từng instance thay vì dùng chung ở mức lớp.
+    """
+
+    def __init__(self):
+        self.requestData = {}
+        self.responseData = {}
 
     def get_payment_url(self, vnpay_payment_url, secret_key):
-        inputData = sorted(self.requestData.items())
-        queryString = ''
-        hasData = ''
-        seq = 0
-        for key, val in inputData:
-            if seq == 1:
-                queryString = queryString + "&" + key + '=' + urllib.parse.quote_plus(str(val))
-            else:
-                seq = 1
-                queryString = key + '=' + urllib.parse.quote_plus(str(val))
-
-        hashValue = self.__hmacsha512(secret_key, queryString)
-        return vnpay_payment_url + "?" + queryString + '&vnp_SecureHash=' + hashValue
+        return build_payment_url(vnpay_payment_url, self.requestData, secret_key)
 
     def validate_response(self, secret_key):
-        vnp_SecureHash = self.responseData['vnp_SecureHash']
-        # Remove hash params
-        if 'vnp_SecureHash' in self.responseData.keys():
-            self.responseData.pop('vnp_SecureHash')
-
-        if 'vnp_SecureHashType' in self.responseData.keys():
-            self.responseData.pop('vnp_SecureHashType')
-
-        inputData = sorted(self.responseData.items())
-        hasData = ''
-        seq = 0
-        for key, val in inputData:
-            if str(key).startswith('vnp_'):
-                if seq == 1:
-                    hasData = hasData + "&" + str(key) + '=' + urllib.parse.quote_plus(str(val))
-                else:
-                    seq = 1
-                    hasData = str(key) + '=' + urllib.parse.quote_plus(str(val))
-        hashValue = self.__hmacsha512(secret_key, hasData)
-
-        print(
-            'Validate debug, HashData:' + hasData + "\n HashValue:" + hashValue + "\nInputHash:" + vnp_SecureHash)
-
-        return vnp_SecureHash == hashValue
-
-    @staticmethod
-    def __hmacsha512(key, data):
-        byteKey = key.encode('utf-8')
-        byteData = data.encode('utf-8')
-        return hmac.new(byteKey, byteData, hashlib.sha512).hexdigest()
\ No newline at end of file
+        return validate_response(self.responseData, secret_key)